@@ -0,0 +1,149 @@
+"""
+Задержка /health, пока главная страница под нагрузкой.
+
+Приложение запускается в uvicorn в этом же процессе, несколько клиентов
+непрерывно запрашивают /, отдельный клиент раз в 10 мс опрашивает /health.
+Котировки отдает локальная заглушка с задержкой --upstream-ms, кэш котировок
+выключен, так что каждый запрос / ждет сеть. Печатаются p50/p99 /health
+в покое и под нагрузкой.
+
+Режим --inline выключает пулы (работа выполняется прямо в цикле событий, как
+раньше), чтобы сравнить: без пулов каждое ожидание сети останавливает весь сервер.
+
+Запуск: python -m benchmarks.concurrency [--inline] [--clients 8] [--seconds 5] [--upstream-ms 100]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Tuple
+
+PORT = 8765
+UPSTREAM_PORT = 8766
+BASE_URL = f"http://127.0.0.1:{PORT}"
+
+# Котировки — от локальной заглушки, без кэширования: каждый запрос / обращается к ней
+os.environ["FINANCE_CURRENCY_API_URL"] = f"http://127.0.0.1:{UPSTREAM_PORT}/latest/USD"
+os.environ["FINANCE_STOCK_API_BASE"] = f"http://127.0.0.1:{UPSTREAM_PORT}/stock"
+os.environ["FINANCE_QUOTE_TTL_SECONDS"] = "0"
+os.environ["FINANCE_QUOTE_STALE_SECONDS"] = "0"
+os.environ["FINANCE_QUOTE_ERROR_TTL_SECONDS"] = "0"
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+
+from src.main import app  # noqa: E402
+from src.services.executors import cpu_pool, io_pool  # noqa: E402
+from src.services.store import operation_store  # noqa: E402
+
+
+def start_upstream(delay: float) -> ThreadingHTTPServer:
+    """Заглушка API котировок: каждый ответ через delay секунд"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self) -> None:
+            time.sleep(delay)
+            if "batch" in self.path:
+                body = json.dumps({symbol: {"price": 100.0} for symbol in ("AAPL", "GOOGL", "MSFT", "TSLA", "AMZN")})
+            else:
+                body = json.dumps({"rates": {"USD": 1.0, "EUR": 0.9, "GBP": 0.8, "CNY": 7.1}})
+            payload = body.encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format: str, *args: object) -> None:
+            pass
+
+    upstream = ThreadingHTTPServer(("127.0.0.1", UPSTREAM_PORT), Handler)
+    upstream.daemon_threads = True
+    threading.Thread(target=upstream.serve_forever, daemon=True).start()
+    return upstream
+
+
+def start_server() -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=PORT, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def probe_health(client: httpx.AsyncClient, seconds: float) -> List[float]:
+    """Задержки /health в миллисекундах"""
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        response = await client.get("/health")
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(0.01)
+    return latencies
+
+
+async def load_home(client: httpx.AsyncClient, stop: asyncio.Event) -> int:
+    """Непрерывно запрашивает главную страницу"""
+    requests_made = 0
+    while not stop.is_set():
+        await client.get("/", params={"date": "2021-12-31 23:59:59"})
+        requests_made += 1
+    return requests_made
+
+
+def percentiles(latencies: List[float]) -> Tuple[float, float]:
+    ordered = sorted(latencies)
+    return statistics.median(ordered), ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+
+
+async def run(clients: int, seconds: float) -> None:
+    limits = httpx.Limits(max_connections=clients + 1)
+    async with httpx.AsyncClient(base_url=BASE_URL, limits=limits, timeout=60) as client:
+        idle = await probe_health(client, seconds)
+
+        stop = asyncio.Event()
+        loaders = [asyncio.create_task(load_home(client, stop)) for _ in range(clients)]
+        loaded = await probe_health(client, seconds)
+        stop.set()
+        served = sum(await asyncio.gather(*loaders))
+
+    idle_p50, idle_p99 = percentiles(idle)
+    loaded_p50, loaded_p99 = percentiles(loaded)
+    print(f"/health в покое:      p50 {idle_p50:7.1f} мс  p99 {idle_p99:7.1f} мс")
+    print(f"/health под нагрузкой: p50 {loaded_p50:7.1f} мс  p99 {loaded_p99:7.1f} мс")
+    print(f"/ обработано: {served} запросов ({served / seconds:.0f}/с, клиентов: {clients})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--inline", action="store_true", help="выполнять работу в цикле событий, без пулов")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--upstream-ms", type=float, default=100.0, help="задержка API котировок")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    if args.inline:
+        cpu_pool.workers = io_pool.workers = 0
+
+    upstream = start_upstream(args.upstream_ms / 1000)
+    server = start_server()
+    print(f"Операций: {len(operation_store.operations)}, режим: {'inline' if args.inline else 'пулы'}")
+    try:
+        asyncio.run(run(args.clients, args.seconds))
+    finally:
+        server.should_exit = True
+        upstream.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Замер памяти на одну операцию: прежнее представление против текущего.
+
+"До" — обычный dataclass с __dict__, где каждая строка получает собственные
+строки и Decimal (как при разборе через iterrows + from_dict).
+"После" — Operation со __slots__, интернированными строками и общими Decimal/датами.
+
+Запуск: python -m benchmarks.memory_per_row [path/to/operations.xlsx]
+"""
+
+import gc
+import sys
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Callable, List, Optional
+
+import pandas as pd
+
+from src.services.excel_processor import operations_from_frame, parse_operations_frame
+
+
+@dataclass
+class LegacyOperation:
+    """Прежнее представление операции (без __slots__)"""
+
+    date: datetime
+    payment_date: datetime
+    card_number: str
+    status: str
+    amount: Decimal
+    currency: str
+    cashback: Decimal
+    category: str
+    mcc: Optional[int]
+    description: str
+    bonuses: Decimal
+    rounding: Decimal
+
+
+def _legacy_operations(frame: pd.DataFrame) -> List[LegacyOperation]:
+    """Копирует каждое значение, как это делал построчный разбор"""
+    result = []
+    for row in frame.to_dict("records"):
+        result.append(
+            LegacyOperation(
+                date=row["date"].to_pydatetime(),
+                payment_date=row["payment_date"].to_pydatetime(),
+                card_number="".join(row["card_number"]),
+                status="".join(row["status"]),
+                amount=Decimal(str(row["amount"])),
+                currency="".join(row["currency"]),
+                cashback=Decimal(str(row["cashback"])),
+                category="".join(row["category"]),
+                mcc=row["mcc"],
+                description="".join(row["description"]),
+                bonuses=Decimal(str(row["bonuses"])),
+                rounding=Decimal(str(row["rounding"])),
+            )
+        )
+    return result
+
+
+def bytes_per_row(build: Callable[[], List[Any]]) -> float:
+    """Память, удерживаемая списком операций, в байтах на строку"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    rows = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / max(len(rows), 1)
+
+
+def main(file_path: str = "data/operations.xlsx") -> None:
+    df = pd.read_excel(file_path)
+    frame, _ = parse_operations_frame(df, source=file_path)
+    print(f"Строк: {len(frame)}")
+
+    legacy = bytes_per_row(lambda: _legacy_operations(frame))
+    # Разбор входит в замер, чтобы учесть общие Decimal и строки, на которые ссылаются операции
+    compact = bytes_per_row(lambda: operations_from_frame(parse_operations_frame(df)[0]))
+
+    print(f"До:    {legacy:8.0f} байт/строка")
+    print(f"После: {compact:8.0f} байт/строка ({compact / legacy:.0%})")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
@@ -0,0 +1,86 @@
+"""
+Сериализация больших списков транзакций: jsonable_encoder против готовых байтов строк.
+
+"До" — путь FastAPI для List[Dict]: jsonable_encoder обходит каждую строку,
+затем JSONResponse кодирует результат. "После" — RowsJSONResponse склеивает
+JSON строк, закодированный один раз на срез (OperationSnapshot.encoded_rows).
+Отдельно печатается стоимость кодирования среза и ответа главной страницы
+(Operation и Decimal): модель ответа Dict[str, Any] против FastJSONResponse.
+
+Операции из файла размножаются сдвигом дат до --rows строк.
+
+Запуск: python -m benchmarks.serialization [--rows 100000] [--repeat 5] [path/to/operations.xlsx]
+"""
+
+import argparse
+import time
+from dataclasses import replace
+from datetime import timedelta
+from typing import Any, Callable, Dict, List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from src.models.operation import Operation
+from src.services.analyzer import get_top_transactions
+from src.services.excel_processor import load_operations_from_excel
+from src.services.serialization import FastJSONResponse, RowsJSONResponse
+from src.services.store import build_snapshot
+
+
+def best_of(repeat: int, func: Callable[[], Any]) -> float:
+    """Лучшее время из repeat запусков, секунды"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def replicate(operations: List[Operation], rows: int) -> List[Operation]:
+    """Копии операций со сдвигом на год за каждый проход, пока не наберется rows строк"""
+    result: List[Operation] = []
+    shift = 0
+    while len(result) < rows:
+        delta = timedelta(days=365 * shift)
+        result.extend(replace(op, date=op.date + delta, payment_date=op.payment_date + delta) for op in operations)
+        shift += 1
+    return result[:rows]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("file_path", nargs="?", default="data/operations.xlsx")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    snapshot = build_snapshot(args.file_path, replicate(load_operations_from_excel(args.file_path), args.rows))
+    transactions = snapshot.transactions
+    print(f"Строк: {len(transactions)}")
+
+    started = time.perf_counter()
+    snapshot.encoded_rows
+    print(f"Кодирование среза (один раз на версию): {time.perf_counter() - started:.3f} с")
+
+    positions = range(len(transactions))
+    before = best_of(args.repeat, lambda: JSONResponse(jsonable_encoder([dict(t) for t in transactions])).body)
+    after = best_of(args.repeat, lambda: RowsJSONResponse(snapshot.encoded(positions)).body)
+    print(f"Список, до:    {before * 1000:9.1f} мс")
+    print(f"Список, после: {after * 1000:9.1f} мс ({before / after:.0f}x)")
+
+    home = {
+        "total_spent": sum(op.amount for op in snapshot.operations),
+        "top_transactions": get_top_transactions(snapshot.operations, 500),
+    }
+    response_model = TypeAdapter(Dict[str, Any])
+    before = best_of(args.repeat, lambda: JSONResponse(response_model.dump_python(home, mode="json")).body)
+    after = best_of(args.repeat, lambda: FastJSONResponse(home).body)
+    print(f"Главная (500 операций), до:    {before * 1000:7.2f} мс")
+    print(f"Главная (500 операций), после: {after * 1000:7.2f} мс ({before / after:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
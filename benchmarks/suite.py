@@ -0,0 +1,232 @@
+"""
+Набор замеров сервисов и маршрутов на синтетической выписке.
+
+Выписка из benchmarks.synthetic (генерируется при первом запуске в
+benchmarks/.data) загружается в хранилище, затем замеряются: разбор Excel
+(без кэша и из кэша выписки), построение среза, analyze_spending, три отчета
+(сам расчет, без кэша отчетов и записи файла), simple_search, поиск
+телефонов и переводов физлицам и каждый маршрут FastAPI через TestClient.
+Котировки отдает локальная заглушка. Для каждого замера печатается медиана
+и минимум из --repeat запусков после одного прогревочного.
+
+Базовые результаты хранятся в benchmarks/baseline.json по размеру выписки.
+--save-baseline записывает текущие результаты как базовые, без него медианы
+сравниваются с базовыми: рост больше --threshold (и больше 1 мс) считается
+регрессией, и процесс завершается с кодом 1.
+
+Запуск: python -m benchmarks.suite [--rows 10k] [--repeat 5] [--only search] [--threshold 0.25] [--save-baseline]
+"""
+
+import argparse
+import inspect
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+UPSTREAM_PORT = 8767
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+DATA_DIR = Path(__file__).with_name(".data")
+# Разница меньше этого порога считается шумом, сколько бы процентов она ни составляла
+NOISE_FLOOR_MS = 1.0
+
+# Котировки — от локальной заглушки, отчеты пишутся во временный каталог
+os.environ["FINANCE_CURRENCY_API_URL"] = f"http://127.0.0.1:{UPSTREAM_PORT}/latest/USD"
+os.environ["FINANCE_STOCK_API_BASE"] = f"http://127.0.0.1:{UPSTREAM_PORT}/stock"
+os.environ.setdefault("FINANCE_REPORT_DIR", tempfile.mkdtemp(prefix="finance-bench-"))
+os.environ.setdefault("FINANCE_RELOAD_POLL_SECONDS", "0")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from benchmarks.synthetic import SIZES, parse_size, write_statement  # noqa: E402
+from src.main import app  # noqa: E402
+from src.services.analyzer import analyze_spending  # noqa: E402
+from src.services.excel_processor import load_operations_with_report  # noqa: E402
+from src.services.reports import (  # noqa: E402
+    category_spending_report,
+    weekday_spending_report,
+    workday_weekend_spending_report,
+)
+from src.services.services import find_person_transfers, find_phone_transactions, simple_search  # noqa: E402
+from src.services.store import build_snapshot, operation_store  # noqa: E402
+
+Case = Tuple[str, Callable[[], Any]]
+Results = Dict[str, Dict[str, float]]
+
+
+def start_upstream() -> ThreadingHTTPServer:
+    """Заглушка API котировок без задержки"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self) -> None:
+            if "batch" in self.path:
+                body = json.dumps({symbol: {"price": 100.0} for symbol in ("AAPL", "GOOGL", "MSFT", "TSLA", "AMZN")})
+            else:
+                body = json.dumps({"rates": {"USD": 1.0, "EUR": 0.9, "GBP": 0.8, "CNY": 7.1}})
+            payload = body.encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format: str, *args: object) -> None:
+            pass
+
+    upstream = ThreadingHTTPServer(("127.0.0.1", UPSTREAM_PORT), Handler)
+    upstream.daemon_threads = True
+    threading.Thread(target=upstream.serve_forever, daemon=True).start()
+    return upstream
+
+
+def statement_path(rows: int) -> str:
+    """Синтетическая выписка на rows строк; генерируется один раз"""
+    path = DATA_DIR / f"synthetic-{rows}-42.xlsx"
+    if not path.exists():
+        print(f"Генерация {path}...")
+        write_statement(str(path), rows)
+    return str(path)
+
+
+def service_cases(path: str) -> List[Case]:
+    """Замеры сервисов на загруженном срезе"""
+    snapshot = operation_store.snapshot
+    operations, transactions, frame = snapshot.operations, snapshot.transactions, snapshot.report_frame
+    target_date = operations[-1].date.strftime("%Y-%m-%d")
+    # Сам расчет отчета: без кэша отчетов и фоновой записи файла
+    category_report = inspect.unwrap(category_spending_report)
+    weekday_report = inspect.unwrap(weekday_spending_report)
+    day_type_report = inspect.unwrap(workday_weekend_spending_report)
+
+    return [
+        ("ingest_excel", lambda: load_operations_with_report(path, use_cache=False)),
+        ("ingest_cached", lambda: load_operations_with_report(path, use_cache=True)),
+        ("build_snapshot", lambda: build_snapshot(path, operations).warm()),
+        ("analyze_spending", lambda: analyze_spending(operations)),
+        ("report_category", lambda: category_report(frame, "Супермаркеты", target_date)),
+        ("report_weekday", lambda: weekday_report(frame, target_date)),
+        ("report_day_type", lambda: day_type_report(frame, target_date)),
+        ("simple_search", lambda: simple_search(transactions, "магнит")),
+        ("find_phone_transactions", lambda: find_phone_transactions(transactions)),
+        ("find_person_transfers", lambda: find_person_transfers(transactions)),
+    ]
+
+
+def route_cases(client: TestClient) -> List[Case]:
+    """Замеры маршрутов: запрос через TestClient, ответ должен быть 200"""
+    last = operation_store.snapshot.operations[-1].date
+    day, month = last.strftime("%Y-%m-%d"), last.strftime("%Y-%m")
+    moment = last.strftime("%Y-%m-%d %H:%M:%S")
+    routes = [
+        ("home", "/", {"date": moment}),
+        ("events", f"/events/{moment}", {"period": "M"}),
+        ("events_all", f"/events/{moment}", {"period": "ALL"}),
+        ("cashback_month", f"/api/cashback-analysis/{last.year}/{last.month}", {}),
+        ("cashback_range", "/api/cashback-analysis", {"end": month}),
+        ("investment_month", f"/api/investment-savings/{month}", {"limit": 50}),
+        ("investment_range", "/api/investment-savings", {"end": month}),
+        ("search_page", "/api/search", {"query": "магнит", "limit": 100}),
+        ("search_all", "/api/search", {"query": "а"}),
+        ("search_ndjson", "/api/search", {"query": "а", "format": "ndjson"}),
+        ("phone_transactions", "/api/phone-transactions", {}),
+        ("person_transfers", "/api/person-transfers", {}),
+        ("report_category_route", "/api/reports/category/Супермаркеты", {"date": day}),
+        ("report_weekdays_route", "/api/reports/weekdays", {"date": day}),
+        ("report_day_type_route", "/api/reports/day-type", {"date": day}),
+        ("health", "/health", {}),
+    ]
+
+    def request(url: str, params: Dict[str, Any]) -> Callable[[], Any]:
+        def call() -> Any:
+            response = client.get(url, params=params)
+            if response.status_code != 200:
+                raise RuntimeError(f"{url}: {response.status_code} {response.text[:200]}")
+            return response.content
+
+        return call
+
+    return [(f"route_{name}", request(url, params)) for name, url, params in routes]
+
+
+def measure(func: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """Медиана и минимум времени в миллисекундах после одного прогревочного запуска"""
+    func()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return {"median_ms": round(statistics.median(timings), 3), "min_ms": round(min(timings), 3)}
+
+
+def compare(results: Results, baseline: Results, threshold: float) -> List[str]:
+    """Замеры, медиана которых выросла больше порога относительно базовой"""
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        before, after = base["median_ms"], current["median_ms"]
+        if after - before > NOISE_FLOOR_MS and after > before * (1 + threshold):
+            regressions.append(f"{name}: {before:.2f} -> {after:.2f} мс (+{after / before - 1:.0%})")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=parse_size, default=SIZES["10k"])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", default="", help="замеры, в имени которых есть эта подстрока")
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    upstream = start_upstream()
+    path = statement_path(args.rows)
+    operation_store.reload(path)
+    print(f"Строк: {len(operation_store.operations)}")
+
+    results: Results = {}
+    with TestClient(app) as client:
+        for name, func in service_cases(path) + route_cases(client):
+            if args.only not in name:
+                continue
+            results[name] = measure(func, args.repeat)
+            print(f"{name:30s} {results[name]['median_ms']:10.2f} мс (мин. {results[name]['min_ms']:.2f})")
+    upstream.shutdown()
+
+    key = str(args.rows)
+    stored = json.loads(BASELINE_PATH.read_text(encoding="utf-8")) if BASELINE_PATH.exists() else {}
+    if args.save_baseline:
+        previous = stored.get(key, {}).get("cases", {})
+        stored[key] = {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "repeat": args.repeat,
+            "cases": {**previous, **results},
+        }
+        BASELINE_PATH.write_text(json.dumps(stored, ensure_ascii=False, indent=2, sort_keys=True) + "\n", "utf-8")
+        print(f"Базовые результаты сохранены в {BASELINE_PATH}")
+        return 0
+
+    if key not in stored:
+        print(f"Нет базовых результатов для {key} строк, запустите с --save-baseline")
+        return 0
+    regressions = compare(results, stored[key]["cases"], args.threshold)
+    for line in regressions:
+        print(f"РЕГРЕССИЯ {line}")
+    if not regressions:
+        print(f"Регрессий больше {args.threshold:.0%} нет")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""
+Генератор синтетических выписок для замеров.
+
+Пишет xlsx в формате банковской выгрузки, который разбирает
+load_operations_from_excel: русские заголовки, даты %d.%m.%Y %H:%M:%S,
+суммы строками с запятой, пропуски (NaN) в карте, кешбэке, категории, MCC и
+дате платежа. Строки идут от новых к старым, как в выгрузке. Содержимое
+определяется только числом строк и seed: одинаковые аргументы дают побайтно
+одинаковый файл.
+
+Запуск: python -m benchmarks.synthetic [--rows 100k] [--seed 42] [path/to/out.xlsx]
+"""
+
+import argparse
+import random
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Iterator, List, NamedTuple, Optional, Tuple
+
+import xlsxwriter
+
+HEADERS = [
+    "Дата операции",
+    "Дата платежа",
+    "Номер карты",
+    "Статус",
+    "Сумма операции",
+    "Валюта операции",
+    "Сумма платежа",
+    "Валюта платежа",
+    "Кэшбэк",
+    "Категория",
+    "MCC",
+    "Описание",
+    "Бонусы (включая кэшбэк)",
+    "Округление на инвесткопилку",
+    "Сумма операции с округлением",
+]
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+# Период выписки: три года, последняя операция — в конце 2023 года
+PERIOD_END = datetime(2023, 12, 31, 23, 59, 59)
+PERIOD_SECONDS = 3 * 365 * 24 * 3600
+# Фиксированная дата в свойствах книги, чтобы файл не зависел от времени генерации
+CREATED_AT = datetime(2024, 1, 1)
+
+CARDS = ["*7197", "*5091", "*4556", "*1112"]
+
+
+class Profile(NamedTuple):
+    """Категория выписки: MCC, описания, диапазон суммы в рублях и вес в выборке"""
+
+    category: str
+    mcc: Optional[int]
+    descriptions: List[str]
+    amounts: Tuple[int, int]
+    weight: int
+    income: bool = False
+
+
+PROFILES = [
+    Profile("Супермаркеты", 5411, ["Колхоз", "Магнит", "Пятёрочка", "Перекрёсток", "ВкусВилл"], (50, 3000), 30),
+    Profile("Фастфуд", 5814, ["Mouse Tail", "Теремок", "KFC", "Шаурма на Невском"], (100, 900), 10),
+    Profile("Различные товары", 5399, ["Ozon.ru", "Wildberries", "Яндекс Маркет"], (200, 8000), 8),
+    Profile("Местный транспорт", 4111, ["Метро Санкт-Петербург", "Транспорт СПб"], (40, 200), 10),
+    Profile("Такси", 4121, ["Яндекс Такси", "Ситимобил"], (150, 1500), 6),
+    Profile("Аптеки", 5912, ["Аптека Вита", "Ригла", "Планета Здоровья"], (100, 2500), 4),
+    Profile("Рестораны", 5812, ["Кафе Пушкин", "Тануки", "Чайхона №1"], (500, 6000), 5),
+    Profile(
+        "Мобильная связь", 4814, ["Тинькофф Мобайл +7 995 555-55-99", "МТС Mobile +7 981 333-44-55"], (100, 900), 4
+    ),
+    Profile(
+        "Переводы", None, ["Иван П.", "Светлана Т.", "Константин Л.", "Валерия Ч.", "Перевод с карты"], (300, 20000), 6
+    ),
+    Profile(
+        "Пополнения", None, ["Пополнение через Газпромбанк", "Внесение наличных через банкомат"], (1000, 90000), 3, True
+    ),
+]
+_WEIGHTS = [profile.weight for profile in PROFILES]
+
+
+def parse_size(value: str) -> int:
+    """Число строк: 10000, 10k, 100k, 1m"""
+    return SIZES.get(value.lower()) or int(value)
+
+
+def _money(value: Decimal) -> str:
+    return f"{value:.2f}".replace(".", ",")
+
+
+def generate_rows(rows: int, seed: int = 42) -> Iterator[List[Any]]:
+    """Строки выписки в порядке HEADERS; None — пустая ячейка"""
+    rng = random.Random(seed)
+    offsets = sorted((rng.randrange(PERIOD_SECONDS) for _ in range(rows)), reverse=True)
+
+    for offset in offsets:
+        moment = PERIOD_END - timedelta(seconds=PERIOD_SECONDS - 1 - offset)
+        profile = rng.choices(PROFILES, _WEIGHTS)[0]
+        low, high = profile.amounts
+        amount = Decimal(rng.randrange(low * 100, high * 100)) / 100
+        status = "FAILED" if rng.random() < 0.02 else "OK"
+        currency = "USD" if not profile.income and rng.random() < 0.01 else "RUB"
+        signed = amount if profile.income else -amount
+
+        card = None if profile.mcc is None or rng.random() < 0.02 else rng.choice(CARDS)
+        cashback = None if profile.income or rng.random() < 0.9 else _money((amount / 100).quantize(Decimal("1")))
+        category = None if rng.random() < 0.005 else profile.category
+        mcc = None if profile.mcc is None or rng.random() < 0.05 else float(profile.mcc)
+        payment_date = None if rng.random() < 0.002 else moment.strftime("%d.%m.%Y")
+        bonuses = 0 if profile.income or status != "OK" else int(amount // 100)
+        rounding = 0 if profile.income or rng.random() < 0.95 else int(10 - amount % 10)
+
+        yield [
+            moment.strftime("%d.%m.%Y %H:%M:%S"),
+            payment_date,
+            card,
+            status,
+            _money(signed),
+            currency,
+            _money(signed),
+            currency,
+            cashback,
+            category,
+            mcc,
+            rng.choice(profile.descriptions),
+            bonuses,
+            rounding,
+            _money(amount + rounding),
+        ]
+
+
+def write_statement(path: str, rows: int, seed: int = 42) -> str:
+    """Пишет выписку из rows строк в path и возвращает путь"""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+    workbook.set_properties({"created": CREATED_AT})
+    sheet = workbook.add_worksheet("Отчет по операциям")
+    sheet.write_row(0, 0, HEADERS)
+    for number, row in enumerate(generate_rows(rows, seed), start=1):
+        for column, value in enumerate(row):
+            if value is not None:
+                sheet.write(number, column, value)
+    workbook.close()
+    return path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path", nargs="?")
+    parser.add_argument("--rows", type=parse_size, default=SIZES["10k"])
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    path = args.path or f"benchmarks/.data/synthetic-{args.rows}-{args.seed}.xlsx"
+    write_statement(path, args.rows, args.seed)
+    print(f"{path}: {args.rows} строк")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,13 +5,53 @@ from typing import List
 class Settings(BaseSettings):
     # Пути к файлам
     excel_file_path: str = "data/operations.xlsx"
+    # Каталог ежемесячных выписок для инкрементальной загрузки (пусто — выключено)
+    statements_dir: str = ""
     user_settings_path: str = "user_settings.json"
     report_dir: str = "reports"
+    # Запись отчетов в фоне: формат (json, compact, ndjson), размер очереди и пачки, fsync
+    report_format: str = "json"
+    report_queue_size: int = 1000
+    report_batch_size: int = 50
+    report_fsync: bool = True
+    # Кэш результатов отчетов: бюджет памяти (байты) и число записей
+    report_cache_max_bytes: int = 8 * 1024 * 1024
+    report_cache_max_entries: int = 1024
+    operations_cache_enabled: bool = True
+    # Постоянное хранилище операций (например, sqlite:///data/operations.db; пусто — выключено)
+    # и выполнение фильтров по периоду и поиска запросами к нему
+    database_url: str = ""
+    database_pushdown: bool = False
+    # Метрики Prometheus на /metrics (задержки маршрутов и внутренних этапов)
+    metrics_enabled: bool = True
+    # Горячая перезагрузка выписки: период опроса файла (секунды, 0 — выключено) и токен /admin/reload
+    reload_poll_seconds: float = 5.0
+    admin_token: str = ""
 
     # API endpoints
     currency_api_url: str = "https://api.exchangerate-api.com/v4/latest/USD"
     stock_api_base: str = "https://api.iextrading.com/1.0/stock"
 
+    # Кэш котировок: свежесть, окно выдачи устаревших данных и кэширование ошибок (секунды)
+    quote_ttl_seconds: float = 60.0
+    quote_stale_seconds: float = 600.0
+    quote_error_ttl_seconds: float = 30.0
+
+    # Запросы котировок: таймаут одного тикера, общий дедлайн пачки и размер пула соединений
+    quote_symbol_timeout_seconds: float = 3.0
+    quote_deadline_seconds: float = 5.0
+    quote_max_connections: int = 10
+
+    # Пакетный запрос цен (market/batch) и ограничение параллельных одиночных запросов
+    quote_batch_enabled: bool = True
+    quote_batch_size: int = 100
+    quote_max_parallel: int = 8
+
+    # Пулы для блокирующей работы: сеть и файлы, расчеты, процессы разбора выписок (0 — без процессов)
+    io_pool_size: int = 16
+    cpu_pool_size: int = 4
+    process_pool_size: int = 0
+
     # Списки данных
     supported_currencies: List[str] = ["USD", "EUR", "GBP", "CNY"]
     supported_stocks: List[str] = ["AAPL", "GOOGL", "MSFT", "TSLA", "AMZN"]
@@ -1,72 +1,146 @@
+import asyncio
+import threading
 from datetime import datetime
-from typing import List, Dict, Any, Literal, Optional
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from typing import List, Dict, Any, Callable, Literal, Optional, Tuple
+from fastapi import FastAPI, Header, HTTPException, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.responses import Response
 
-from src.views.home import get_home_data
+from src.config import settings
+from src.views.home import get_home_summary, with_quotes
 from src.views.events import events_page
-from src.services.excel_processor import load_operations_from_excel
 from src.services.services import (
-    analyze_cashback_categories,
+    cashback_categories_from_cube,
     investment_bank,
-    simple_search,
-    find_phone_transactions,
-    find_person_transfers,
-    convert_operations_to_transactions,
-    Transaction,
 )
+from src.services.investment import last_months, parse_month
+from src.services.finance_api import get_quotes_async, quote_cache, warm_quote_cache
+from src.services.database import operation_database
+from src.services.executors import WorkerPool, cpu_pool, io_pool, pool_stats, shutdown_pools
+from src.services.market_data import market_data
+from src.services.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, metrics
+from src.services.pagination import (
+    NDJSON_MEDIA_TYPE,
+    NEXT_CURSOR_HEADER,
+    Cursor,
+    PageFetcher,
+    decode_cursor,
+    encode_cursor,
+    iter_ndjson,
+)
+from src.services.report_cache import report_cache
+from src.services.report_sink import report_sink
+from src.services.reloader import reloader
+from src.services.serialization import FastJSONResponse, RowsJSONResponse, encode_rows
+from src.services.statements import statement_ingestor
+from src.services.store import operation_store
 from src.services.reports import (
-    category_spending_report,
+    cashback_matrix_report,
+    category_spending_from_cube,
+    category_spending_from_database,
     weekday_spending_report,
     workday_weekend_spending_report,
-    transactions_to_dataframe,
 )
 
 app = FastAPI(title="My Finance App API", version="1.0.0")
+app.add_middleware(MetricsMiddleware)
+
+metrics.register_stats("store", operation_store.stats)
+metrics.register_stats("quotes", quote_cache.stats)
+metrics.register_stats("report_cache", report_cache.stats)
+metrics.register_stats("report_sink", report_sink.stats)
+metrics.register_stats("reloader", reloader.stats)
+metrics.register_stats("statements", statement_ingestor.stats)
+metrics.register_stats("pool", pool_stats, label="pool")
+
+MAX_CASHBACK_MONTHS = 120
 
-# Глобальные переменные для хранения данных
-operations: List[Any] = []
-transactions: List[Transaction] = []
 
 # Загружаем операции при старте приложения
 @app.on_event("startup")
 async def startup_event() -> None:
     """Загрузка операций при запуске приложения"""
-    global operations, transactions
+    threading.Thread(target=warm_quote_cache, name="quote-warmup", daemon=True).start()
     try:
-        operations = load_operations_from_excel("data/operations.xlsx")
-        transactions = convert_operations_to_transactions(operations)
-        print(f"Загружено {len(operations)} операций")
+        await io_pool.run(operation_store.load)
+        print(f"Загружено {len(operation_store.operations)} операций")
     except FileNotFoundError as e:
         print(f"Ошибка загрузки файла: {e}")
-        operations = []
-        transactions = []
     except Exception as e:
         print(f"Ошибка загрузки операций: {e}")
-        operations = []
-        transactions = []
-
-
-@app.get("/")
-async def home(date: str = "2024-01-15 12:00:00") -> Dict[str, Any]:
+    if statement_ingestor.enabled:
+        try:
+            result = await io_pool.run(statement_ingestor.ingest)
+            print(f"Из каталога выписок добавлено {result.rows_added} операций")
+        except Exception as e:
+            print(f"Ошибка загрузки каталога выписок: {e}")
+    reloader.start()
+
+
+@app.on_event("shutdown")
+def shutdown_event() -> None:
+    """Останавливает наблюдение за выпиской, дописывает очередь отчетов, закрывает соединения и пулы"""
+    reloader.stop()
+    report_sink.close()
+    market_data.close()
+    operation_database.close()
+    shutdown_pools()
+
+
+@app.get("/", response_class=FastJSONResponse)
+async def home(date: str = "2024-01-15 12:00:00", user: Optional[str] = None) -> FastJSONResponse:
     """Главная страница с финансовой аналитикой"""
     try:
         target_date = datetime.strptime(date, "%Y-%m-%d %H:%M:%S")
-        data = get_home_data("data/operations.xlsx", target_date)
-        return data
+        # Расчет в cpu_pool, котировки в io_pool: сетевой запрос не занимает поток расчетов
+        summary, quotes = await asyncio.gather(cpu_pool.run(get_home_summary, target_date), get_quotes_async(user))
+        return FastJSONResponse(with_quotes(summary, quotes))
     except ValueError:
         raise HTTPException(status_code=400, detail="Неверный формат даты. Используйте YYYY-MM-DD HH:MM:SS")
 
 
 @app.get("/events/{date_str}")
-async def events(date_str: str, period: Literal["W", "M", "Y", "ALL"] = "M") -> Dict[str, Any]:
+async def events(
+    date_str: str, period: Literal["W", "M", "Y", "ALL"] = "M", user: Optional[str] = None
+) -> Dict[str, Any]:
     """Страница событий с фильтрацией по дате"""
     try:
-        return await events_page(date_str, period)
+        return await events_page(date_str, period, user)
     except ValueError:
         raise HTTPException(status_code=400, detail="Неверный формат даты")
 
 
+@app.get("/api/cashback-analysis")
+async def cashback_analysis_range(start: Optional[str] = None, end: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Кешбэк, бонусы и округления по месяцам и категориям за период
+
+    start/end — месяцы YYYY-MM включительно; по умолчанию 12 месяцев,
+    заканчивая последним месяцем с операциями.
+    """
+    snapshot = operation_store.snapshot
+    try:
+        if end:
+            last = parse_month(end)
+        elif snapshot.index.months():
+            last = snapshot.index.months()[-1]
+        else:
+            last = (datetime.now().year, datetime.now().month)
+        first = parse_month(start) if start else last_months(last, 12)[0]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Неверный месяц. Используйте YYYY-MM")
+
+    span = (last[0] - first[0]) * 12 + last[1] - first[1] + 1
+    if not 1 <= span <= MAX_CASHBACK_MONTHS:
+        raise HTTPException(status_code=400, detail=f"Период должен быть от 1 до {MAX_CASHBACK_MONTHS} месяцев")
+
+    try:
+        start_month, end_month = f"{first[0]:04d}-{first[1]:02d}", f"{last[0]:04d}-{last[1]:02d}"
+        return await cpu_pool.run(cashback_matrix_report, snapshot.report_frame, start_month, end_month)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка анализа: {str(e)}")
+
+
 @app.get("/api/cashback-analysis/{year}/{month}")
 async def cashback_analysis(year: int, month: int) -> Dict[str, float]:
     """
@@ -76,7 +150,7 @@ async def cashback_analysis(year: int, month: int) -> Dict[str, float]:
         raise HTTPException(status_code=400, detail="Месяц должен быть от 1 до 12")
 
     try:
-        result = analyze_cashback_categories(transactions, year, month)
+        result = cashback_categories_from_cube(operation_store.snapshot.cube, year, month)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка анализа: {str(e)}")
@@ -91,65 +165,175 @@ async def investment_savings(month: str, limit: int = 100) -> Dict[str, float]:
         raise HTTPException(status_code=400, detail="Лимит должен быть 10, 50 или 100")
 
     try:
-        transactions_for_investment = [
-            {
-                "date": op.date.isoformat(),
-                "amount": float(op.amount),
-                "category": op.category,
-                "description": op.description,
-            }
-            for op in operations
-        ]
-
-        savings = investment_bank(month, transactions_for_investment, limit)
+        savings = await cpu_pool.run(_investment_savings, month, limit)
         return {"savings": savings}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка расчета: {str(e)}")
 
 
-@app.get("/api/search")
-async def search_transactions(query: str) -> List[Dict[str, Any]]:
+@app.get("/api/investment-savings")
+async def investment_savings_by_month(
+    limits: List[int] = Query([10, 50, 100]),
+    months: int = Query(12, ge=1, le=120),
+    end: Optional[str] = None,
+) -> Dict[str, Dict[str, float]]:
     """
-    Поиск транзакций по описанию или категории
+    Инвесткопилка за несколько месяцев для нескольких лимитов сразу
+
+    end — последний месяц (YYYY-MM), по умолчанию последний месяц с операциями;
+    limits — любые положительные лимиты в рублях. Для сверки в каждом месяце
+    есть поле bank — округление, начисленное банком.
     """
+    if any(limit <= 0 for limit in limits):
+        raise HTTPException(status_code=400, detail="Лимит должен быть положительным")
+    snapshot = operation_store.snapshot
+    loaded_months = snapshot.index.months()
+    if not end and not loaded_months:
+        return {}
     try:
-        result = simple_search(transactions, query)
-        return result
+        last = parse_month(end) if end else loaded_months[-1]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Неверный месяц. Используйте YYYY-MM")
+
+    try:
+        return await cpu_pool.run(snapshot.investment.savings, last_months(last, months), limits)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Ошибка поиска: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Ошибка расчета: {str(e)}")
+
+
+def _parse_bound(value: Optional[str], end: bool = False) -> Optional[datetime]:
+    """Граница периода: YYYY-MM-DD или YYYY-MM-DD HH:MM:SS; дата без времени как конец включает весь день"""
+    if value is None:
+        return None
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(
+            status_code=400, detail="Неверный формат даты. Используйте YYYY-MM-DD или YYYY-MM-DD HH:MM:SS"
+        )
+    if end and len(value) == 10:
+        moment = moment.replace(hour=23, minute=59, second=59, microsecond=999999)
+    return moment
+
 
+ListFormat = Literal["json", "ndjson"]
 
-@app.get("/api/phone-transactions")
-async def phone_transactions() -> List[Dict[str, Any]]:
+
+def _parse_cursor(value: Optional[str]) -> Optional[Cursor]:
+    if value is None:
+        return None
+    try:
+        return decode_cursor(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Неверный курсор")
+
+
+async def _list_response(
+    fetch: PageFetcher, cursor: Optional[str], offset: int, limit: Optional[int], format: ListFormat, pool: WorkerPool
+) -> Response:
     """
-    Поиск транзакций с телефонными номерами в описании
+    Ответ со списком транзакций.
+
+    json — массив; если страница заполнена до limit, курсор следующей страницы
+    возвращается в заголовке X-Next-Cursor. ndjson — поток строк, которые
+    выбираются порциями от курсора, без сборки всего результата в памяти.
     """
+    after = _parse_cursor(cursor)
+    if format == "ndjson":
+        return StreamingResponse(iter_ndjson(fetch, after, offset, limit), media_type=NDJSON_MEDIA_TYPE)
+
     try:
-        result = find_phone_transactions(transactions)
-        return result
+        rows, last = await pool.run(fetch, after, offset, limit)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка поиска: {str(e)}")
+    headers = None
+    if limit is not None and len(rows) == limit and last is not None:
+        headers = {NEXT_CURSOR_HEADER: encode_cursor(last)}
+    return RowsJSONResponse(rows, headers=headers)
+
+
+def _flagged_fetcher(name: str) -> PageFetcher:
+    snapshot = operation_store.snapshot
+    return lambda after, offset, limit: snapshot.page(snapshot.flagged_positions(name, limit, offset, after))
+
+
+@app.get("/api/search", response_class=RowsJSONResponse)
+async def search_transactions(
+    query: str,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
+    format: ListFormat = "json",
+) -> Response:
+    """
+    Поиск транзакций по описанию или категории
+
+    Ищет по текстовому индексу текущего среза (или запросом к базе операций
+    при FINANCE_DATABASE_PUSHDOWN); start/end ограничивают период,
+    limit/offset задают страницу результата, cursor (из X-Next-Cursor)
+    продолжает выдачу после предыдущей страницы, format=ndjson отдает поток.
+    """
+    start_date, end_date = _parse_bound(start), _parse_bound(end, end=True)
+    fetch: PageFetcher
+    if operation_database.serves_queries:
+
+        def fetch(after: Optional[Cursor], offset: int, limit: Optional[int]) -> Tuple[List[bytes], Optional[Cursor]]:
+            transactions, last = operation_database.search_page(query, start_date, end_date, limit, offset, after)
+            return encode_rows(transactions), last
+
+        return await _list_response(fetch, cursor, offset, limit, format, io_pool)
+
+    snapshot = operation_store.snapshot
 
+    def fetch(after: Optional[Cursor], offset: int, limit: Optional[int]) -> Tuple[List[bytes], Optional[Cursor]]:
+        return snapshot.page(snapshot.search_positions(query, start_date, end_date, limit, offset, after))
 
-@app.get("/api/person-transfers")
-async def person_transfers() -> List[Dict[str, Any]]:
+    return await _list_response(fetch, cursor, offset, limit, format, cpu_pool)
+
+
+@app.get("/api/phone-transactions", response_class=RowsJSONResponse)
+async def phone_transactions(
+    limit: Optional[int] = Query(None, ge=1),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
+    format: ListFormat = "json",
+) -> Response:
+    """
+    Поиск транзакций с телефонными номерами в описании
+
+    Выборка по признаку has_phone, рассчитанному при загрузке данных;
+    страницы и поток — как в /api/search.
+    """
+    return await _list_response(_flagged_fetcher("has_phone"), cursor, offset, limit, format, cpu_pool)
+
+
+@app.get("/api/person-transfers", response_class=RowsJSONResponse)
+async def person_transfers(
+    limit: Optional[int] = Query(None, ge=1),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
+    format: ListFormat = "json",
+) -> Response:
     """
     Поиск переводов физическим лицам
+
+    Выборка по признаку is_person_transfer, рассчитанному при загрузке данных;
+    страницы и поток — как в /api/search.
     """
-    try:
-        result = find_person_transfers(transactions)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Ошибка поиска: {str(e)}")
+    return await _list_response(_flagged_fetcher("is_person_transfer"), cursor, offset, limit, format, cpu_pool)
 
 
 @app.get("/api/reports/category/{category}")
 async def category_report(category: str, date: Optional[str] = None) -> Dict[str, float]:
     """Отчет по тратам категории"""
     try:
-        transactions_dict = [dict(txn) for txn in transactions]
-        df = transactions_to_dataframe(transactions_dict)
-        result: Dict[str, float] = category_spending_report(df, category, date)
+        result: Dict[str, float]
+        if operation_database.serves_queries:
+            result = await io_pool.run(category_spending_from_database, operation_database, category, date)
+        else:
+            result = await cpu_pool.run(category_spending_from_cube, operation_store.snapshot.cube, category, date)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка отчета: {str(e)}")
@@ -159,9 +343,7 @@ async def category_report(category: str, date: Optional[str] = None) -> Dict[str
 async def weekdays_report(date: Optional[str] = None) -> Dict[str, float]:
     """Отчет по дням недели"""
     try:
-        transactions_dict = [dict(txn) for txn in transactions]
-        df = transactions_to_dataframe(transactions_dict)
-        result: Dict[str, float] = weekday_spending_report(df, date)
+        result: Dict[str, float] = await cpu_pool.run(_frame_report, weekday_spending_report, date)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка отчета: {str(e)}")
@@ -171,18 +353,69 @@ async def weekdays_report(date: Optional[str] = None) -> Dict[str, float]:
 async def day_type_report(date: Optional[str] = None) -> Dict[str, float]:
     """Отчет по типам дней (рабочие/выходные)"""
     try:
-        transactions_dict = [dict(txn) for txn in transactions]
-        df = transactions_to_dataframe(transactions_dict)
-        result: Dict[str, float] = workday_weekend_spending_report(df, date)
+        result: Dict[str, float] = await cpu_pool.run(
+            _frame_report, workday_weekend_spending_report, date
+        )
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка отчета: {str(e)}")
 
 
+@app.post("/admin/reload")
+async def reload_operations(x_admin_token: Optional[str] = Header(None)) -> Dict[str, Any]:
+    """
+    Перечитывает выписку в фоне и подменяет срез операций
+
+    Запросы во время перезагрузки обслуживаются предыдущим срезом.
+    Если задан FINANCE_ADMIN_TOKEN, нужен заголовок X-Admin-Token.
+    """
+    if settings.admin_token and x_admin_token != settings.admin_token:
+        raise HTTPException(status_code=403, detail="Доступ запрещен")
+    try:
+        await io_pool.run(reloader.reload)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=f"Файл не найден: {e}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка перезагрузки: {str(e)}")
+    return {"store": operation_store.stats(), "reloader": reloader.stats()}
+
+
+@app.get("/metrics")
+async def metrics_endpoint() -> Response:
+    """Метрики в текстовом формате Prometheus: задержки маршрутов и этапов, кэши, пулы, очередь отчетов"""
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Метрики выключены")
+    return Response(metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
+
 @app.get("/health")
-async def health_check() -> Dict[str, str]:
+async def health_check() -> Dict[str, Any]:
     """Проверка здоровья приложения"""
-    return {"status": "healthy", "operations_loaded": str(len(operations))}
+    return {
+        "status": "healthy",
+        "operations_loaded": str(len(operation_store.operations)),
+        "store": operation_store.stats(),
+        "quotes": quote_cache.stats(),
+        "pools": pool_stats(),
+        "report_sink": report_sink.stats(),
+        "report_cache": report_cache.stats(),
+        "reloader": reloader.stats(),
+        "statements": statement_ingestor.stats() if statement_ingestor.enabled else None,
+        "database": operation_database.stats() if operation_database.enabled else None,
+    }
+
+
+def _investment_savings(month: str, limit: int) -> float:
+    snapshot = operation_store.snapshot
+    try:
+        year, number = parse_month(month)
+    except ValueError:
+        return investment_bank(month, snapshot.transactions, limit)  # type: ignore[arg-type]
+    return snapshot.investment.month_savings(year, number, limit)
+
+
+def _frame_report(report: Callable[..., Dict[str, float]], date: Optional[str]) -> Dict[str, float]:
+    return report(operation_store.snapshot.report_frame, date)
 
 
 @app.exception_handler(HTTPException)
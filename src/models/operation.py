@@ -1,10 +1,14 @@
+import sys
 from dataclasses import dataclass
 from datetime import datetime
 from decimal import Decimal
 from typing import Optional
 
+# Поля с небольшим числом различных значений: строки интернируются и разделяются между операциями
+INTERNED_FIELDS = ("card_number", "status", "currency", "category")
 
-@dataclass
+
+@dataclass(slots=True)
 class Operation:
     """Модель финансовой операции"""
 
@@ -43,12 +47,12 @@ class Operation:
             return cls(
                 date=datetime.strptime(str(data["Дата операции"]).strip(), "%d.%m.%Y %H:%M:%S"),
                 payment_date=payment_date,
-                card_number=str(data.get("Номер карты", "") or ""),
-                status=str(data.get("Статус", "OK") or "OK"),
+                card_number=sys.intern(str(data.get("Номер карты", "") or "")),
+                status=sys.intern(str(data.get("Статус", "OK") or "OK")),
                 amount=abs(Decimal(str(data["Сумма операции"]).replace(",", "."))),
-                currency=str(data.get("Валюта операции", "RUB") or "RUB"),
+                currency=sys.intern(str(data.get("Валюта операции", "RUB") or "RUB")),
                 cashback=Decimal(str(data.get("Кэшбэк", "0") or "0").replace(",", ".")),
-                category=str(data.get("Категория", "") or ""),
+                category=sys.intern(str(data.get("Категория", "") or "")),
                 mcc=mcc,
                 description=str(data.get("Описание", "") or ""),
                 bonuses=Decimal(str(data.get("Бонусы (включая кэшбэк)", "0") or "0").replace(",", ".")),
@@ -1,5 +1,6 @@
 from .services import (
     analyze_cashback_categories,
+    cashback_categories_from_cube,
     convert_operations_to_transactions,
     find_person_transfers,
     find_phone_transactions,
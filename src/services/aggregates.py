@@ -0,0 +1,144 @@
+from collections import defaultdict
+from dataclasses import dataclass, replace
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+
+from src.models.operation import Operation
+from src.services.date_index import DateIndex
+
+# (месяц YYYY-MM, категория, знак суммы, валюта)
+CubeKey = Tuple[str, str, int, str]
+# (категория, знак суммы, валюта)
+SliceKey = Tuple[str, int, str]
+
+
+@dataclass
+class CubeCell:
+    """Агрегаты одной ячейки куба"""
+
+    total: Decimal = Decimal("0")
+    count: int = 0
+    cashback: Decimal = Decimal("0")
+    cashback_earned: Decimal = Decimal("0")
+    bonuses: Decimal = Decimal("0")
+    rounding: Decimal = Decimal("0")
+
+    def add(self, op: Operation) -> None:
+        self.total += op.amount
+        self.count += 1
+        self.cashback += op.cashback
+        if op.cashback > 0:
+            self.cashback_earned += op.cashback
+        self.bonuses += op.bonuses
+        self.rounding += op.rounding
+
+    def merge(self, other: "CubeCell") -> None:
+        self.total += other.total
+        self.count += other.count
+        self.cashback += other.cashback
+        self.cashback_earned += other.cashback_earned
+        self.bonuses += other.bonuses
+        self.rounding += other.rounding
+
+
+def month_key(moment: datetime) -> str:
+    """Ключ месяца YYYY-MM"""
+    return f"{moment.year:04d}-{moment.month:02d}"
+
+
+def amount_sign(amount: Decimal) -> int:
+    """Знак суммы: 1, -1 или 0"""
+    return (amount > 0) - (amount < 0)
+
+
+class AggregateCube:
+    """
+    Куб агрегатов по (месяц, категория, знак, валюта).
+
+    Строится один раз при загрузке и дополняется при добавлении операций,
+    запросы к нему стоят порядка числа категорий, а не транзакций.
+    version — версия среза данных, по которому построен куб.
+    """
+
+    def __init__(self, operations: Iterable[Operation] = (), version: int = 0) -> None:
+        self._months: Dict[str, Dict[SliceKey, CubeCell]] = defaultdict(dict)
+        self.version = version
+        self.add_all(operations)
+
+    def add(self, op: Operation) -> None:
+        """Учитывает одну операцию"""
+        cells = self._months[month_key(op.date)]
+        key = (op.category, amount_sign(op.amount), op.currency)
+        cell = cells.get(key)
+        if cell is None:
+            cell = cells[key] = CubeCell()
+        cell.add(op)
+
+    def add_all(self, operations: Iterable[Operation]) -> None:
+        """Учитывает пачку операций"""
+        for op in operations:
+            self.add(op)
+
+    def copy(self, version: int) -> "AggregateCube":
+        """Независимая копия для новой версии данных"""
+        cube = AggregateCube(version=version)
+        for month, cells in self._months.items():
+            cube._months[month] = {key: replace(cell) for key, cell in cells.items()}
+        return cube
+
+    def months(self) -> List[str]:
+        """Месяцы, представленные в кубе, по возрастанию"""
+        return sorted(self._months)
+
+    def month(self, month: str) -> Dict[SliceKey, CubeCell]:
+        """Ячейки месяца (только для чтения)"""
+        return self._months.get(month, {})
+
+    def cells(self) -> Iterator[Tuple[CubeKey, CubeCell]]:
+        """Все ячейки куба"""
+        for month, cells in self._months.items():
+            for (category, sign, currency), cell in cells.items():
+                yield (month, category, sign, currency), cell
+
+
+def summarize_range(
+    cube: AggregateCube, operations: Sequence[Operation], index: DateIndex, start: datetime, end: datetime
+) -> Dict[SliceKey, CubeCell]:
+    """
+    Агрегаты операций с датой в [start, end].
+
+    Полностью попадающие в диапазон месяцы берутся из куба,
+    неполные месяцы на краях досчитываются по строкам через индекс дат.
+    """
+    lower, upper = index.span(start, end)
+    result: Dict[SliceKey, CubeCell] = {}
+    if lower == upper:
+        return result
+
+    first, last = month_key(operations[lower].date), month_key(operations[upper - 1].date)
+    for year, month in index.months():
+        key = f"{year:04d}-{month:02d}"
+        if key < first or key > last:
+            continue
+
+        month_lower, month_upper = index.month(year, month)
+        if lower <= month_lower and month_upper <= upper:
+            for slice_key, cell in cube.month(key).items():
+                result.setdefault(slice_key, CubeCell()).merge(cell)
+        else:
+            for position in range(max(lower, month_lower), min(upper, month_upper)):
+                op = operations[position]
+                slice_key = (op.category, amount_sign(op.amount), op.currency)
+                result.setdefault(slice_key, CubeCell()).add(op)
+
+    return result
+
+
+def totals_by_category(summary: Dict[SliceKey, CubeCell], sign: int) -> Dict[str, CubeCell]:
+    """Сворачивает срез по категориям для заданного знака суммы (все валюты вместе)"""
+    result: Dict[str, CubeCell] = {}
+    for (category, cell_sign, _), cell in summary.items():
+        if cell_sign == sign:
+            result.setdefault(category, CubeCell()).merge(cell)
+    return result
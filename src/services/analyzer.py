@@ -1,7 +1,9 @@
+import heapq
 from decimal import Decimal
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Sequence
 
 from src.models.operation import Operation
+from src.services.aggregates import CubeCell, SliceKey, totals_by_category
 
 
 def analyze_spending(operations: List[Operation]) -> Dict[str, Any]:
@@ -22,9 +24,19 @@ def analyze_spending(operations: List[Operation]) -> Dict[str, Any]:
     }
 
 
-def get_top_transactions(operations: List[Operation], limit: int = 5) -> List[Operation]:
+def spending_from_summary(summary: Dict[SliceKey, CubeCell]) -> Dict[str, Any]:
+    """Анализирует расходы по категориям на основе готовых агрегатов периода"""
+    by_category = {category: cell.total for category, cell in totals_by_category(summary, 1).items()}
+
+    return {
+        "total_spent": sum(by_category.values(), Decimal("0")),
+        "by_category": dict(sorted(by_category.items(), key=lambda x: x[1], reverse=True)),
+    }
+
+
+def get_top_transactions(operations: Sequence[Operation], limit: int = 5) -> List[Operation]:
     """Возвращает топ операций по сумме"""
-    return sorted(operations, key=lambda x: x.amount, reverse=True)[:limit]
+    return heapq.nlargest(limit, operations, key=lambda x: x.amount)
 
 
 def calculate_cashback(operations: List[Operation]) -> Decimal:
@@ -33,3 +45,8 @@ def calculate_cashback(operations: List[Operation]) -> Decimal:
     for op in operations:
         total += op.cashback
     return total
+
+
+def cashback_from_summary(summary: Dict[SliceKey, CubeCell]) -> Decimal:
+    """Рассчитывает общий кешбэк на основе готовых агрегатов периода"""
+    return sum((cell.cashback for cell in summary.values()), Decimal("0"))
@@ -0,0 +1,397 @@
+import json
+import logging
+import threading
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    and_,
+    case,
+    create_engine,
+    delete,
+    event,
+    func,
+    insert,
+    inspect,
+    or_,
+    select,
+)
+from sqlalchemy.engine import Engine
+
+from src.config import settings
+from src.models.operation import Operation
+from src.services.aggregates import CubeCell, SliceKey
+from src.services.operations_cache import file_digest
+from src.services.pagination import Cursor
+from src.services.search_index import fold
+from src.services.services import Transaction, convert_operations_to_transactions
+
+logger = logging.getLogger(__name__)
+
+# Денежные поля хранятся целыми копейками: суммы и агрегаты в SQL считаются без погрешности
+MINOR_UNITS = 100
+INSERT_BATCH_SIZE = 5000
+
+metadata = MetaData()
+
+sources_table = Table(
+    "sources",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("path", String, nullable=False, unique=True),
+    Column("sha256", String, nullable=False),
+    Column("rows", Integer, nullable=False),
+    # Сводка загрузки файла (строки с ошибками и пропуски) в JSON, как в кэше выписок
+    Column("report", String, nullable=False, default="{}"),
+    Column("imported_at", DateTime, nullable=False),
+)
+
+operations_table = Table(
+    "operations",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("source_id", Integer, ForeignKey("sources.id", ondelete="CASCADE"), nullable=False),
+    Column("date", DateTime, nullable=False),
+    Column("payment_date", DateTime, nullable=False),
+    Column("card_number", String, nullable=False),
+    Column("status", String, nullable=False),
+    Column("amount", Integer, nullable=False),
+    Column("currency", String, nullable=False),
+    Column("cashback", Integer, nullable=False),
+    Column("category", String, nullable=False),
+    Column("mcc", Integer),
+    Column("description", String, nullable=False),
+    Column("bonuses", Integer, nullable=False),
+    Column("rounding", Integer, nullable=False),
+    # Описание и категория в нижнем регистре (fold): поиск сравнивает готовые строки без функции на каждую строку
+    Column("description_folded", String, nullable=False),
+    Column("category_folded", String, nullable=False),
+    Index("ix_operations_date", "date"),
+    # Отчет по категории: равенство по категории и диапазон дат в одном индексе
+    Index("ix_operations_category_date", "category", "date"),
+    Index("ix_operations_source", "source_id"),
+    Index("ix_operations_mcc", "mcc"),
+    Index("ix_operations_card_number", "card_number"),
+)
+
+_MONEY_COLUMNS = ("amount", "cashback", "bonuses", "rounding")
+
+
+def _to_minor(value: Decimal) -> int:
+    return int((value * MINOR_UNITS).to_integral_value())
+
+
+def _from_minor(value: Optional[int]) -> Decimal:
+    """Копейки в рубли с двумя знаками: Decimal("150.00"), как сумма "150,00" из выписки"""
+    return Decimal(value or 0).scaleb(-2)
+
+
+def _on_sqlite_connect(connection: Any, _: Any) -> None:
+    """WAL и ослабленный fsync на коммит"""
+    cursor = connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+def _create_schema(engine: Engine) -> None:
+    """
+    Создает таблицы; база со старым набором столбцов или индексов создается заново.
+
+    База производна от выписок: строки записываются снова при следующей загрузке файлов.
+    """
+    inspector = inspect(engine)
+    for table in metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        if columns != set(table.columns.keys()) or indexes != {index.name for index in table.indexes}:
+            logger.warning(f"Схема базы {engine.url} устарела, таблицы будут созданы заново")
+            metadata.drop_all(engine)
+            break
+    metadata.create_all(engine)
+
+
+class OperationDatabase:
+    """
+    Постоянное хранилище операций в SQLite (или другой БД SQLAlchemy).
+
+    Выписка записывается один раз на содержимое файла: повторная загрузка того
+    же файла ничего не пишет, измененный файл заменяет свои строки целиком.
+    Файл, содержимое которого уже записано, загружается из базы без разбора
+    Excel (load_operations). Индексы по дате, (категории, дате), MCC и карте
+    позволяют выполнять фильтрацию по периоду и агрегаты по категориям в SQL,
+    не поднимая строки в память. При pushdown агрегаты событий по периоду,
+    отчет по категории и поиск идут запросами к базе, а не к срезу в памяти.
+    """
+
+    def __init__(self, url: str, pushdown: bool = False) -> None:
+        self.url = url
+        self.pushdown = pushdown
+        self._engine: Optional[Engine] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.url)
+
+    @property
+    def serves_queries(self) -> bool:
+        """Запросы представлений выполняются в базе"""
+        return self.enabled and self.pushdown
+
+    @property
+    def engine(self) -> Engine:
+        with self._lock:
+            if self._engine is None:
+                engine = create_engine(self.url)
+                if engine.dialect.name == "sqlite":
+                    event.listen(engine, "connect", _on_sqlite_connect)
+                _create_schema(engine)
+                self._engine = engine
+            return self._engine
+
+    def close(self) -> None:
+        with self._lock:
+            if self._engine is not None:
+                self._engine.dispose()
+                self._engine = None
+
+    def import_operations(
+        self,
+        path: str,
+        operations: Sequence[Operation],
+        digest: Optional[str] = None,
+        report: Optional[Dict[str, Any]] = None,
+    ) -> int:
+        """
+        Записывает операции выписки, если этот файл с таким содержимым еще не записан; число записанных строк.
+
+        report — сводка загрузки файла, она возвращается вместе с операциями из load_operations.
+        """
+        digest = digest or file_digest(path)
+        with self.engine.begin() as connection:
+            existing = connection.execute(
+                select(sources_table.c.id, sources_table.c.sha256).where(sources_table.c.path == path)
+            ).first()
+            if existing is not None and existing.sha256 == digest:
+                return 0
+            if existing is not None:
+                connection.execute(delete(operations_table).where(operations_table.c.source_id == existing.id))
+                connection.execute(delete(sources_table).where(sources_table.c.id == existing.id))
+
+            source_id = connection.execute(
+                insert(sources_table).values(
+                    path=path,
+                    sha256=digest,
+                    rows=len(operations),
+                    report=json.dumps(report or {}, ensure_ascii=False),
+                    imported_at=datetime.now(),
+                )
+            ).inserted_primary_key[0]
+            for start in range(0, len(operations), INSERT_BATCH_SIZE):
+                rows = [_operation_row(op, source_id) for op in operations[start:start + INSERT_BATCH_SIZE]]
+                connection.execute(insert(operations_table), rows)
+
+        logger.info(f"В базу записано {len(operations)} операций из {path}")
+        return len(operations)
+
+    def load_operations(self, path: str, digest: str) -> Optional[Tuple[List[Operation], Dict[str, Any]]]:
+        """
+        Операции файла в порядке записи и сводка его загрузки.
+
+        None, если файл с таким содержимым в базе не записан.
+        """
+        with self.engine.connect() as connection:
+            source = connection.execute(
+                select(sources_table.c.id, sources_table.c.sha256, sources_table.c.report).where(
+                    sources_table.c.path == path
+                )
+            ).first()
+            if source is None or source.sha256 != digest:
+                return None
+            c = operations_table.c
+            rows = connection.execute(select(operations_table).where(c.source_id == source.id).order_by(c.id))
+            return [_operation(row) for row in rows], json.loads(source.report)
+
+    def operations_between(
+        self, start: datetime, end: datetime, limit: Optional[int] = None, offset: int = 0
+    ) -> List[Operation]:
+        """Операции с датой в [start, end] по индексу дат"""
+        query = _in_period(select(operations_table), start, end).order_by(
+            operations_table.c.date, operations_table.c.id
+        )
+        query = query.limit(limit).offset(offset) if limit is not None else query.offset(offset)
+        with self.engine.connect() as connection:
+            return [_operation(row) for row in connection.execute(query)]
+
+    def summarize(self, start: datetime, end: datetime) -> Dict[SliceKey, CubeCell]:
+        """Агрегаты по (категория, знак, валюта) за период — то же, что OperationSnapshot.summarize"""
+        c = operations_table.c
+        sign = case((c.amount > 0, 1), (c.amount < 0, -1), else_=0).label("sign")
+        earned = func.sum(case((c.cashback > 0, c.cashback), else_=0))
+        query = _in_period(
+            select(
+                c.category,
+                sign,
+                c.currency,
+                func.sum(c.amount),
+                func.count(),
+                func.sum(c.cashback),
+                earned,
+                func.sum(c.bonuses),
+                func.sum(c.rounding),
+            ),
+            start,
+            end,
+        ).group_by(c.category, sign, c.currency)
+
+        result: Dict[SliceKey, CubeCell] = {}
+        with self.engine.connect() as connection:
+            for category, cell_sign, currency, total, count, cashback, cashback_earned, bonuses, rounding in (
+                connection.execute(query)
+            ):
+                result[(category, cell_sign, currency)] = CubeCell(
+                    total=_from_minor(total),
+                    count=count,
+                    cashback=_from_minor(cashback),
+                    cashback_earned=_from_minor(cashback_earned),
+                    bonuses=_from_minor(bonuses),
+                    rounding=_from_minor(rounding),
+                )
+        return result
+
+    def category_spending(self, category: str, months: Sequence[str]) -> Dict[str, Decimal]:
+        """
+        Траты категории (сумма модулей расходов) по месяцам YYYY-MM — то же, что по кубу агрегатов.
+
+        Каждый месяц — диапазон по индексу (категория, дата).
+        """
+        c = operations_table.c
+        result: Dict[str, Decimal] = {}
+        with self.engine.connect() as connection:
+            for month in months:
+                start = datetime.strptime(month, "%Y-%m")
+                end = start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1)
+                total = connection.execute(
+                    select(func.sum(c.amount)).where(
+                        c.category == category, c.date >= start, c.date < end, c.amount < 0
+                    )
+                ).scalar_one()
+                result[month] = abs(_from_minor(total))
+        return result
+
+    def search(
+        self,
+        query: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> List[Transaction]:
+        """Подстрочный поиск по описанию и категории без учета регистра, как simple_search; от новых к старым"""
+        return self.search_page(query, start, end, limit, offset)[0]
+
+    def search_page(
+        self,
+        query: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        after: Optional[Cursor] = None,
+    ) -> Tuple[List[Transaction], Optional[Cursor]]:
+        """
+        Страница search() после курсора after и курсор ее последней строки (дата, id).
+
+        Подстрока не ищется по индексу: строки периода (по индексу дат) просматриваются
+        целиком, но сравниваются заранее приведенные к нижнему регистру столбцы
+        встроенной instr(), без вызова Python на каждую строку.
+        """
+        c = operations_table.c
+        needle = fold(query)
+        statement = select(operations_table).where(
+            or_(func.instr(c.description_folded, needle) > 0, func.instr(c.category_folded, needle) > 0)
+        )
+        if start is not None:
+            statement = statement.where(c.date >= start)
+        if end is not None:
+            statement = statement.where(c.date <= end)
+        if after is not None:
+            statement = statement.where(or_(c.date < after.date, and_(c.date == after.date, c.id < after.row)))
+        statement = statement.order_by(c.date.desc(), c.id.desc()).offset(offset)
+        if limit is not None:
+            statement = statement.limit(limit)
+        with self.engine.connect() as connection:
+            rows = connection.execute(statement).all()
+        cursor = Cursor(rows[-1].date, rows[-1].id) if rows else None
+        return convert_operations_to_transactions(_operation(row) for row in rows), cursor
+
+    def count(self) -> int:
+        with self.engine.connect() as connection:
+            return int(connection.execute(select(func.count()).select_from(operations_table)).scalar_one())
+
+    def stats(self) -> Dict[str, Any]:
+        """Состояние базы для /health"""
+        with self.engine.connect() as connection:
+            sources = connection.execute(select(func.count()).select_from(sources_table)).scalar_one()
+        return {
+            "url": self.engine.url.render_as_string(hide_password=True),
+            "pushdown": self.pushdown,
+            "sources": sources,
+            "rows": self.count(),
+        }
+
+
+def _in_period(query: Any, start: datetime, end: datetime) -> Any:
+    return query.where(operations_table.c.date >= start, operations_table.c.date <= end)
+
+
+def _operation_row(op: Operation, source_id: int) -> Dict[str, Any]:
+    row: Dict[str, Any] = {
+        "source_id": source_id,
+        "date": op.date,
+        "payment_date": op.payment_date,
+        "card_number": op.card_number,
+        "status": op.status,
+        "currency": op.currency,
+        "category": op.category,
+        "mcc": op.mcc,
+        "description": op.description,
+        "description_folded": fold(op.description or ""),
+        "category_folded": fold(op.category or ""),
+    }
+    for name in _MONEY_COLUMNS:
+        row[name] = _to_minor(getattr(op, name))
+    return row
+
+
+def _operation(row: Any) -> Operation:
+    return Operation(
+        date=row.date,
+        payment_date=row.payment_date,
+        card_number=row.card_number,
+        status=row.status,
+        amount=_from_minor(row.amount),
+        currency=row.currency,
+        cashback=_from_minor(row.cashback),
+        category=row.category,
+        mcc=row.mcc,
+        description=row.description,
+        bonuses=_from_minor(row.bonuses),
+        rounding=_from_minor(row.rounding),
+    )
+
+
+operation_database = OperationDatabase(settings.database_url, settings.database_pushdown)
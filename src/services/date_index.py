@@ -0,0 +1,140 @@
+from bisect import bisect_left, bisect_right
+from collections.abc import Sequence
+from datetime import date, datetime
+from typing import Any, Dict, Iterator, List, Tuple, TypeVar, Union, overload
+
+T = TypeVar("T")
+
+Span = Tuple[int, int]
+
+
+class SequenceSlice(Sequence[T]):
+    """Срез последовательности без копирования элементов"""
+
+    __slots__ = ("_items", "_start", "_stop")
+
+    def __init__(self, items: Sequence[T], start: int = 0, stop: int = -1) -> None:
+        self._items = items
+        self._start = start
+        self._stop = len(items) if stop < 0 else stop
+
+    def __len__(self) -> int:
+        return self._stop - self._start
+
+    @overload
+    def __getitem__(self, index: int) -> T:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> "SequenceSlice[T]":
+        ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[T, "SequenceSlice[T]"]:
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                raise ValueError("Шаг среза не поддерживается")
+            return SequenceSlice(self._items, self._start + start, self._start + max(start, stop))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Индекс вне диапазона")
+        return self._items[self._start + index]
+
+    def __iter__(self) -> Iterator[T]:
+        items = self._items
+        for position in range(self._start, self._stop):
+            yield items[position]
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (list, tuple, SequenceSlice)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"SequenceSlice({list(self)!r})"
+
+
+class DateIndex:
+    """
+    Индекс по отсортированным датам операций.
+
+    Диапазоны ищутся бинарным поиском, границы дней, месяцев и лет
+    рассчитываются один раз при построении.
+    """
+
+    def __init__(self, dates: Sequence[datetime]) -> None:
+        self._keys: List[datetime] = list(dates)
+        self._days: Dict[date, Span] = {}
+        self._months: Dict[Tuple[int, int], Span] = {}
+        self._years: Dict[int, Span] = {}
+        self._index_from(0)
+
+    def _index_from(self, start: int) -> None:
+        for position in range(start, len(self._keys)):
+            key = self._keys[position]
+            if position and key < self._keys[position - 1]:
+                raise ValueError("Даты должны быть отсортированы по возрастанию")
+            self._extend(self._days, key.date(), position)
+            self._extend(self._months, (key.year, key.month), position)
+            self._extend(self._years, key.year, position)
+
+    def extended(self, dates: Sequence[datetime]) -> "DateIndex":
+        """
+        Индекс с датами dates, дописанными в конец (не раньше последней даты).
+
+        Исходный индекс не меняется; границы считаются только для новых дат.
+        """
+        index = DateIndex([])
+        index._keys = self._keys + list(dates)
+        index._days, index._months, index._years = dict(self._days), dict(self._months), dict(self._years)
+        index._index_from(len(self._keys))
+        return index
+
+    @staticmethod
+    def _extend(buckets: Dict[Any, Span], key: Any, position: int) -> None:
+        start, _ = buckets.get(key, (position, position))
+        buckets[key] = (start, position + 1)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def lower_bound(self, start: datetime) -> int:
+        """Позиция первой операции не раньше start"""
+        if start.hour == start.minute == start.second == start.microsecond == 0:
+            bucket = self._days.get(start.date())
+            if bucket is not None:
+                return bucket[0]
+        return bisect_left(self._keys, start)
+
+    def upper_bound(self, end: datetime) -> int:
+        """Позиция после последней операции не позже end"""
+        return bisect_right(self._keys, end)
+
+    def span(self, start: datetime, end: datetime) -> Span:
+        """Границы операций с датой в [start, end]"""
+        lower = self.lower_bound(start)
+        return lower, max(lower, self.upper_bound(end))
+
+    def day(self, day: date) -> Span:
+        """Границы операций за день"""
+        bucket = self._days.get(day)
+        return bucket if bucket is not None else self._empty(datetime(day.year, day.month, day.day))
+
+    def month(self, year: int, month: int) -> Span:
+        """Границы операций за месяц"""
+        bucket = self._months.get((year, month))
+        return bucket if bucket is not None else self._empty(datetime(year, month, 1))
+
+    def year(self, year: int) -> Span:
+        """Границы операций за год"""
+        bucket = self._years.get(year)
+        return bucket if bucket is not None else self._empty(datetime(year, 1, 1))
+
+    def months(self) -> List[Tuple[int, int]]:
+        """Месяцы, за которые есть операции, по возрастанию"""
+        return list(self._months)
+
+    def _empty(self, moment: datetime) -> Span:
+        position = bisect_left(self._keys, moment)
+        return position, position
@@ -0,0 +1,132 @@
+import re
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.models.operation import Operation
+
+# Признак операции по (описание, категория)
+Detector = Callable[[str, str], bool]
+
+PHONE_PATTERN = re.compile(r"(\+7|7|8)?[\s\-]?\(?[489][0-9]{2}\)?[\s\-]?[0-9]{3}[\s\-]?[0-9]{2}[\s\-]?[0-9]{2}")
+PERSON_NAME_PATTERN = re.compile(r"[А-Я][а-я]+\s[А-Я]\.")
+PERSON_TRANSFER_CATEGORY = "Переводы"
+
+# Флаги строки хранятся битами одного uint64
+MAX_DETECTORS = 64
+# Предел кэша результатов по различным текстам, после него кэш сбрасывается
+MEMO_MAX_ENTRIES = 200_000
+
+
+def has_phone_number(description: str, category: str = "") -> bool:
+    """В описании есть телефонный номер"""
+    return bool(PHONE_PATTERN.search(description))
+
+
+def is_person_transfer(description: str, category: str) -> bool:
+    """Перевод физическому лицу: категория «Переводы» и имя с инициалом в описании"""
+    return category == PERSON_TRANSFER_CATEGORY and bool(PERSON_NAME_PATTERN.search(description))
+
+
+class DetectionFlags:
+    """
+    Флаги операций среза: битовая маска на строку, бит на признак.
+
+    Позиции строк с признаком (по дате) вычисляются при первом обращении,
+    после этого выборка по признаку — срез готового массива.
+    """
+
+    def __init__(self, names: Sequence[str], bits: np.ndarray) -> None:
+        self.names: Tuple[str, ...] = tuple(names)
+        self.bits = bits
+        self._positions: Dict[str, np.ndarray] = {}
+
+    def column(self, name: str) -> np.ndarray:
+        """Булев столбец признака"""
+        return (self.bits & np.uint64(1 << self._bit(name))) != 0
+
+    def positions(self, name: str) -> np.ndarray:
+        """Позиции строк с признаком по возрастанию"""
+        positions = self._positions.get(name)
+        if positions is None:
+            positions = self._positions[name] = np.flatnonzero(self.column(name))
+        return positions
+
+    def count(self, name: str) -> int:
+        return len(self.positions(name))
+
+    def extended(self, other: "DetectionFlags") -> "DetectionFlags":
+        """Флаги среза, к которому в конец дописаны строки other (набор признаков тот же)"""
+        if other.names != self.names:
+            raise ValueError("Наборы признаков различаются")
+        return DetectionFlags(self.names, np.concatenate((self.bits, other.bits)))
+
+    def _bit(self, name: str) -> int:
+        try:
+            return self.names.index(name)
+        except ValueError:
+            raise KeyError(f"Неизвестный признак: {name}") from None
+
+
+class DetectorRegistry:
+    """
+    Реестр признаков операций.
+
+    classify проходит по операциям один раз и вычисляет все признаки сразу.
+    Результат запоминается по паре (описание, категория): тексты в выписке
+    повторяются, поэтому регулярные выражения выполняются один раз на текст,
+    а при добавлении операций — только для новых текстов.
+    """
+
+    def __init__(self) -> None:
+        self._detectors: Dict[str, Detector] = {}
+        self._memo: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, detector: Optional[Detector] = None) -> Callable:
+        """Регистрирует признак; можно использовать как декоратор"""
+
+        def add(func: Detector) -> Detector:
+            with self._lock:
+                if name not in self._detectors and len(self._detectors) >= MAX_DETECTORS:
+                    raise ValueError(f"Не больше {MAX_DETECTORS} признаков")
+                self._detectors[name] = func
+                self._memo = {}
+            return func
+
+        if detector is not None:
+            return add(detector)
+        return add
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._detectors)
+
+    def classify(self, operations: Sequence[Operation]) -> DetectionFlags:
+        """Флаги всех зарегистрированных признаков за один проход"""
+        with self._lock:
+            detectors = list(self._detectors.items())
+            if len(self._memo) > MEMO_MAX_ENTRIES:
+                self._memo = {}
+            memo = self._memo
+
+        bits = np.zeros(len(operations), dtype=np.uint64)
+        for position, op in enumerate(operations):
+            key = (op.description or "", op.category or "")
+            mask = memo.get(key)
+            if mask is None:
+                mask = 0
+                for bit, (_, detector) in enumerate(detectors):
+                    if detector(*key):
+                        mask |= 1 << bit
+                memo[key] = mask
+            if mask:
+                bits[position] = mask
+
+        return DetectionFlags([name for name, _ in detectors], bits)
+
+
+detectors = DetectorRegistry()
+detectors.register("has_phone", has_phone_number)
+detectors.register("is_person_transfer", is_person_transfer)
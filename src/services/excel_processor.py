@@ -1,60 +1,371 @@
+import logging
+import sys
+from dataclasses import dataclass, field, fields
 from datetime import datetime
+from decimal import Decimal, InvalidOperation
 from pathlib import Path
-from typing import Any, List, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
 import numpy as np
 import pandas as pd
+from openpyxl import load_workbook
 
-from src.models.operation import Operation
+from src.config import settings
+from src.models.operation import INTERNED_FIELDS, Operation
+from src.services.database import operation_database
+from src.services.executors import process_pool
+from src.services.metrics import metrics
+from src.services.operations_cache import cached_digest, file_digest, read_frame_cache, write_frame_cache
 
+logger = logging.getLogger(__name__)
 
-def load_operations_from_excel(file_path: str) -> List[Operation]:
+OPERATION_DATE_FORMAT = "%d.%m.%Y %H:%M:%S"
+PAYMENT_DATE_FORMAT = "%d.%m.%Y"
+
+_NAN_STRINGS = ["nan", "NaN", "NAN", ""]
+
+_Reject = Callable[[pd.Series, str, pd.Series, str], None]
+
+
+@dataclass
+class RowError:
+    """Ошибка разбора строки выписки"""
+
+    row: int
+    column: str
+    value: Any
+    message: str
+
+
+@dataclass
+class IngestionReport:
+    """Итоги загрузки выписки"""
+
+    source: str
+    total_rows: int = 0
+    loaded: int = 0
+    skipped: int = 0
+    errors: List[RowError] = field(default_factory=list)
+
+
+def load_operations_from_excel(file_path: str, use_cache: Optional[bool] = None) -> List[Operation]:
     """Загружает операции из Excel файла"""
+    operations, _ = load_operations_with_report(file_path, use_cache)
+    return operations
+
+
+@metrics.timed("excel_load")
+def load_operations_with_report(
+    file_path: str, use_cache: Optional[bool] = None, digest: Optional[str] = None
+) -> Tuple[List[Operation], IngestionReport]:
+    """
+    Загружает операции из Excel файла вместе с отчетом об ошибках строк.
+
+    Разобранная таблица сохраняется в колоночный кэш рядом с файлом, пока файл
+    и схема Operation не меняются, повторные загрузки читают кэш.
+    Если настроена база операций, выписка записывается и в нее (один раз на содержимое файла),
+    а при промахе кэша файл с уже записанным содержимым загружается из базы без разбора Excel.
+    SHA-256 файла (digest, если уже посчитан) вычисляется не больше одного раза за загрузку
+    и только если размер или mtime файла изменились с записи кэша.
+    """
+    if not Path(file_path).exists():
+        raise FileNotFoundError(f"Файл не найден: {file_path}")
+    if use_cache is None:
+        use_cache = settings.operations_cache_enabled
+
+    if digest is None and use_cache:
+        digest = cached_digest(file_path)
+    if digest is None and (use_cache or operation_database.enabled):
+        digest = file_digest(file_path)
+
+    cached = read_frame_cache(file_path, digest) if use_cache else None
+    stored = None
+    if cached is None and digest is not None and operation_database.enabled:
+        stored = operation_database.load_operations(file_path, digest)
+
+    if cached is not None:
+        frame, summary = cached
+        operations = operations_from_frame(frame)
+        report = _report_from_summary(file_path, summary)
+    elif stored is not None:
+        operations, summary = stored
+        report = _report_from_summary(file_path, summary)
+    else:
+        frame, report = process_pool.call(_read_operations_frame, file_path)
+        summary = _report_summary(report)
+        if use_cache:
+            write_frame_cache(file_path, frame, summary, digest)
+        operations = operations_from_frame(frame)
+    if operation_database.enabled and stored is None:
+        operation_database.import_operations(file_path, operations, digest, summary)
+
+    if report.errors:
+        logger.warning(f"{file_path}: пропущено строк с ошибками: {len(report.errors)}")
+        for error in report.errors:
+            logger.debug(f"Ошибка обработки строки {error.row} ({error.column}={error.value!r}): {error.message}")
+
+    return operations, report
+
+
+def iter_operation_batches(
+    file_path: str, batch_size: int = 1000, report: Optional[IngestionReport] = None
+) -> Iterator[List[Operation]]:
+    """
+    Потоково читает выписку и отдает операции пачками по batch_size.
+
+    Книга открывается в режиме read_only, в памяти одновременно находится
+    не больше одной пачки строк. Ошибки строк накапливаются в report, если он передан.
+    """
     if not Path(file_path).exists():
         raise FileNotFoundError(f"Файл не найден: {file_path}")
+    if batch_size < 1:
+        raise ValueError("batch_size должен быть положительным")
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = ["" if name is None else str(name) for name in header]
+
+        offset = 0
+        chunk: List[Sequence[Any]] = []
+        for values in rows:
+            chunk.append(values)
+            if len(chunk) == batch_size:
+                yield _parse_chunk(file_path, columns, chunk, offset, report)
+                offset += len(chunk)
+                chunk = []
+        if chunk:
+            yield _parse_chunk(file_path, columns, chunk, offset, report)
+    finally:
+        workbook.close()
+
+
+def iter_operations_from_excel(
+    file_path: str, batch_size: int = 1000, report: Optional[IngestionReport] = None
+) -> Iterator[Operation]:
+    """Потоково читает выписку и отдает операции по одной"""
+    for batch in iter_operation_batches(file_path, batch_size, report):
+        yield from batch
+
+
+def _parse_chunk(
+    file_path: str,
+    columns: List[str],
+    rows: List[Sequence[Any]],
+    offset: int,
+    report: Optional[IngestionReport],
+) -> List[Operation]:
+    """Разбирает пачку строк тем же колоночным разбором, что и полная загрузка"""
+    df = pd.DataFrame.from_records(rows, columns=columns, index=pd.RangeIndex(offset, offset + len(rows)))
+    frame, chunk_report = parse_operations_frame(df, source=file_path)
+
+    for error in chunk_report.errors:
+        logger.debug(f"Ошибка обработки строки {error.row} ({error.column}={error.value!r}): {error.message}")
+    if report is not None:
+        report.total_rows += chunk_report.total_rows
+        report.loaded += chunk_report.loaded
+        report.skipped += chunk_report.skipped
+        report.errors.extend(chunk_report.errors)
+
+    return operations_from_frame(frame)
+
 
-    df = pd.read_excel(file_path)
-    operations = []
+def parse_operations_frame(df: pd.DataFrame, source: str = "") -> Tuple[pd.DataFrame, IngestionReport]:
+    """
+    Приводит сырую выписку к колоночной таблице с полями Operation.
 
-    for _, row in df.iterrows():
+    Даты, суммы, MCC и пропуски обрабатываются целыми колонками, строки с ошибками
+    попадают в отчет и исключаются из результата.
+    """
+    report = IngestionReport(source=source, total_rows=len(df))
+    invalid = pd.Series(False, index=df.index)
+    raw_date, date_missing = _text_column(df, "Дата операции", "")
+
+    def reject(mask: pd.Series, column: str, raw: pd.Series, message: str) -> None:
+        nonlocal invalid
+        # Строки без даты операции пропускаются целиком и ошибками не считаются
+        mask = mask & ~date_missing
+        for idx in mask[mask].index:
+            report.errors.append(RowError(row=_excel_row(idx), column=column, value=raw[idx], message=message))
+        invalid |= mask
+
+    dates = pd.to_datetime(raw_date.str.strip(), format=OPERATION_DATE_FORMAT, errors="coerce")
+    reject(~date_missing & dates.isna(), "Дата операции", raw_date, f"ожидается формат {OPERATION_DATE_FORMAT}")
+
+    raw_payment, payment_missing = _text_column(df, "Дата платежа", "")
+    payment_dates = pd.to_datetime(raw_payment.str.strip(), format=PAYMENT_DATE_FORMAT, errors="coerce")
+    reject(
+        ~payment_missing & payment_dates.isna(), "Дата платежа", raw_payment, f"ожидается формат {PAYMENT_DATE_FORMAT}"
+    )
+    payment_dates = payment_dates.where(~payment_missing, dates)
+
+    amounts = _decimal_column(df, "Сумма операции", None, reject, absolute=True)
+    cashback = _decimal_column(df, "Кэшбэк", "0", reject)
+    bonuses = _decimal_column(df, "Бонусы (включая кэшбэк)", "0", reject)
+    rounding = _decimal_column(df, "Округление на инвесткопилку", "0", reject)
+
+    frame = pd.DataFrame(
+        {
+            "date": dates,
+            "payment_date": payment_dates,
+            "card_number": _text_column(df, "Номер карты", "")[0],
+            "status": _text_column(df, "Статус", "OK")[0],
+            "amount": amounts,
+            "currency": _text_column(df, "Валюта операции", "RUB")[0],
+            "cashback": cashback,
+            "category": _text_column(df, "Категория", "")[0],
+            "mcc": _mcc_column(df),
+            "description": _text_column(df, "Описание", "")[0],
+            "bonuses": bonuses,
+            "rounding": rounding,
+        },
+        index=df.index,
+    )
+
+    report.skipped = int(date_missing.sum())
+    frame = frame[~date_missing & ~invalid]
+    report.loaded = len(frame)
+    return frame, report
+
+
+def operations_from_frame(frame: pd.DataFrame) -> List[Operation]:
+    """
+    Собирает объекты Operation из колоночной таблицы.
+
+    Повторяющиеся строки и даты платежа разделяются между операциями одним объектом.
+    """
+    columns = []
+    for operation_field in fields(Operation):
+        name = operation_field.name
+        column = frame[name]
+        if name == "date":
+            columns.append(list(column.dt.to_pydatetime()))
+        elif name in ("payment_date", "description") or name in INTERNED_FIELDS:
+            columns.append(_shared_values(column, intern=name in INTERNED_FIELDS))
+        else:
+            columns.append(column.tolist())
+    return [Operation(*values) for values in zip(*columns)]
+
+
+def operations_to_frame(operations: Sequence[Operation]) -> pd.DataFrame:
+    """Колоночная таблица с полями Operation (обратное operations_from_frame)"""
+    return pd.DataFrame(
+        {
+            operation_field.name: [getattr(op, operation_field.name) for op in operations]
+            for operation_field in fields(Operation)
+        }
+    )
+
+
+def _shared_values(column: pd.Series, intern: bool = False) -> List[Any]:
+    """Значения колонки, где равные элементы представлены одним объектом"""
+    codes, uniques = pd.factorize(column)
+    if isinstance(uniques, pd.DatetimeIndex):
+        values = list(uniques.to_pydatetime())
+    else:
+        values = [sys.intern(value) if intern else value for value in uniques.tolist()]
+
+    lookup = np.empty(len(values), dtype=object)
+    lookup[:] = values
+    result: List[Any] = lookup[codes].tolist()
+    return result
+
+
+def _read_operations_frame(file_path: str) -> Tuple[pd.DataFrame, IngestionReport]:
+    """Чтение и разбор выписки; выполняется в процессном пуле, если он включен"""
+    return parse_operations_frame(pd.read_excel(file_path), source=file_path)
+
+
+def _report_from_summary(file_path: str, summary: Dict[str, Any]) -> IngestionReport:
+    """Отчет о загрузке из сводки кэша или базы"""
+    return IngestionReport(
+        source=file_path,
+        total_rows=summary["total_rows"],
+        loaded=summary["loaded"],
+        skipped=summary["skipped"],
+        errors=[RowError(**error) for error in summary["errors"]],
+    )
+
+
+def _report_summary(report: IngestionReport) -> Dict[str, Any]:
+    """Сводка загрузки для сохранения в кэше и базе"""
+    return {
+        "total_rows": report.total_rows,
+        "loaded": report.loaded,
+        "skipped": report.skipped,
+        "errors": [
+            {"row": error.row, "column": error.column, "value": _json_value(error.value), "message": error.message}
+            for error in report.errors
+        ],
+    }
+
+
+def _json_value(value: Any) -> Any:
+    """Значение ячейки в виде, пригодном для JSON"""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def _excel_row(index: Any) -> int:
+    """Номер строки в Excel (с учетом заголовка) по индексу DataFrame"""
+    return int(index) + 2
+
+
+def _text_column(df: pd.DataFrame, name: str, default: Optional[str]) -> Tuple[pd.Series, pd.Series]:
+    """Текстовая колонка: пропуски и строки вида 'nan' заменяются значением по умолчанию"""
+    if name not in df.columns:
+        return pd.Series(default, index=df.index, dtype=object), pd.Series(True, index=df.index)
+
+    column = df[name]
+    text = column.astype(str)
+    missing = column.isna() | text.isin(_NAN_STRINGS)
+    return text.astype(object).where(~missing, default), missing
+
+
+def _decimal_column(
+    df: pd.DataFrame, name: str, default: Optional[str], reject: _Reject, absolute: bool = False
+) -> pd.Series:
+    """
+    Колонка Decimal с заменой запятой на точку.
+
+    Decimal создается один раз на уникальное значение, одинаковые суммы разделяют объект.
+    """
+    text, missing = _text_column(df, name, default)
+    if default is None:
+        reject(missing, name, text, "пустое значение")
+        text = text.where(~missing, "0")
+
+    normalized = text.str.replace(",", ".", regex=False)
+    parsed: Dict[str, Optional[Decimal]] = {}
+    for value in normalized.unique():
         try:
-            operation_data = {
-                "Дата операции": _handle_nan_value(row.get("Дата операции")),
-                "Дата платежа": _handle_nan_value(row.get("Дата платежа")),
-                "Номер карты": _handle_nan_value(row.get("Номер карты", "")),
-                "Статус": _handle_nan_value(row.get("Статус", "OK")),
-                "Сумма операции": _handle_nan_value(row.get("Сумма операции")),
-                "Валюта операции": _handle_nan_value(row.get("Валюта операции", "RUB")),
-                "Кэшбэк": _handle_nan_value(row.get("Кэшбэк", "0")),
-                "Категория": _handle_nan_value(row.get("Категория", "")),
-                "MCC": _handle_nan_value(row.get("MCC")),
-                "Описание": _handle_nan_value(row.get("Описание", "")),
-                "Бонусы (включая кэшбэк)": _handle_nan_value(row.get("Бонусы (включая кэшбэк)", "0")),
-                "Округление на инвесткопилку": _handle_nan_value(row.get("Округление на инвесткопилку", "0")),
-            }
-
-            if operation_data["Дата операции"] in [None, "nan", ""]:
-                continue
-
-            operation = Operation.from_dict(operation_data)
-            operations.append(operation)
-
-        except Exception as e:
-            print(f"Ошибка обработки строки: {e}")
-            continue
+            number = Decimal(value)
+            parsed[value] = abs(number) if absolute else number
+        except (InvalidOperation, TypeError, ValueError):
+            parsed[value] = None
+
+    values = normalized.map(parsed).astype(object)
+    reject(values.isna(), name, text, "некорректное число")
+    return values
 
-    return operations
 
+def _mcc_column(df: pd.DataFrame) -> pd.Series:
+    """Колонка MCC: нечисловые и пустые значения превращаются в None"""
+    if "MCC" not in df.columns:
+        return pd.Series(None, index=df.index, dtype=object)
 
-def _handle_nan_value(value: Any) -> Optional[str]:
-    """Обрабатывает NaN значения из pandas"""
-    if pd.isna(value) or value in [None, np.nan, "nan", "NaN", "NAN"]:
-        return None
-    return str(value) if value is not None else None
+    numeric = pd.to_numeric(df["MCC"], errors="coerce")
+    numeric = numeric.where(np.isfinite(numeric))
+    codes = pd.array(np.trunc(numeric), dtype="Int64")
+    return pd.Series(codes.to_numpy(dtype=object, na_value=None), index=df.index, dtype=object)
 
 
 def filter_operations_by_date(
-    operations: List[Operation], start_date: datetime, end_date: datetime
+    operations: Iterable[Operation], start_date: datetime, end_date: datetime
 ) -> List[Operation]:
-    """Фильтрует операции по дате"""
+    """Фильтрует операции по дате (принимает и потоковый итератор)"""
     return [op for op in operations if start_date <= op.date <= end_date]
@@ -0,0 +1,142 @@
+import asyncio
+import functools
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from src.config import settings
+
+T = TypeVar("T")
+
+
+class WorkerPool:
+    """
+    Ограниченный пул для блокирующей работы.
+
+    Асинхронные обработчики отправляют сюда синхронные вызовы через run и не
+    держат цикл событий. Пул создается при первом вызове. Выключенный пул
+    (workers == 0) передает run в fallback, а call выполняет в вызывающем потоке.
+    """
+
+    def __init__(
+        self, name: str, workers: int, processes: bool = False, fallback: Optional["WorkerPool"] = None
+    ) -> None:
+        self.name = name
+        self.workers = workers
+        self.processes = processes
+        self.fallback = fallback
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._busy_seconds = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.workers > 0
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                if self.processes:
+                    # spawn: дочерние процессы не наследуют потоки и блокировки сервера
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=self.name)
+            return self._executor
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Выполняет func в пуле, не блокируя цикл событий"""
+        if not self.enabled:
+            if self.fallback is not None:
+                return await self.fallback.run(func, *args, **kwargs)
+            return self._track(functools.partial(func, *args, **kwargs))
+        call = functools.partial(func, *args, **kwargs)
+        loop = asyncio.get_running_loop()
+        if self.processes:
+            return await self._track_async(loop.run_in_executor(self._get_executor(), call))
+        return await loop.run_in_executor(self._get_executor(), self._track, call)
+
+    def call(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Синхронный вариант run для кода вне цикла событий"""
+        call = functools.partial(func, *args, **kwargs)
+        if not self.enabled:
+            # Вызывающий уже вне цикла событий: ожидание соседнего пула из его же потока могло бы зависнуть
+            return self._track(call)
+        if self.processes:
+            return self._track(self._get_executor().submit(call).result)
+        return self._get_executor().submit(self._track, call).result()
+
+    def _track(self, call: Callable[[], T]) -> T:
+        self._started()
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = call()
+            failed = False
+            return result
+        finally:
+            self._finished(time.perf_counter() - started, failed)
+
+    async def _track_async(self, future: "asyncio.Future[T]") -> T:
+        self._started()
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = await future
+            failed = False
+            return result
+        finally:
+            self._finished(time.perf_counter() - started, failed)
+
+    def _started(self) -> None:
+        with self._lock:
+            self._in_flight += 1
+
+    def _finished(self, seconds: float, failed: bool) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            self._completed += 1
+            self._failed += failed
+            self._busy_seconds += seconds
+
+    def stats(self) -> Dict[str, Any]:
+        """Размер пула, число выполняющихся и завершенных задач"""
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "in_flight": self._in_flight,
+                "completed": self._completed,
+                "failed": self._failed,
+                "busy_seconds": round(self._busy_seconds, 4),
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Сеть и файлы: запросы котировок, запись отчетов, загрузка выписок
+io_pool = WorkerPool("io", settings.io_pool_size)
+# Расчеты по срезу данных: агрегаты, pandas-отчеты, поиск
+cpu_pool = WorkerPool("cpu", settings.cpu_pool_size)
+# Разбор Excel в отдельных процессах, чтобы не занимать GIL сервера (0 — в потоках io)
+process_pool = WorkerPool("process", settings.process_pool_size, processes=True, fallback=io_pool)
+
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Статистика всех пулов"""
+    return {pool.name: pool.stats() for pool in (io_pool, cpu_pool, process_pool)}
+
+
+def shutdown_pools() -> None:
+    """Останавливает все пулы (при завершении приложения)"""
+    for pool in (io_pool, cpu_pool, process_pool):
+        pool.shutdown()
@@ -1,59 +1,146 @@
 import json
-import logging
-import os
+import threading
 from pathlib import Path
-from typing import Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 
-import requests
+from src.config import settings
+from src.services.executors import io_pool
+from src.services.market_data import market_data
+from src.services.metrics import metrics
+from src.services.quote_cache import QuoteCache
 
+CURRENCY_FALLBACK = {"USD": 1.0, "EUR": 0.85, "GBP": 0.75, "CNY": 7.0}
 
-def get_currency_rates() -> Dict[str, float]:
-    try:
-        api_url = os.getenv("CURRENCY_API_URL", "https://api.exchangerate-api.com/v4/latest/USD")
-        response = requests.get(api_url, timeout=5)
-        response.raise_for_status()
-        data = response.json()
+quote_cache = QuoteCache(
+    ttl=settings.quote_ttl_seconds,
+    stale_ttl=settings.quote_stale_seconds,
+    error_ttl=settings.quote_error_ttl_seconds,
+)
 
-        currencies = ["USD", "EUR", "GBP", "CNY"]
-        return {curr: data["rates"].get(curr, 0.0) for curr in currencies}
 
-    except Exception:
-        return {"USD": 1.0, "EUR": 0.85, "GBP": 0.75, "CNY": 7.0}
+DEFAULT_USER = "default"
+DEFAULT_PREFERENCES = {"user_currencies": ["USD", "EUR"], "user_stocks": ["AAPL", "GOOGL"]}
 
+_user_settings: Dict[str, Any] = {"key": None, "users": {}}
+_user_settings_lock = threading.Lock()
 
-def get_stock_prices() -> Dict[str, float]:
-    """Получает цены акций"""
-    try:
-        stocks = ["AAPL", "GOOGL", "MSFT", "TSLA", "AMZN"]
-        prices = {}
 
-        for stock in stocks:
-            try:
-                response = requests.get(f"https://api.iextrading.com/1.0/stock/{stock}/price", timeout=3)
-                prices[stock] = float(response.text)
-            except Exception as e:
-                logging.error(f"Ошибка в risky_operation: {e}")
-                prices[stock] = 0.0
+def get_quotes(user: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+    """
+    Курсы валют и цены акций (из кэша, если он свежий).
 
-        return prices
+    Котировки запрашиваются один раз для объединения настроенных и пользовательских
+    списков, каждому пользователю отдается его срез общего результата.
+    Без user возвращаются списки из настроек приложения.
+    """
+    currencies, stocks = quote_universe()
+    key = f"quotes:{','.join(currencies)}|{','.join(stocks)}"
+    quotes = quote_cache.get(key, lambda: _fetch_quotes(currencies, stocks), _fallback_quotes(currencies, stocks))
 
-    except Exception:
-        return {"AAPL": 150.0, "GOOGL": 2800.0, "MSFT": 300.0, "TSLA": 250.0, "AMZN": 3300.0}
+    if user is None:
+        return _select(quotes, settings.supported_currencies, settings.supported_stocks)
+    preferences = user_preferences(user)
+    return _select(quotes, preferences["user_currencies"], preferences["user_stocks"])
 
 
-def _load_config() -> Dict[str, List[str]]:  # Добавить аннотацию
+async def get_quotes_async(user: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+    """То же, что get_quotes, но не блокирует цикл событий при промахе кэша"""
+    return await io_pool.run(get_quotes, user)
+
+
+def get_currency_rates(user: Optional[str] = None) -> Dict[str, float]:
+    """Получает курсы валют (из кэша, если он свежий)"""
+    return get_quotes(user)["currencies"]
+
+
+def get_stock_prices(user: Optional[str] = None) -> Dict[str, float]:
+    """Получает цены акций (из кэша, если он свежий)"""
+    return get_quotes(user)["stocks"]
+
+
+def warm_quote_cache() -> None:
+    """Заполняет кэш котировок, чтобы первые запросы не ждали сеть"""
+    get_quotes()
+
+
+def quote_universe() -> Tuple[List[str], List[str]]:
+    """Объединение валют и тикеров из настроек и из настроек всех пользователей"""
+    currencies = dict.fromkeys(settings.supported_currencies)
+    stocks = dict.fromkeys(settings.supported_stocks)
+    for preferences in load_user_settings().values():
+        currencies.update(dict.fromkeys(preferences["user_currencies"]))
+        stocks.update(dict.fromkeys(preferences["user_stocks"]))
+    return list(currencies), list(stocks)
+
+
+def user_preferences(user: str) -> Dict[str, List[str]]:
+    """Списки валют и акций пользователя (для неизвестного — списки по умолчанию)"""
+    users = load_user_settings()
+    return users.get(user) or users.get(DEFAULT_USER) or DEFAULT_PREFERENCES
+
+
+def load_user_settings() -> Dict[str, Dict[str, List[str]]]:
+    """
+    Настройки пользователей: {user: {"user_currencies": [...], "user_stocks": [...]}}.
+
+    Файл с полями user_currencies/user_stocks верхнего уровня описывает одного
+    пользователя default, файл с ключом users — нескольких.
+    Перечитывается только при изменении файла.
+    """
+    path = _user_settings_path()
+    key = (str(path), path.stat().st_mtime_ns) if path is not None else None
+    with _user_settings_lock:
+        if _user_settings["key"] == key and key is not None:
+            return _user_settings["users"]  # type: ignore[no-any-return]
+
+    users: Dict[str, Dict[str, List[str]]] = {}
+    if path is not None:
+        data = json.loads(path.read_text())
+        entries = data["users"] if "users" in data else {DEFAULT_USER: data}
+        for name, entry in entries.items():
+            users[name] = {field: entry.get(field, default) for field, default in DEFAULT_PREFERENCES.items()}
+
+    with _user_settings_lock:
+        _user_settings["key"], _user_settings["users"] = key, users
+    return users
+
+
+def _select(
+    quotes: Dict[str, Dict[str, float]], currencies: List[str], stocks: List[str]
+) -> Dict[str, Dict[str, float]]:
+    return {
+        "currencies": {curr: quotes["currencies"].get(curr, 0.0) for curr in currencies},
+        "stocks": {stock: quotes["stocks"].get(stock, 0.0) for stock in stocks},
+    }
+
+
+def _fallback_quotes(currencies: List[str], stocks: List[str]) -> Dict[str, Dict[str, float]]:
+    return {
+        "currencies": {curr: CURRENCY_FALLBACK.get(curr, 0.0) for curr in currencies},
+        "stocks": dict.fromkeys(stocks, 0.0),
+    }
+
+
+@metrics.timed("quote_fetch")
+def _fetch_quotes(currencies: List[str], stocks: List[str]) -> Dict[str, Dict[str, float]]:
+    """Валюты и все тикеры запрашиваются одновременно через общий пул соединений"""
+    quotes = market_data.run_sync(market_data.fetch_quotes(stocks, currencies))
+    fallback = _fallback_quotes(currencies, stocks)
+    return {name: quotes[name] if quotes[name] is not None else fallback[name] for name in fallback}
+
+
+def _user_settings_path() -> Optional[Path]:
     config_paths = [
+        Path(settings.user_settings_path),
         Path("config/user_settings.json"),
         Path("src/config/user_settings.json"),
         Path("user_settings.json"),
     ]
-
     for path in config_paths:
         if path.exists():
-            data = json.loads(path.read_text())
-            return {
-                "user_currencies": data.get("user_currencies", ["USD", "EUR"]),
-                "user_stocks": data.get("user_stocks", ["AAPL", "GOOGL"]),
-            }
+            return path
+    return None
+
 
-    return {"user_currencies": ["USD", "EUR"], "user_stocks": ["AAPL", "GOOGL"]}
+def _load_config() -> Dict[str, List[str]]:
+    return user_preferences(DEFAULT_USER)
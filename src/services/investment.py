@@ -0,0 +1,99 @@
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from src.models.operation import Operation
+from src.services.date_index import DateIndex
+
+# Суммы хранятся в копейках: округление до лимита считается в целых числах без погрешности float
+MINOR_UNITS = 100
+BANK_KEY = "bank"
+
+Month = Tuple[int, int]
+
+
+def to_minor_units(values: Iterable[Decimal]) -> np.ndarray:
+    """Модули сумм в копейках (int64)"""
+    cent = Decimal(1)
+    return np.fromiter(
+        (int((abs(value) * MINOR_UNITS).quantize(cent, rounding=ROUND_HALF_UP)) for value in values), dtype=np.int64
+    )
+
+
+def round_up_minor(amounts: np.ndarray, limit: int) -> np.ndarray:
+    """Отчисления в копилку: до ближайшего сверху кратного limit рублей (0, если сумма уже кратна)"""
+    return np.negative(amounts) % (limit * MINOR_UNITS)
+
+
+def parse_month(month: str) -> Month:
+    """YYYY-MM -> (год, месяц)"""
+    year, number = month.split("-")
+    if len(year) != 4 or not 1 <= int(number) <= 12:
+        raise ValueError(f"Неверный месяц: {month}")
+    return int(year), int(number)
+
+
+def last_months(end: Month, count: int) -> List[Month]:
+    """count месяцев, заканчивая end, по возрастанию"""
+    year, month = end
+    months = []
+    for _ in range(count):
+        months.append((year, month))
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    return months[::-1]
+
+
+class InvestmentEngine:
+    """
+    Расчет инвесткопилки по срезу операций.
+
+    Суммы и столбец округления банка переводятся в копейки один раз.
+    Операции отсортированы по дате, поэтому месяцы — соседние отрезки:
+    отчисления для каждого лимита считаются по всему диапазону сразу,
+    а итоги месяцев берутся разностью накопленных сумм.
+    """
+
+    def __init__(self, operations: Sequence[Operation], index: DateIndex) -> None:
+        self.index = index
+        self.amounts = to_minor_units(op.amount for op in operations)
+        self.bank_rounding = to_minor_units(op.rounding for op in operations)
+
+    def extended(self, operations: Sequence[Operation], index: DateIndex) -> "InvestmentEngine":
+        """Расчет для среза, к которому в конец дописаны operations; index — индекс нового среза"""
+        engine = InvestmentEngine([], index)
+        engine.amounts = np.concatenate((self.amounts, to_minor_units(op.amount for op in operations)))
+        engine.bank_rounding = np.concatenate((self.bank_rounding, to_minor_units(op.rounding for op in operations)))
+        return engine
+
+    def savings(self, months: Sequence[Month], limits: Sequence[int]) -> Dict[str, Dict[str, float]]:
+        """
+        Сумма в копилку по месяцам для каждого лимита (в рублях).
+
+        Результат: {"YYYY-MM": {"<лимит>": сумма, ..., "bank": округление банка}}.
+        """
+        if any(limit <= 0 for limit in limits):
+            raise ValueError("Лимит должен быть положительным")
+        spans = [self.index.month(year, month) for year, month in months]
+        if not spans:
+            return {}
+
+        first = min(start for start, _ in spans)
+        last = max(stop for _, stop in spans)
+        amounts = self.amounts[first:last]
+        columns = {str(limit): round_up_minor(amounts, limit) for limit in limits}
+        columns[BANK_KEY] = self.bank_rounding[first:last]
+
+        totals = {
+            key: np.concatenate(([0], np.cumsum(column, dtype=np.int64))) for key, column in columns.items()
+        }
+        return {
+            f"{year:04d}-{month:02d}": {
+                key: int(total[stop - first] - total[start - first]) / MINOR_UNITS for key, total in totals.items()
+            }
+            for (year, month), (start, stop) in zip(months, spans)
+        }
+
+    def month_savings(self, year: int, month: int, limit: int) -> float:
+        """Сумма в копилку за один месяц"""
+        return self.savings([(year, month)], [limit])[f"{year:04d}-{month:02d}"][str(limit)]
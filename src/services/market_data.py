@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import threading
+from typing import Any, Coroutine, Dict, List, Optional, TypeVar
+
+import httpx
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class MarketDataClient:
+    """
+    Асинхронный клиент котировок.
+
+    Все запросы идут через один httpx.AsyncClient с пулом keep-alive соединений.
+    Тикеры запрашиваются одним пакетным запросом market/batch; если провайдер
+    его не поддерживает — параллельными одиночными запросами (не больше
+    max_parallel одновременно). У каждого запроса свой таймаут, у пачки общий
+    дедлайн, поэтому задержка определяется самым медленным тикером, а не суммой.
+    Синхронный код вызывает клиента через run_sync: корутины выполняются
+    в собственном фоновом цикле событий, которому принадлежит пул соединений.
+    """
+
+    def __init__(
+        self,
+        stock_api_base: str,
+        currency_api_url: str,
+        symbol_timeout: float = 3.0,
+        deadline: float = 5.0,
+        max_connections: int = 10,
+        max_parallel: int = 8,
+        batch_size: int = 100,
+        batch_enabled: bool = True,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ) -> None:
+        self.stock_api_base = stock_api_base.rstrip("/")
+        self.currency_api_url = currency_api_url
+        self.symbol_timeout = symbol_timeout
+        self.deadline = deadline
+        self.max_connections = max_connections
+        self.max_parallel = max_parallel
+        self.batch_size = batch_size
+        self.batch_enabled = batch_enabled
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.symbol_timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections, max_keepalive_connections=self.max_connections
+                ),
+                transport=self._transport,
+            )
+        return self._client
+
+    async def fetch_stock_prices(self, symbols: List[str]) -> Dict[str, float]:
+        """Цены тикеров; не полученные вовремя получают 0.0"""
+        symbols = list(dict.fromkeys(symbols))
+        deadline_at = asyncio.get_running_loop().time() + self.deadline
+        prices: Dict[str, float] = {}
+        if self.batch_enabled and symbols:
+            prices = await self._fetch_batches(symbols, min(self.symbol_timeout, self.deadline))
+
+        missing = [symbol for symbol in symbols if symbol not in prices]
+        if missing:
+            remaining = max(0.0, deadline_at - asyncio.get_running_loop().time())
+            prices.update(await self._fetch_singles(missing, remaining))
+
+        if symbols and all(prices[symbol] == 0.0 for symbol in symbols):
+            raise ConnectionError("Не удалось получить ни одной цены акций")
+        return {symbol: prices[symbol] for symbol in symbols}
+
+    async def _fetch_batches(self, symbols: List[str], timeout: float) -> Dict[str, float]:
+        """Пакетные запросы market/batch по batch_size тикеров"""
+        chunks = [symbols[i:i + self.batch_size] for i in range(0, len(symbols), self.batch_size)]
+        try:
+            results = await asyncio.wait_for(
+                asyncio.gather(*(self._fetch_batch(chunk) for chunk in chunks)), timeout=timeout
+            )
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code in (400, 404, 405, 501):
+                logger.warning(f"Пакетный запрос котировок не поддерживается, переходим на одиночные: {e}")
+                self.batch_enabled = False
+            else:
+                logger.error(f"Ошибка пакетного запроса котировок: {e}")
+            return {}
+        except Exception as e:
+            logger.error(f"Ошибка пакетного запроса котировок: {e!r}")
+            return {}
+
+        prices: Dict[str, float] = {}
+        for result in results:
+            prices.update(result)
+        return prices
+
+    async def _fetch_batch(self, symbols: List[str]) -> Dict[str, float]:
+        response = await self._http().get(
+            f"{self.stock_api_base}/market/batch", params={"symbols": ",".join(symbols), "types": "price"}
+        )
+        response.raise_for_status()
+        data = {key.upper(): value for key, value in response.json().items()}
+        return {
+            symbol: float(data[symbol.upper()]["price"])
+            for symbol in symbols
+            if isinstance(data.get(symbol.upper()), dict) and data[symbol.upper()].get("price") is not None
+        }
+
+    async def _fetch_singles(self, symbols: List[str], timeout: float) -> Dict[str, float]:
+        """Одиночные запросы, не больше max_parallel одновременно"""
+        semaphore = asyncio.Semaphore(self.max_parallel)
+
+        async def fetch(symbol: str) -> float:
+            async with semaphore:
+                return await self._fetch_price(symbol)
+
+        tasks = {symbol: asyncio.ensure_future(fetch(symbol)) for symbol in symbols}
+        _, pending = await asyncio.wait(tasks.values(), timeout=timeout)
+        for task in pending:
+            task.cancel()
+
+        prices: Dict[str, float] = {}
+        for symbol, task in tasks.items():
+            if task.done() and not task.cancelled() and task.exception() is None:
+                prices[symbol] = task.result()
+            else:
+                error = task.exception() if task.done() and not task.cancelled() else "превышен дедлайн"
+                logger.error(f"Ошибка получения цены {symbol}: {error}")
+                prices[symbol] = 0.0
+        return prices
+
+    async def _fetch_price(self, symbol: str) -> float:
+        response = await asyncio.wait_for(
+            self._http().get(f"{self.stock_api_base}/{symbol}/price"), timeout=self.symbol_timeout
+        )
+        response.raise_for_status()
+        return float(response.text)
+
+    async def fetch_currency_rates(self, currencies: List[str]) -> Dict[str, float]:
+        """Курсы валют из одного запроса к API курсов"""
+        response = await asyncio.wait_for(self._http().get(self.currency_api_url), timeout=self.deadline)
+        response.raise_for_status()
+        rates = response.json()["rates"]
+        return {currency: rates.get(currency, 0.0) for currency in currencies}
+
+    async def fetch_quotes(self, symbols: List[str], currencies: List[str]) -> Dict[str, Any]:
+        """
+        Курсы валют и цены акций одновременно.
+
+        Неудавшаяся часть возвращается как None, исключение только если не удалось ничего.
+        """
+        results = await asyncio.gather(
+            self.fetch_currency_rates(currencies), self.fetch_stock_prices(symbols), return_exceptions=True
+        )
+        quotes: Dict[str, Any] = {}
+        for name, result in zip(("currencies", "stocks"), results):
+            if isinstance(result, BaseException):
+                logger.error(f"Ошибка получения котировок ({name}): {result}")
+                quotes[name] = None
+            else:
+                quotes[name] = result
+
+        if quotes["currencies"] is None and quotes["stocks"] is None:
+            raise ConnectionError("Сервисы котировок недоступны")
+        return quotes
+
+    def run_sync(self, coro: Coroutine[Any, Any, T]) -> T:
+        """Выполняет корутину клиента в его фоновом цикле событий и ждет результат"""
+        future = asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+        return future.result(timeout=self.deadline + 1.0)
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="market-data", daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def close(self) -> None:
+        """Закрывает пул соединений и останавливает фоновый цикл"""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+
+        if self._client is not None:
+            asyncio.run_coroutine_threadsafe(self._client.aclose(), loop).result(timeout=self.deadline)
+            self._client = None
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not None:
+            thread.join(timeout=self.deadline)
+        loop.close()
+
+
+market_data = MarketDataClient(
+    stock_api_base=settings.stock_api_base,
+    currency_api_url=settings.currency_api_url,
+    symbol_timeout=settings.quote_symbol_timeout_seconds,
+    deadline=settings.quote_deadline_seconds,
+    max_connections=settings.quote_max_connections,
+    max_parallel=settings.quote_max_parallel,
+    batch_size=settings.quote_batch_size,
+    batch_enabled=settings.quote_batch_enabled,
+)
@@ -0,0 +1,246 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from typing import Any, Callable, ContextManager, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from src.config import settings
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+PREFIX = "finance"
+
+# Границы корзин в секундах: от быстрых ответов из кэша до разбора больших выписок
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Гистограмма длительностей с фиксированными корзинами (счетчики по корзинам, сумма, число)"""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def lines(self, name: str, labels: Labels) -> Iterator[str]:
+        cumulative = 0
+        for bound, count in zip((*self.buckets, float("inf")), self.counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            yield f"{name}_bucket{_format_labels((*labels, ('le', le)))} {cumulative}"
+        yield f"{name}_sum{_format_labels(labels)} {self.sum!r}"
+        yield f"{name}_count{_format_labels(labels)} {cumulative}"
+
+
+class Metrics:
+    """
+    Метрики процесса в текстовом формате Prometheus.
+
+    Задержки запросов — гистограммы по (метод, шаблон маршрута), плюс число
+    запросов по статусу, ошибок (5xx и исключений) и запросов в работе.
+    Внутренние этапы (загрузка Excel, конвертация, DataFrame, groupby,
+    котировки, запись отчетов) замеряются stage()/timed() в гистограмму
+    по имени этапа. Статистика кэшей, пулов и очереди отчетов снимается в
+    момент render() из зарегистрированных функций stats().
+    Запись — несколько операций под одной блокировкой, без выделения памяти
+    на горячем пути после первого запроса к маршруту.
+    """
+
+    def __init__(self, enabled: bool = True, buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._requests: Dict[Labels, Histogram] = {}
+        self._statuses: Dict[Labels, int] = {}
+        self._errors: Dict[Labels, int] = {}
+        self._stages: Dict[str, Histogram] = {}
+        self._in_flight = 0
+        self._collectors: List[Tuple[str, Callable[[], Dict[str, Any]], Optional[str]]] = []
+
+    def request_started(self) -> None:
+        with self._lock:
+            self._in_flight += 1
+
+    def request_finished(self, method: str, route: str, status: int, seconds: float, failed: bool = False) -> None:
+        labels: Labels = (("method", method), ("route", route))
+        with self._lock:
+            self._in_flight -= 1
+            histogram = self._requests.get(labels)
+            if histogram is None:
+                histogram = self._requests[labels] = Histogram(self.buckets)
+            histogram.observe(seconds)
+            status_labels = (*labels, ("status", str(status)))
+            self._statuses[status_labels] = self._statuses.get(status_labels, 0) + 1
+            if failed or status >= 500:
+                self._errors[labels] = self._errors.get(labels, 0) + 1
+
+    def observe_stage(self, name: str, seconds: float) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._stages.get(name)
+            if histogram is None:
+                histogram = self._stages[name] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def stage(self, name: str) -> ContextManager[None]:
+        """Замер этапа: with metrics.stage("pandas_groupby"): ..."""
+        return self._stage(name) if self.enabled else nullcontext()
+
+    @contextmanager
+    def _stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_stage(name, time.perf_counter() - started)
+
+    def timed(self, name: str) -> Callable:
+        """Декоратор: каждый вызов функции — замер этапа name"""
+
+        def decorator(func: Callable) -> Callable:
+            @wraps(func)
+            def wrapper(*args: Any, **kwargs: Any) -> Any:
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                started = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe_stage(name, time.perf_counter() - started)
+
+            return wrapper
+
+        return decorator
+
+    def register_stats(self, prefix: str, stats: Callable[[], Dict[str, Any]], label: Optional[str] = None) -> None:
+        """
+        Числовые поля stats() экспортируются как {PREFIX}_{prefix}_{поле}.
+
+        С label stats() возвращает {значение метки: поля}, например пулы по имени.
+        """
+        self._collectors.append((prefix, stats, label))
+
+    def render(self) -> str:
+        """Все метрики в текстовом формате Prometheus 0.0.4"""
+        with self._lock:
+            requests = {labels: self._copy(histogram) for labels, histogram in self._requests.items()}
+            statuses = dict(self._statuses)
+            errors = dict(self._errors)
+            stages = {name: self._copy(histogram) for name, histogram in self._stages.items()}
+            in_flight = self._in_flight
+
+        lines: List[str] = []
+        name = f"{PREFIX}_http_request_duration_seconds"
+        lines += [f"# HELP {name} Длительность запросов по маршрутам", f"# TYPE {name} histogram"]
+        for labels, histogram in sorted(requests.items()):
+            lines.extend(histogram.lines(name, labels))
+
+        name = f"{PREFIX}_http_requests_total"
+        lines += [f"# HELP {name} Число запросов по маршрутам и статусам", f"# TYPE {name} counter"]
+        lines += [f"{name}{_format_labels(labels)} {count}" for labels, count in sorted(statuses.items())]
+
+        name = f"{PREFIX}_http_request_errors_total"
+        lines += [f"# HELP {name} Ответы 5xx и необработанные исключения", f"# TYPE {name} counter"]
+        lines += [f"{name}{_format_labels(labels)} {count}" for labels, count in sorted(errors.items())]
+
+        name = f"{PREFIX}_http_requests_in_flight"
+        lines += [f"# HELP {name} Запросы в работе", f"# TYPE {name} gauge", f"{name} {in_flight}"]
+
+        name = f"{PREFIX}_stage_duration_seconds"
+        lines += [f"# HELP {name} Длительность внутренних этапов", f"# TYPE {name} histogram"]
+        for stage, histogram in sorted(stages.items()):
+            lines.extend(histogram.lines(name, (("stage", stage),)))
+
+        for prefix, stats, label in self._collectors:
+            lines.extend(self._stats_lines(prefix, stats, label))
+        return "\n".join(lines) + "\n"
+
+    def _copy(self, histogram: Histogram) -> Histogram:
+        copy = Histogram(histogram.buckets)
+        copy.counts = list(histogram.counts)
+        copy.sum = histogram.sum
+        return copy
+
+    def _stats_lines(self, prefix: str, stats: Callable[[], Dict[str, Any]], label: Optional[str]) -> List[str]:
+        try:
+            values = stats()
+        except Exception:
+            return []
+        groups = values.items() if label else [(None, values)]
+        series: Dict[str, List[str]] = {}
+        for group, fields in groups:
+            labels: Labels = ((label, str(group)),) if label else ()
+            for field, value in fields.items():
+                if isinstance(value, bool):
+                    value = int(value)
+                if not isinstance(value, (int, float)):
+                    continue
+                name = f"{PREFIX}_{prefix}_{field}"
+                series.setdefault(name, []).append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        lines: List[str] = []
+        for name, samples in series.items():
+            lines.append(f"# TYPE {name} gauge")
+            lines.extend(samples)
+        return lines
+
+
+class MetricsMiddleware:
+    """ASGI-middleware: задержка, статус и ошибки каждого HTTP-запроса по шаблону маршрута"""
+
+    def __init__(self, app: Any, registry: Optional[Metrics] = None) -> None:
+        self.app = app
+        self.registry = registry or metrics
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http" or not self.registry.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        failed = False
+
+        async def send_with_status(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        self.registry.request_started()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            # Шаблон маршрута ("/events/{date_str}"), а не путь: число рядов не растет с параметрами
+            route = getattr(scope.get("route"), "path", None) or "<unmatched>"
+            self.registry.request_finished(scope["method"], route, status, time.perf_counter() - started, failed)
+
+
+metrics = Metrics(enabled=settings.metrics_enabled)
@@ -0,0 +1,181 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from dataclasses import fields
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.models.operation import Operation
+
+logger = logging.getLogger(__name__)
+
+# Меняется при изменении формата файлов кэша
+CACHE_FORMAT_VERSION = 1
+
+_DATETIME_COLUMNS = ("date", "payment_date")
+_DECIMAL_COLUMNS = ("amount", "cashback", "bonuses", "rounding")
+_MCC_MISSING = -1
+
+
+def schema_fingerprint() -> str:
+    """Отпечаток схемы Operation: изменение модели делает старый кэш недействительным"""
+    schema = ",".join(f"{item.name}:{item.type}" for item in fields(Operation))
+    return hashlib.sha1(f"{CACHE_FORMAT_VERSION}|{schema}".encode()).hexdigest()[:12]
+
+
+def file_digest(file_path: str) -> str:
+    """SHA-256 содержимого файла"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_dir_for(file_path: str) -> Path:
+    """Каталог кэша рядом с файлом выписки: data/.operations.xlsx.cache"""
+    path = Path(file_path)
+    return path.parent / f".{path.name}.cache"
+
+
+def cached_digest(file_path: str) -> Optional[str]:
+    """
+    SHA-256 файла из метаданных кэша, если размер и mtime файла с тех пор не изменились.
+
+    Позволяет не хешировать выписку целиком при каждой загрузке; None — файл
+    нужно хешировать (кэша нет, файл изменен или только тронут).
+    """
+    cache_dir = cache_dir_for(file_path)
+    if not cache_dir.is_dir():
+        return None
+    stat = os.stat(file_path)
+    for entry in cache_dir.glob(f"{schema_fingerprint()}-*"):
+        try:
+            source = json.loads((entry / "meta.json").read_text(encoding="utf-8"))["source"]
+        except (OSError, ValueError, KeyError):
+            continue
+        if (source["size"], source["mtime_ns"]) == (stat.st_size, stat.st_mtime_ns):
+            return str(source["sha256"])
+    return None
+
+
+def read_frame_cache(file_path: str, digest: Optional[str] = None) -> Optional[Tuple[pd.DataFrame, Dict[str, Any]]]:
+    """
+    Читает колоночный кэш разобранной выписки.
+
+    Возвращает таблицу с полями Operation и сохраненную сводку загрузки
+    или None, если кэша нет либо файл выписки/схема изменились.
+    digest — SHA-256 файла, если уже известен; иначе он берется из метаданных
+    кэша при совпадении размера и mtime и только при расхождении считается по файлу.
+    """
+    stat = os.stat(file_path)
+    digest = digest or cached_digest(file_path) or file_digest(file_path)
+    entry = cache_dir_for(file_path) / f"{schema_fingerprint()}-{digest[:24]}"
+    meta_path = entry / "meta.json"
+    if not meta_path.exists():
+        return None
+
+    try:
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        if meta["source"]["size"] != stat.st_size:
+            return None
+
+        frame = read_columns(entry, meta["columns"])
+        if meta["source"]["mtime_ns"] != stat.st_mtime_ns:
+            # Содержимое то же, файл только тронут: следующая загрузка обойдется без хеширования
+            meta["source"]["mtime_ns"] = stat.st_mtime_ns
+            meta_path.write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+    except Exception as e:
+        logger.warning(f"Кэш {entry} поврежден и будет пересоздан: {e}")
+        return None
+
+    logger.info(f"Операции прочитаны из кэша {entry}")
+    return frame, meta["report"]
+
+
+def write_frame_cache(
+    file_path: str, frame: pd.DataFrame, report: Dict[str, Any], digest: Optional[str] = None
+) -> Optional[Path]:
+    """Сохраняет разобранную таблицу операций в колоночный кэш рядом с выпиской; digest — SHA-256 файла"""
+    stat = os.stat(file_path)
+    digest = digest or file_digest(file_path)
+    cache_dir = cache_dir_for(file_path)
+    entry = cache_dir / f"{schema_fingerprint()}-{digest[:24]}"
+
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_dir = Path(tempfile.mkdtemp(prefix=".tmp-", dir=cache_dir))
+        write_columns(tmp_dir, frame)
+
+        meta = {
+            "format": CACHE_FORMAT_VERSION,
+            "schema": schema_fingerprint(),
+            "source": {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest},
+            "rows": len(frame),
+            "columns": list(frame.columns),
+            "report": report,
+        }
+        (tmp_dir / "meta.json").write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+
+        if entry.exists():
+            shutil.rmtree(entry)
+        os.rename(tmp_dir, entry)
+    except OSError as e:
+        logger.warning(f"Не удалось сохранить кэш операций {entry}: {e}")
+        return None
+
+    # Старые поколения кэша больше не нужны
+    for stale in cache_dir.iterdir():
+        if stale != entry and not stale.name.startswith(".tmp-"):
+            shutil.rmtree(stale, ignore_errors=True)
+
+    return entry
+
+
+def write_columns(directory: Path, frame: pd.DataFrame) -> None:
+    """Пишет колонки таблицы с полями Operation в каталог (формат кэша выписок)"""
+    for name in frame.columns:
+        _write_column(directory, name, frame[name])
+
+
+def read_columns(directory: Path, names: Iterable[str]) -> pd.DataFrame:
+    """Читает колонки, записанные write_columns"""
+    return pd.DataFrame({name: _read_column(directory, name) for name in names})
+
+
+def _write_column(directory: Path, name: str, column: pd.Series) -> None:
+    """Пишет колонку: даты и MCC как числовые массивы, остальное словарным кодированием"""
+    if name in _DATETIME_COLUMNS:
+        np.save(directory / f"{name}.npy", column.to_numpy(dtype="datetime64[ns]"))
+    elif name == "mcc":
+        values = pd.array(column.tolist(), dtype="Int64").to_numpy(dtype=np.int64, na_value=_MCC_MISSING)
+        np.save(directory / f"{name}.npy", values)
+    else:
+        codes, uniques = pd.factorize(column)
+        np.save(directory / f"{name}.codes.npy", codes.astype(np.int32))
+        (directory / f"{name}.values.json").write_text(
+            json.dumps([str(value) for value in uniques], ensure_ascii=False), encoding="utf-8"
+        )
+
+
+def _read_column(directory: Path, name: str) -> Any:
+    """Читает колонку, числовые массивы отображаются в память"""
+    if name in _DATETIME_COLUMNS:
+        return np.load(directory / f"{name}.npy", mmap_mode="r")
+    if name == "mcc":
+        codes = np.load(directory / f"{name}.npy", mmap_mode="r")
+        return pd.Series([None if code == _MCC_MISSING else code for code in codes.tolist()], dtype=object)
+
+    values = json.loads((directory / f"{name}.values.json").read_text(encoding="utf-8"))
+    if name in _DECIMAL_COLUMNS:
+        values = [Decimal(value) for value in values]
+    lookup = np.empty(len(values), dtype=object)
+    lookup[:] = values
+    return lookup[np.load(directory / f"{name}.codes.npy", mmap_mode="r")]
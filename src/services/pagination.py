@@ -0,0 +1,58 @@
+import base64
+import binascii
+from datetime import datetime
+from typing import Callable, Iterator, List, NamedTuple, Optional, Tuple
+
+# Строк в одной порции NDJSON-потока: ограничивает память и задержку первого байта
+STREAM_PAGE_SIZE = 1000
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class Cursor(NamedTuple):
+    """Позиция в выдаче: дата и номер последней отданной строки (выдача — по этой паре по убыванию)"""
+
+    date: datetime
+    row: int
+
+
+# Страница выдачи: (after, offset, limit) -> (JSON строк, курсор последней строки)
+PageFetcher = Callable[[Optional[Cursor], int, Optional[int]], Tuple[List[bytes], Optional[Cursor]]]
+
+
+def encode_cursor(cursor: Cursor) -> str:
+    """Непрозрачный токен курсора для query-параметра"""
+    raw = f"{cursor.date.isoformat()}|{cursor.row}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Cursor:
+    """Курсор из токена; ValueError, если токен поврежден"""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        moment, row = raw.rsplit("|", 1)
+        return Cursor(datetime.fromisoformat(moment), int(row))
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError(f"Неверный курсор: {token}") from e
+
+
+def iter_ndjson(
+    fetch: PageFetcher, after: Optional[Cursor] = None, offset: int = 0, limit: Optional[int] = None
+) -> Iterator[bytes]:
+    """
+    Строки выдачи в формате NDJSON порциями по STREAM_PAGE_SIZE.
+
+    Каждая порция запрашивается от курсора предыдущей, так что в памяти
+    держится одна порция, а первая отдается, не дожидаясь остальных.
+    """
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = STREAM_PAGE_SIZE if remaining is None else min(STREAM_PAGE_SIZE, remaining)
+        rows, after = fetch(after, offset, size)
+        if rows:
+            yield b"\n".join(rows) + b"\n"
+        if len(rows) < size or after is None:
+            return
+        offset = 0
+        if remaining is not None:
+            remaining -= len(rows)
@@ -0,0 +1,176 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+@dataclass
+class _Entry:
+    """Закэшированное значение котировок"""
+
+    value: Any
+    fetched_at: float
+    failed: bool = False
+    refreshing: bool = False
+    retry_at: float = 0.0
+
+
+class QuoteCache:
+    """
+    Кэш котировок с TTL и обновлением в фоне (stale-while-revalidate).
+
+    Свежее значение отдается сразу. Устаревшее, но не старше ttl + stale_ttl,
+    тоже отдается сразу, а обновление запускается в фоне. Ошибки загрузки
+    кэшируются на error_ttl вместе с запасным значением.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        stale_ttl: float,
+        error_ttl: float,
+        refresh_workers: int = 2,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.error_ttl = error_ttl
+        self._clock = clock
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._executor = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix="quote-refresh")
+        self._pending: List[Future] = []
+        self._counters: Dict[str, int] = dict.fromkeys(
+            ("hits", "stale_hits", "negative_hits", "misses", "refreshes", "errors"), 0
+        )
+        self._refresh_seconds_total = 0.0
+        self._last_refresh_seconds = 0.0
+
+    def get(self, key: str, loader: Callable[[], T], fallback: T) -> T:
+        """Возвращает значение по ключу, при необходимости загружая его через loader"""
+        served = self._lookup(key, loader)
+        if served is not None:
+            return served.value  # type: ignore[no-any-return]
+
+        # Загрузка под блокировкой ключа: параллельные запросы ждут один вызов loader
+        with self._key_lock(key):
+            served = self._lookup(key, loader)
+            if served is not None:
+                return served.value  # type: ignore[no-any-return]
+            self._count("misses")
+            return self._load(key, loader, fallback)
+
+    def _lookup(self, key: str, loader: Callable[[], Any]) -> Optional[_Entry]:
+        """Запись, которую можно отдать без синхронной загрузки"""
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            age = now - entry.fetched_at
+            if entry.failed:
+                if now < entry.retry_at:
+                    self._counters["negative_hits"] += 1
+                    return entry
+                return None
+
+            if age < self.ttl:
+                self._counters["hits"] += 1
+                return entry
+
+            if age < self.ttl + self.stale_ttl:
+                self._counters["stale_hits"] += 1
+                if not entry.refreshing and now >= entry.retry_at:
+                    entry.refreshing = True
+                    self._pending = [future for future in self._pending if not future.done()]
+                    self._pending.append(self._executor.submit(self._refresh, key, loader))
+                return entry
+
+        return None
+
+    def _load(self, key: str, loader: Callable[[], T], fallback: T) -> T:
+        """Синхронная загрузка с кэшированием ошибки"""
+        started = self._clock()
+        try:
+            value = loader()
+        except Exception as e:
+            logger.error(f"Ошибка загрузки котировок {key}: {e}")
+            now = self._clock()
+            with self._lock:
+                self._counters["errors"] += 1
+                self._entries[key] = _Entry(
+                    value=fallback, fetched_at=now, failed=True, retry_at=now + self.error_ttl
+                )
+            return fallback
+
+        self._store(key, value, started)
+        return value
+
+    def _refresh(self, key: str, loader: Callable[[], Any]) -> None:
+        """Фоновое обновление устаревшего значения"""
+        started = self._clock()
+        try:
+            value = loader()
+        except Exception as e:
+            logger.error(f"Ошибка фонового обновления котировок {key}: {e}")
+            with self._lock:
+                self._counters["errors"] += 1
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.refreshing = False
+                    entry.retry_at = self._clock() + self.error_ttl
+            return
+
+        self._store(key, value, started)
+
+    def _store(self, key: str, value: Any, started: float) -> None:
+        now = self._clock()
+        with self._lock:
+            self._entries[key] = _Entry(value=value, fetched_at=now)
+            self._counters["refreshes"] += 1
+            self._last_refresh_seconds = now - started
+            self._refresh_seconds_total += now - started
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def wait_refreshes(self, timeout: Optional[float] = None) -> None:
+        """Дожидается завершения запущенных фоновых обновлений"""
+        with self._lock:
+            pending = list(self._pending)
+        wait(pending, timeout=timeout)
+
+    def clear(self) -> None:
+        """Сбрасывает значения и счетчики"""
+        self.wait_refreshes()
+        with self._lock:
+            self._entries.clear()
+            self._pending.clear()
+            for name in self._counters:
+                self._counters[name] = 0
+            self._refresh_seconds_total = 0.0
+            self._last_refresh_seconds = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики попаданий, промахов и времени обновления"""
+        with self._lock:
+            counters = dict(self._counters)
+            refreshes = counters["refreshes"]
+            return {
+                **counters,
+                "last_refresh_seconds": round(self._last_refresh_seconds, 4),
+                "avg_refresh_seconds": round(self._refresh_seconds_total / refreshes, 4) if refreshes else 0.0,
+            }
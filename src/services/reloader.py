@@ -0,0 +1,144 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from src.config import settings
+from src.services.statements import StatementIngestor, statement_ingestor
+from src.services.store import OperationSnapshot, OperationStore, operation_store
+
+logger = logging.getLogger(__name__)
+
+# (mtime_ns, размер) файла; None — файла нет
+Signature = Optional[Tuple[int, int]]
+
+
+def file_signature(path: str) -> Signature:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class SnapshotReloader:
+    """
+    Горячая перезагрузка выписки.
+
+    Фоновый поток раз в interval секунд сравнивает mtime и размер файла
+    источника. Изменившийся файл перечитывается, когда его подпись не меняется
+    два опроса подряд (файл дописан). Новый срез со всеми производными
+    структурами строится в этом потоке и подменяет текущий одной операцией;
+    запросы до подмены работают со старым срезом. Ошибка загрузки оставляет
+    прежний срез, повторная попытка — после следующего изменения файла.
+    Если задан каталог выписок (ingestor), при каждом опросе из него
+    добавляются новые файлы, а при перезагрузке основного файла уже принятые
+    из каталога операции входят в новый срез.
+    """
+
+    def __init__(
+        self, store: OperationStore, interval: float = 5.0, ingestor: Optional[StatementIngestor] = None
+    ) -> None:
+        self.store = store
+        self.interval = interval
+        self.ingestor = ingestor
+        self._signature: Signature = None
+        self._pending: Signature = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Any] = {
+            "reloads": 0,
+            "failures": 0,
+            "last_reload_at": None,
+            "last_reload_seconds": 0.0,
+            "last_error": None,
+        }
+
+    def start(self) -> None:
+        """Запускает опрос файла (interval <= 0 — наблюдение выключено)"""
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._signature = file_signature(self.store.source)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="snapshot-reloader", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._stop.set()
+        thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"Ошибка наблюдения за {self.store.source}: {e}")
+
+    def poll(self) -> Optional[OperationSnapshot]:
+        """Проверяет файл; перезагружает, если он изменился и больше не меняется"""
+        if self.ingestor is not None and self.ingestor.ingest().rows_added:
+            return self.store.snapshot
+
+        signature = file_signature(self.store.source)
+        if signature is None or signature == self._signature:
+            self._pending = None
+            return None
+        if signature != self._pending:
+            self._pending = signature
+            return None
+
+        self._pending = None
+        self._signature = signature
+        logger.info(f"Файл {self.store.source} изменился, перезагрузка")
+        try:
+            return self.reload()
+        except Exception:
+            return None
+
+    def reload(self, source: Optional[str] = None) -> OperationSnapshot:
+        """Перечитывает источник и подменяет срез; длительность и версия — в stats()"""
+        started = time.perf_counter()
+        try:
+            if self.ingestor is not None:
+                snapshot = self.ingestor.reload_store(source)
+            else:
+                snapshot = self.store.reload(source)
+        except Exception as e:
+            with self._lock:
+                self._stats["failures"] += 1
+                self._stats["last_error"] = str(e)
+            logger.error(f"Ошибка перезагрузки операций: {e}")
+            raise
+
+        seconds = time.perf_counter() - started
+        self._signature = file_signature(self.store.source)
+        with self._lock:
+            self._stats["reloads"] += 1
+            self._stats["last_reload_at"] = datetime.now().isoformat()
+            self._stats["last_reload_seconds"] = round(seconds, 4)
+            self._stats["last_error"] = None
+        logger.info(f"Срез версии {snapshot.version} построен за {seconds:.3f} с")
+        return snapshot
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self.store.snapshot
+        with self._lock:
+            return {
+                **self._stats,
+                "watching": self._thread is not None,
+                "interval": self.interval,
+                "version": snapshot.version,
+            }
+
+
+reloader = SnapshotReloader(
+    operation_store,
+    interval=settings.reload_poll_seconds,
+    ingestor=statement_ingestor if statement_ingestor.enabled else None,
+)
@@ -0,0 +1,165 @@
+import copy
+import inspect
+import sys
+import threading
+from collections import OrderedDict
+from datetime import date
+from functools import wraps
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import pandas as pd
+
+from src.config import settings
+
+_MISSING = object()
+
+
+def data_version(data: Any) -> Optional[int]:
+    """
+    Версия данных, по которым строится отчет.
+
+    Таблица отчетов хранит ее в attrs["data_version"], куб агрегатов — в version.
+    Для таблиц без версии (собранных вручную) возвращается None.
+    """
+    if isinstance(data, pd.DataFrame):
+        version = data.attrs.get("data_version")
+    else:
+        version = getattr(data, "version", None)
+    return version if isinstance(version, int) else None
+
+
+def estimate_size(value: Any) -> int:
+    """Приблизительный размер результата отчета в байтах"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_size(key) + estimate_size(item) for key, item in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(estimate_size(item) for item in value)
+    return size
+
+
+class ReportCache:
+    """
+    LRU-кэш результатов отчетов с ограничением по памяти.
+
+    Ключ — (отчет, параметры, версия данных): после перезагрузки операций
+    версия меняется, и старые результаты больше не выдаются, а при появлении
+    новой версии удаляются. Размер считается по estimate_size, при превышении
+    max_bytes или max_entries вытесняются давно не использованные записи.
+    """
+
+    def __init__(self, max_bytes: int, max_entries: int = 1024) -> None:
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._latest_version = 0
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = dict.fromkeys(("hits", "misses", "evictions", "bypassed"), 0)
+
+    def get(self, key: Hashable) -> Any:
+        """Значение по ключу или _MISSING"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters["misses"] += 1
+                return _MISSING
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, version: int) -> None:
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if version > self._latest_version:
+                self._latest_version = version
+                self._drop_older(version)
+            elif version < self._latest_version:
+                return
+
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+
+            while self._bytes > self.max_bytes or len(self._entries) > self.max_entries:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._counters["evictions"] += 1
+
+    def _drop_older(self, version: int) -> None:
+        for key in [key for key in self._entries if key[1] < version]:  # type: ignore[index]
+            _, size = self._entries.pop(key)
+            self._bytes -= size
+
+    def bypass(self) -> None:
+        """Учитывает вызов без кэширования (данные без версии)"""
+        with self._lock:
+            self._counters["bypassed"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._latest_version = 0
+            for name in self._counters:
+                self._counters[name] = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Попадания, промахи, вытеснения и занятая память"""
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                **self._counters,
+                "hit_ratio": round(self._counters["hits"] / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+report_cache = ReportCache(max_bytes=settings.report_cache_max_bytes, max_entries=settings.report_cache_max_entries)
+
+
+def cached_report(cache: Optional[ReportCache] = None) -> Callable:
+    """
+    Декоратор кэширования отчета report(data, *params).
+
+    Ставится над report_to_file: при попадании не выполняются ни расчет,
+    ни запись файла. target_date=None заменяется сегодняшней датой, так что
+    отчеты «на сегодня» кэшируются до конца дня.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            target = cache or report_cache
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            if "target_date" in bound.arguments and bound.arguments["target_date"] is None:
+                bound.arguments["target_date"] = date.today().strftime("%Y-%m-%d")
+
+            data, *params = bound.arguments.values()
+            version = data_version(data)
+            if version is None:
+                target.bypass()
+                return func(*bound.args, **bound.kwargs)
+
+            key = (func.__name__, version, tuple(params))
+            cached = target.get(key)
+            if cached is not _MISSING:
+                return copy.deepcopy(cached)
+
+            result = func(*bound.args, **bound.kwargs)
+            target.put(key, copy.deepcopy(result), version)
+            return result
+
+        return wrapper
+
+    return decorator
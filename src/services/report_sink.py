@@ -0,0 +1,237 @@
+import atexit
+import itertools
+import json
+import logging
+import os
+import queue
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from src.config import settings
+from src.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+REPORT_FORMATS = ("json", "compact", "ndjson")
+
+
+@dataclass
+class _Record:
+    """Отчет в очереди на запись"""
+
+    name: str
+    payload: Any
+    created_at: datetime
+    filename: Optional[str] = None
+
+
+class ReportSink:
+    """
+    Фоновая запись отчетов на диск.
+
+    submit кладет результат в ограниченную очередь и сразу возвращается,
+    запись и fsync выполняет отдельный поток. Он забирает из очереди сразу
+    до batch_size отчетов и пишет каждый файл во временный, а затем атомарно
+    переименовывает. Форматы: json (с отступами), compact (одна строка на файл)
+    и ndjson (вся пачка одним файлом, по строке на отчет).
+    Если очередь заполнена, submit ждет до put_timeout секунд, затем отчет
+    отбрасывается; ожидания и потери видны в stats().
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        fmt: str = "json",
+        max_queue: int = 1000,
+        batch_size: int = 50,
+        put_timeout: float = 0.05,
+        fsync: bool = True,
+    ) -> None:
+        if fmt not in REPORT_FORMATS:
+            raise ValueError(f"Неизвестный формат отчетов: {fmt}")
+        self.directory = Path(directory)
+        self.fmt = fmt
+        self.batch_size = batch_size
+        self.put_timeout = put_timeout
+        self.fsync = fsync
+        self._queue: "queue.Queue[Optional[_Record]]" = queue.Queue(maxsize=max_queue)
+        self._sequence = itertools.count(1)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._counters: Dict[str, int] = dict.fromkeys(
+            ("submitted", "written", "batches", "blocked", "dropped", "errors", "max_queue_depth"), 0
+        )
+        self._write_seconds_total = 0.0
+        self._last_batch_seconds = 0.0
+
+    def submit(self, name: str, payload: Any, filename: Optional[str] = None) -> bool:
+        """Ставит отчет в очередь на запись; False — очередь переполнена и отчет отброшен"""
+        self._ensure_writer()
+        record = _Record(name=name, payload=payload, created_at=datetime.now(), filename=filename)
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self._count("blocked")
+            try:
+                self._queue.put(record, timeout=self.put_timeout)
+            except queue.Full:
+                self._count("dropped")
+                logger.warning(f"Очередь отчетов переполнена, отчет {name} не сохранен")
+                return False
+
+        with self._lock:
+            self._counters["submitted"] += 1
+            self._counters["max_queue_depth"] = max(self._counters["max_queue_depth"], self._queue.qsize())
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Дожидается записи всех отчетов из очереди"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Дописывает очередь и останавливает поток записи"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._queue.put(None)
+        thread.join(timeout)
+
+    def _ensure_writer(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="report-sink", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            batch: List[Optional[_Record]] = [first]
+            while first is not None and len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+                if batch[-1] is None:
+                    break
+
+            records = [record for record in batch if record is not None]
+            if records:
+                self._write_batch(records)
+            for _ in batch:
+                self._queue.task_done()
+            if batch[-1] is None:
+                return
+
+    def _write_batch(self, records: List[_Record]) -> None:
+        started = time.perf_counter()
+        written = 0
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            if self.fmt == "ndjson":
+                lines = [
+                    json.dumps(
+                        {"report": r.name, "created_at": r.created_at.isoformat(), "result": r.payload},
+                        ensure_ascii=False,
+                        default=str,
+                    )
+                    for r in records
+                ]
+                self._write_file(self._file_name("batch", records[0].created_at, "ndjson"), "\n".join(lines) + "\n")
+                written = len(records)
+            else:
+                for record in records:
+                    name = record.filename or self._file_name(record.name, record.created_at, "json")
+                    self._write_file(name, self._render(record.payload))
+                    written += 1
+            if self.fsync:
+                self._fsync_directory()
+        except OSError as e:
+            logger.error(f"Ошибка сохранения отчетов: {e}")
+            self._count("errors")
+
+        seconds = time.perf_counter() - started
+        metrics.observe_stage("report_write", seconds)
+        with self._lock:
+            self._counters["written"] += written
+            self._counters["batches"] += 1
+            self._last_batch_seconds = seconds
+            self._write_seconds_total += seconds
+        logger.info(f"Сохранено отчетов: {written} в {self.directory}")
+
+    def _render(self, payload: Any) -> str:
+        if not isinstance(payload, (dict, list)):
+            return str(payload)
+        if self.fmt == "compact":
+            return json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=str)
+        return json.dumps(payload, ensure_ascii=False, indent=2, default=str)
+
+    def _file_name(self, name: str, created_at: datetime, extension: str) -> str:
+        """Имя без коллизий: время до микросекунд, pid и порядковый номер"""
+        timestamp = created_at.strftime("%Y%m%d_%H%M%S_%f")
+        return f"report_{name}_{timestamp}_{os.getpid()}_{next(self._sequence)}.{extension}"
+
+    def _write_file(self, name: str, content: str) -> None:
+        """Запись во временный файл в том же каталоге и атомарное переименование"""
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=self.directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(content)
+                if self.fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(tmp_path, self.directory / name)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+    def _fsync_directory(self) -> None:
+        """Фиксирует переименования в каталоге (одна операция на пачку)"""
+        try:
+            fd = os.open(self.directory, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики очереди и записи"""
+        with self._lock:
+            batches = self._counters["batches"]
+            return {
+                **self._counters,
+                "queue_depth": self._queue.qsize(),
+                "format": self.fmt,
+                "last_batch_seconds": round(self._last_batch_seconds, 4),
+                "avg_batch_size": round(self._counters["written"] / batches, 2) if batches else 0.0,
+                "avg_batch_seconds": round(self._write_seconds_total / batches, 4) if batches else 0.0,
+            }
+
+
+report_sink = ReportSink(
+    directory=settings.report_dir,
+    fmt=settings.report_format,
+    max_queue=settings.report_queue_size,
+    batch_size=settings.report_batch_size,
+    fsync=settings.report_fsync,
+)
+# Отчеты из очереди дописываются и при завершении процесса без shutdown приложения
+atexit.register(report_sink.close)
@@ -1,18 +1,30 @@
-import json
 import logging
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
-from typing import Callable, Any, Dict, List, Optional
+from typing import Callable, Any, Dict, List, Optional, Sequence
 from functools import wraps
-import os
+
+from src.models.operation import Operation
+from src.services.aggregates import AggregateCube
+from src.services.database import OperationDatabase
+from src.services.metrics import metrics
+from src.services.report_cache import cached_report
+from src.services.report_sink import report_sink
 
 logger = logging.getLogger(__name__)
 
+CASHBACK_METRICS = ("cashback", "bonuses", "rounding")
+WEEKDAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
 
 def report_to_file(filename: Optional[str] = None) -> Callable:
     """
     Декоратор для записи результатов отчетов в файл.
 
+    Результат передается в фоновую очередь записи (report_sink), сам отчет
+    не ждет диска. Файлы пишутся в settings.report_dir.
+
     Args:
         filename: Имя файла для сохранения. Если None, генерируется автоматически.
     """
@@ -21,28 +33,7 @@ def report_to_file(filename: Optional[str] = None) -> Callable:
         @wraps(func)
         def wrapper(*args: Any, **kwargs: Any) -> Any:
             result = func(*args, **kwargs)
-
-            if filename is None:
-                report_name = func.__name__
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                output_filename = f"report_{report_name}_{timestamp}.json"
-            else:
-                output_filename = filename
-
-            os.makedirs("reports", exist_ok=True)
-            filepath = os.path.join("reports", output_filename)
-
-            try:
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    if isinstance(result, (dict, list)):
-                        json.dump(result, f, ensure_ascii=False, indent=2)
-                    else:
-                        f.write(str(result))
-
-                logger.info(f"Отчет сохранен в файл: {filepath}")
-            except Exception as e:
-                logger.error(f"Ошибка сохранения отчета: {e}")
-
+            report_sink.submit(func.__name__, result, filename)
             return result
 
         return wrapper
@@ -50,6 +41,7 @@ def report_to_file(filename: Optional[str] = None) -> Callable:
     return decorator
 
 
+@cached_report()
 @report_to_file()
 def category_spending_report(
         df: pd.DataFrame,
@@ -61,19 +53,10 @@ def category_spending_report(
     """
     logger.info(f"Генерация отчета по категории: {category}")
 
-    if target_date is None:
-        current_date = datetime.now()
-    else:
-        current_date = datetime.strptime(target_date, "%Y-%m-%d")
-
-    dates = []
-    for i in range(3):
-        month_date = current_date - timedelta(days=30 * i)
-        dates.append(month_date.strftime("%Y-%m"))
-
+    frame = to_report_frame(df)
     result: Dict[str, float] = {}
-    for month in dates:
-        monthly_data = df[df['date'].str.startswith(month)]
+    for month in _report_months(target_date):
+        monthly_data = _month_rows(frame, month)
         category_data = monthly_data[monthly_data['category'] == category]
         spending = category_data[category_data['amount'] < 0]['amount'].abs().sum()
         result[month] = round(float(spending), 2)
@@ -81,6 +64,47 @@ def category_spending_report(
     return result
 
 
+@cached_report()
+@report_to_file()
+def category_spending_from_cube(
+        cube: AggregateCube,
+        category: str,
+        target_date: Optional[str] = None
+) -> Dict[str, float]:
+    """
+    Траты по категории за последние три месяца по кубу агрегатов — то же, что category_spending_report.
+    """
+    logger.info(f"Генерация отчета по категории из агрегатов: {category}")
+
+    result: Dict[str, float] = {}
+    for month in _report_months(target_date):
+        spending = sum(
+            abs(cell.total) for (cell_category, sign, _), cell in cube.month(month).items()
+            if cell_category == category and sign < 0
+        )
+        result[month] = round(float(spending), 2)
+
+    return result
+
+
+@report_to_file()
+def category_spending_from_database(
+        database: OperationDatabase,
+        category: str,
+        target_date: Optional[str] = None
+) -> Dict[str, float]:
+    """
+    Траты по категории за последние три месяца запросами к базе — то же, что category_spending_from_cube.
+
+    У базы нет версии данных, поэтому результат не кэшируется.
+    """
+    logger.info(f"Генерация отчета по категории из базы: {category}")
+
+    spending = database.category_spending(category, _report_months(target_date))
+    return {month: round(float(total), 2) for month, total in spending.items()}
+
+
+@cached_report()
 @report_to_file()
 def weekday_spending_report(
         df: pd.DataFrame,
@@ -96,13 +120,12 @@ def weekday_spending_report(
     else:
         current_date = datetime.strptime(target_date, "%Y-%m-%d")
 
-    start_date_str = (current_date - timedelta(days=90)).strftime("%Y-%m-%d")
-    filtered_df = df[df['date'] >= start_date_str]
-
-    filtered_df = filtered_df.copy()
-    filtered_df['weekday'] = pd.to_datetime(filtered_df['date']).dt.day_name()
+    filtered_df = _rows_since(to_report_frame(df), current_date - timedelta(days=90))
 
-    weekday_spending: Any = filtered_df[filtered_df['amount'] < 0].groupby('weekday')['amount'].agg(['mean', 'count'])
+    with metrics.stage("pandas_groupby"):
+        weekday_spending: Any = (
+            filtered_df[filtered_df['amount'] < 0].groupby('weekday', observed=True)['amount'].agg(['mean', 'count'])
+        )
 
     result: Dict[str, float] = {}
     for day in weekday_spending.index:
@@ -111,6 +134,7 @@ def weekday_spending_report(
     return result
 
 
+@cached_report()
 @report_to_file()
 def workday_weekend_spending_report(
         df: pd.DataFrame,
@@ -126,14 +150,12 @@ def workday_weekend_spending_report(
     else:
         current_date = datetime.strptime(target_date, "%Y-%m-%d")
 
-    start_date_str = (current_date - timedelta(days=90)).strftime("%Y-%m-%d")
-    filtered_df = df[df['date'] >= start_date_str]
+    filtered_df = _rows_since(to_report_frame(df), current_date - timedelta(days=90))
 
-    filtered_df = filtered_df.copy()
-    filtered_df['date_dt'] = pd.to_datetime(filtered_df['date'])
-    filtered_df['is_weekend'] = filtered_df['date_dt'].dt.weekday >= 5  # 5-6 = суббота-воскресенье
-
-    day_type_spending: Any = filtered_df[filtered_df['amount'] < 0].groupby('is_weekend')['amount'].agg(['mean', 'count'])
+    with metrics.stage("pandas_groupby"):
+        day_type_spending: Any = (
+            filtered_df[filtered_df['amount'] < 0].groupby('is_weekend')['amount'].agg(['mean', 'count'])
+        )
 
     result: Dict[str, float] = {
         'workday': 0.0,
@@ -148,8 +170,154 @@ def workday_weekend_spending_report(
     return result
 
 
+@cached_report()
+def cashback_matrix_report(df: pd.DataFrame, start_month: str, end_month: str) -> Dict[str, Any]:
+    """
+    Кешбэк, бонусы и округления по месяцам и категориям за start_month..end_month (YYYY-MM).
+
+    Строки периода выбираются бинарным поиском по индексу дат и группируются
+    по (категория, месяц) за один проход. Результат — матрицы месяц × категория
+    в порядке списков months и categories; категории отсортированы по кешбэку.
+    Кешбэк учитывается только начисленный (положительный), как в
+    analyze_cashback_categories.
+    """
+    logger.info(f"Генерация матрицы кешбэка за {start_month}..{end_month}")
+
+    frame = to_report_frame(df)
+    months = pd.period_range(start_month, end_month, freq='M')
+    lower = frame.index.searchsorted(months[0].start_time, side='left')
+    upper = frame.index.searchsorted((months[-1] + 1).start_time, side='left')
+    rows = frame.iloc[lower:upper]
+
+    first = months[0]
+    values = pd.DataFrame(
+        {
+            'category': rows['category'].to_numpy(),
+            'month': (rows.index.year - first.year) * 12 + (rows.index.month - first.month),
+            'cashback': rows['cashback'].clip(lower=0).to_numpy(),
+            'bonuses': rows['bonuses'].to_numpy(),
+            'rounding': rows['rounding'].to_numpy(),
+        }
+    )
+    with metrics.stage("pandas_groupby"):
+        grouped = values.groupby(['category', 'month'], observed=True)[list(CASHBACK_METRICS)].sum()
+        totals = grouped['cashback'].groupby(level='category', observed=True).sum()
+    categories = sorted(totals.index, key=lambda category: (-totals[category], category))
+
+    result: Dict[str, Any] = {
+        'months': [str(month) for month in months],
+        'categories': list(categories),
+    }
+    for metric in CASHBACK_METRICS:
+        matrix = (
+            grouped[metric]
+            .unstack('category', fill_value=0.0)
+            .reindex(index=range(len(months)), columns=categories, fill_value=0.0)
+        )
+        result[metric] = np.round(matrix.to_numpy(dtype=np.float64), 2).tolist()
+    return result
+
+
 def transactions_to_dataframe(transactions: List[Dict[str, Any]]) -> pd.DataFrame:
     """
     Конвертирует список транзакций в DataFrame.
     """
     return pd.DataFrame(transactions)
+
+
+@metrics.timed("dataframe_build")
+def build_report_frame(operations: Sequence[Operation], version: Optional[int] = None) -> pd.DataFrame:
+    """
+    Типизированная таблица для отчетов.
+
+    Индекс — отсортированные даты (datetime64), category — categorical,
+    суммы — float64, день недели и признак выходного посчитаны заранее.
+    Строится один раз на версию данных и используется отчетами только для чтения.
+    Без version результаты отчетов по таблице не кэшируются.
+    """
+    index = pd.DatetimeIndex([op.date for op in operations], name='date')
+    frame = pd.DataFrame(
+        {
+            'category': pd.Categorical([op.category for op in operations]),
+            'amount': np.fromiter((op.amount for op in operations), dtype=np.float64, count=len(operations)),
+            'cashback': np.fromiter((op.cashback for op in operations), dtype=np.float64, count=len(operations)),
+            'bonuses': np.fromiter((op.bonuses for op in operations), dtype=np.float64, count=len(operations)),
+            'rounding': np.fromiter((op.rounding for op in operations), dtype=np.float64, count=len(operations)),
+        },
+        index=index,
+    )
+    return _with_calendar(frame, version)
+
+
+def extend_report_frame(
+        frame: pd.DataFrame, operations: Sequence[Operation], version: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    Таблица build_report_frame, к которой в конец дописаны operations (даты не раньше последней).
+
+    Строки строятся только для новых операций, у старых меняется лишь
+    набор категорий categorical-столбца. Исходная таблица не меняется.
+    """
+    tail = build_report_frame(operations)
+    categories = frame['category'].cat.categories.union(tail['category'].cat.categories)
+    head = frame.assign(category=frame['category'].cat.set_categories(categories))
+    tail['category'] = tail['category'].cat.set_categories(categories)
+    extended = pd.concat([head, tail])
+    extended.attrs['data_version'] = version
+    return extended
+
+
+def to_report_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Приводит таблицу к виду build_report_frame.
+
+    Готовая таблица возвращается как есть, таблица транзакций со строковыми
+    датами (transactions_to_dataframe) разбирается заново.
+    """
+    if isinstance(df.index, pd.DatetimeIndex) and 'weekday' in df.columns:
+        return df
+    if df.empty or 'date' not in df.columns:
+        return build_report_frame([])
+
+    dates = pd.to_datetime(df['date'])
+    order = np.argsort(dates.to_numpy(), kind='stable')
+    ordered = df.iloc[order]
+    frame = pd.DataFrame(
+        {
+            'category': pd.Categorical(ordered['category']),
+            'amount': ordered['amount'].astype(np.float64).to_numpy(),
+        },
+        index=pd.DatetimeIndex(dates.iloc[order], name='date'),
+    )
+    for column in ('cashback', 'bonuses', 'rounding'):
+        values = ordered[column].astype(np.float64).to_numpy() if column in ordered else np.zeros(len(ordered))
+        frame[column] = values
+    return _with_calendar(frame, df.attrs.get('data_version'))
+
+
+def _with_calendar(frame: pd.DataFrame, version: Optional[int]) -> pd.DataFrame:
+    weekdays = frame.index.dayofweek
+    frame['weekday'] = pd.Categorical.from_codes(weekdays, categories=WEEKDAY_NAMES)
+    frame['is_weekend'] = weekdays >= 5  # 5-6 = суббота-воскресенье
+    frame.attrs['data_version'] = version
+    return frame
+
+
+def _report_months(target_date: Optional[str]) -> List[str]:
+    """Месяцы YYYY-MM отчета по категории: месяц даты и два шага по 30 дней назад"""
+    current_date = datetime.now() if target_date is None else datetime.strptime(target_date, "%Y-%m-%d")
+    return [(current_date - timedelta(days=30 * i)).strftime("%Y-%m") for i in range(3)]
+
+
+def _rows_since(frame: pd.DataFrame, start: datetime) -> pd.DataFrame:
+    """Строки с датой не раньше начала дня start (бинарный поиск по индексу)"""
+    position = frame.index.searchsorted(pd.Timestamp(start.date()), side='left')
+    return frame.iloc[position:]
+
+
+def _month_rows(frame: pd.DataFrame, month: str) -> pd.DataFrame:
+    """Строки за месяц YYYY-MM"""
+    month_start = pd.Timestamp(f"{month}-01")
+    lower = frame.index.searchsorted(month_start, side='left')
+    upper = frame.index.searchsorted(month_start + pd.offsets.MonthBegin(1), side='left')
+    return frame.iloc[lower:upper]
@@ -0,0 +1,212 @@
+import heapq
+from bisect import bisect_left
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from src.models.operation import Operation
+
+# Длина n-грамм: запросы до MAX_GRAM символов ищутся точным совпадением n-граммы,
+# длиннее — пересечением триграмм с проверкой подстроки
+MAX_GRAM = 3
+# Если запрос совпал с большим числом текстов, слияние их списков строк дороже,
+# чем просмотр массива идентификаторов текстов блоками по SCAN_CHUNK строк
+MERGE_MAX_TEXTS = 32
+SCAN_CHUNK = 16384
+
+
+def fold(text: str) -> str:
+    """
+    Приведение регистра для поиска.
+
+    Используется lower(), как в simple_search: для кириллицы он совпадает
+    с casefold(), а выдача индекса остается такой же, как у подстрочного поиска.
+    """
+    return text.lower()
+
+
+class SearchIndex:
+    """
+    Инвертированный индекс по описанию и категории операций.
+
+    Строки в выписке сильно повторяются, поэтому индекс строится по различным
+    текстам: для каждого текста хранятся позиции строк (по возрастанию, то есть
+    по дате), для каждой n-граммы длиной 1..3 — тексты, где она встречается.
+    Запрос сопоставляется с текстами, а не со строками, и дает ту же выборку,
+    что подстрочный поиск query in description/category без учета регистра.
+    Для запросов, совпавших со многими текстами, строки отбираются маской
+    по массивам идентификаторов текстов описания и категории.
+    """
+
+    def __init__(self, operations: Sequence[Operation]) -> None:
+        self._text_ids: Dict[str, int] = {}
+        self._folded: List[str] = []
+        self._rows: List[List[int]] = []
+        self._grams: Dict[str, List[int]] = {}
+        # Списки, общие с индексом, из которого построен этот (extended): копируются перед первой записью
+        self._shared_rows: Set[int] = set()
+        self._shared_grams: Set[str] = set()
+        self._size = 0
+        self._description_ids, self._category_ids = self._index(operations)
+
+    def extended(self, operations: Sequence[Operation]) -> "SearchIndex":
+        """
+        Индекс среза, к которому в конец дописаны operations.
+
+        Исходный индекс не меняется, по нему могут идти запросы: словари
+        копируются, а списки строк и n-грамм — только те, куда попадают новые
+        позиции. Тексты и n-граммы разбираются только для новых строк.
+        """
+        index = SearchIndex([])
+        index._text_ids = dict(self._text_ids)
+        index._folded = list(self._folded)
+        index._rows = list(self._rows)
+        index._grams = dict(self._grams)
+        index._shared_rows = set(range(len(self._rows)))
+        index._shared_grams = set(self._grams)
+        index._size = self._size
+        description_ids, category_ids = index._index(operations)
+        index._description_ids = np.concatenate((self._description_ids, description_ids))
+        index._category_ids = np.concatenate((self._category_ids, category_ids))
+        return index
+
+    def _index(self, operations: Sequence[Operation]) -> Tuple[np.ndarray, np.ndarray]:
+        """Добавляет строки operations с позиции _size; идентификаторы текстов описания и категории"""
+        start = self._size
+        description_ids = np.empty(len(operations), dtype=np.int32)
+        category_ids = np.empty(len(operations), dtype=np.int32)
+        for offset, op in enumerate(operations):
+            description_ids[offset] = self._add(op.description or "", start + offset)
+            category_ids[offset] = self._add(op.category or "", start + offset)
+        self._size = start + len(operations)
+        return description_ids, category_ids
+
+    def _add(self, text: str, position: int) -> int:
+        text_id = self._text_ids.get(text)
+        if text_id is None:
+            text_id = self._text_ids[text] = len(self._rows)
+            folded = fold(text)
+            self._folded.append(folded)
+            self._rows.append([])
+            for gram in _grams(folded):
+                if gram in self._shared_grams:
+                    self._shared_grams.discard(gram)
+                    self._grams[gram] = list(self._grams[gram])
+                self._grams.setdefault(gram, []).append(text_id)
+
+        if text_id in self._shared_rows:
+            self._shared_rows.discard(text_id)
+            self._rows[text_id] = list(self._rows[text_id])
+        rows = self._rows[text_id]
+        if not rows or rows[-1] != position:
+            rows.append(position)
+        return text_id
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def distinct_texts(self) -> int:
+        return len(self._rows)
+
+    def matching_texts(self, query: str) -> Sequence[int]:
+        """Тексты, содержащие запрос"""
+        folded = fold(query)
+        if not folded:
+            return range(len(self._rows))
+        if len(folded) <= MAX_GRAM:
+            return self._grams.get(folded, [])
+
+        postings = sorted(
+            (self._grams.get(folded[i:i + MAX_GRAM], []) for i in range(len(folded) - MAX_GRAM + 1)), key=len
+        )
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            if not candidates:
+                break
+            candidates.intersection_update(posting)
+        return sorted(text_id for text_id in candidates if folded in self._folded[text_id])
+
+    def search(
+        self,
+        query: str,
+        lower: int = 0,
+        upper: Optional[int] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        descending: bool = False,
+    ) -> List[int]:
+        """
+        Позиции строк, где описание или категория содержит запрос, по возрастанию (descending — по убыванию).
+
+        lower/upper ограничивают позиции (диапазон дат из DateIndex.span),
+        offset/limit — страница результата; строки после страницы не перебираются.
+        """
+        upper = self._size if upper is None else upper
+        stop = None if limit is None else offset + limit
+        text_ids = self.matching_texts(query)
+        if len(text_ids) > MERGE_MAX_TEXTS:
+            return self._scan(text_ids, lower, upper, offset, stop, descending)
+
+        streams = []
+        for text_id in text_ids:
+            rows = self._rows[text_id]
+            first, last = bisect_left(rows, lower), bisect_left(rows, upper)
+            if first < last:
+                streams.append(_slice(rows, first, last, descending))
+
+        merged: Iterator[int] = (
+            streams[0] if len(streams) == 1 else _unique(heapq.merge(*streams, reverse=descending))
+        )
+        return list(islice(merged, offset, stop))
+
+    def _scan(
+        self, text_ids: Iterable[int], lower: int, upper: int, offset: int, stop: Optional[int], descending: bool
+    ) -> List[int]:
+        """Отбор строк маской совпавших текстов; просмотр прекращается, когда страница набрана"""
+        matched = np.zeros(len(self._rows), dtype=bool)
+        matched[np.fromiter(text_ids, dtype=np.int32)] = True
+
+        found: List[np.ndarray] = []
+        total = 0
+        chunks = range(lower, upper, SCAN_CHUNK)
+        for start in reversed(chunks) if descending else chunks:
+            end = min(upper, start + SCAN_CHUNK)
+            mask = matched[self._description_ids[start:end]] | matched[self._category_ids[start:end]]
+            hits = np.flatnonzero(mask) + start
+            found.append(hits[::-1] if descending else hits)
+            total += len(hits)
+            if stop is not None and total >= stop:
+                break
+
+        positions = np.concatenate(found) if found else np.empty(0, dtype=np.intp)
+        return positions[offset:stop].tolist()  # type: ignore[no-any-return]
+
+    def count(self, query: str, lower: int = 0, upper: Optional[int] = None) -> int:
+        """Число найденных строк"""
+        return len(self.search(query, lower, upper))
+
+
+def _grams(text: str) -> Iterator[str]:
+    seen = set()
+    for size in range(1, MAX_GRAM + 1):
+        for i in range(len(text) - size + 1):
+            gram = text[i:i + size]
+            if gram not in seen:
+                seen.add(gram)
+                yield gram
+
+
+def _slice(rows: List[int], start: int, stop: int, descending: bool = False) -> Iterator[int]:
+    for i in range(stop - 1, start - 1, -1) if descending else range(start, stop):
+        yield rows[i]
+
+
+def _unique(positions: Iterator[int]) -> Iterator[int]:
+    """Убирает повторы из отсортированного потока (строка нашлась и по описанию, и по категории)"""
+    previous = -1
+    for position in positions:
+        if position != previous:
+            previous = position
+            yield position
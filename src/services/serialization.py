@@ -0,0 +1,131 @@
+import json
+import math
+from dataclasses import fields, is_dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from fastapi.responses import JSONResponse
+from starlette.background import BackgroundTask
+from starlette.responses import Response
+
+# Те же параметры, что у JSONResponse: ответы побайтно совпадают с обычным путем FastAPI
+_encoder = json.JSONEncoder(ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+
+# Преобразование по точному типу значения: Decimal строкой, как его сериализует pydantic
+# в ответе FastAPI с аннотацией Dict[str, Any] ("52700.79", а не число), даты — isoformat()
+_converters: Dict[type, Callable[[Any], Any]] = {
+    Decimal: str,
+    datetime: datetime.isoformat,
+    date: date.isoformat,
+}
+
+
+def _plain(value: Any) -> Any:
+    convert = _converters.get(type(value))
+    return value if convert is None else convert(value)
+
+
+def _converter(kind: type) -> Callable[[Any], Any]:
+    """Преобразование для типа, которого нет в _converters: подклассы и dataclass"""
+    for base, convert in list(_converters.items()):
+        if issubclass(kind, base):
+            return convert
+    if is_dataclass(kind):
+        names = tuple(f.name for f in fields(kind))
+        return lambda value: {name: _plain(getattr(value, name)) for name in names}
+    raise TypeError(f"Объект типа {kind.__name__} не сериализуется в JSON")
+
+
+def json_default(value: Any) -> Any:
+    """Преобразование значений, которые json не знает, как в ответе FastAPI с аннотацией Dict[str, Any]"""
+    kind = type(value)
+    convert = _converters.get(kind)
+    if convert is None:
+        convert = _converters[kind] = _converter(kind)
+    return convert(value)
+
+
+def dumps(content: Any) -> bytes:
+    """JSON в UTF-8 с Decimal, датами и dataclass без промежуточной модели ответа"""
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=json_default
+    ).encode("utf-8")
+
+
+class RowEncoder:
+    """
+    Кодирует строки-словари (транзакции) в JSON по одной.
+
+    Для каждого набора ключей готовится шаблон строки, а строковые значения
+    кодируются один раз на уникальное значение: категории и описания
+    интернированы и повторяются во многих строках.
+    """
+
+    def __init__(self) -> None:
+        self._strings: Dict[str, str] = {}
+        self._templates: Dict[Tuple[str, ...], str] = {}
+
+    def _template(self, keys: Tuple[str, ...]) -> str:
+        template = self._templates.get(keys)
+        if template is None:
+            fields_json = ",".join(_encoder.encode(key).replace("%", "%%") + ":%s" for key in keys)
+            template = self._templates[keys] = "{" + fields_json + "}"
+        return template
+
+    def _value(self, value: Any) -> str:
+        kind = type(value)
+        if kind is str:
+            encoded = self._strings.get(value)
+            if encoded is None:
+                encoded = self._strings[value] = _encoder.encode(value)
+            return encoded
+        if kind is float and math.isfinite(value):
+            return float.__repr__(value)
+        if kind is int:
+            return int.__repr__(value)
+        if value is None or kind is bool or kind is float:  # nan/inf — ValueError, как в JSONResponse
+            return _encoder.encode(value)
+        return dumps(value).decode("utf-8")
+
+    def encode(self, row: Mapping[str, Any]) -> bytes:
+        values = tuple(self._value(value) for value in row.values())
+        return (self._template(tuple(row)) % values).encode("utf-8")
+
+    def encode_all(self, rows: Iterable[Mapping[str, Any]]) -> List[bytes]:
+        return [self.encode(row) for row in rows]
+
+
+def encode_rows(rows: Iterable[Mapping[str, Any]]) -> List[bytes]:
+    """JSON каждой строки отдельно, для склейки в RowsJSONResponse"""
+    return RowEncoder().encode_all(rows)
+
+
+class RowsJSONResponse(Response):
+    """
+    JSON-массив из заранее закодированных строк.
+
+    Строки склеиваются одним join без словарей и повторной сериализации;
+    содержимое — последовательность bytes (например, из OperationSnapshot.encoded_rows).
+    """
+
+    media_type = "application/json"
+
+    def __init__(
+        self,
+        content: Sequence[bytes],
+        status_code: int = 200,
+        headers: Optional[Mapping[str, str]] = None,
+        background: Optional[BackgroundTask] = None,
+    ) -> None:
+        super().__init__(content, status_code, headers, self.media_type, background)
+
+    def render(self, content: Any) -> bytes:
+        return b"[" + b",".join(content) + b"]"
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse для ответов с Decimal, датами и dataclass: без обхода моделью ответа FastAPI"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -1,8 +1,10 @@
 import logging
-import re
-from datetime import datetime
 from functools import reduce
-from typing import Any, Dict, List, TypedDict
+from typing import Any, Dict, Iterable, List, TypedDict
+
+from src.services.aggregates import AggregateCube
+from src.services.detectors import has_phone_number, is_person_transfer
+from src.services.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -17,19 +19,17 @@ class Transaction(TypedDict):
     cashback: float
 
 
-def analyze_cashback_categories(transactions: List[Transaction], year: int, month: int) -> Dict[str, float]:
+def analyze_cashback_categories(transactions: Iterable[Transaction], year: int, month: int) -> Dict[str, float]:
     """
     Анализирует выгодность категорий для повышенного кешбэка.
     """
     logger.info(f"Анализ кешбэка за {month}/{year}")
 
+    month_prefix = f"{year:04d}-{month:02d}-"
+
     def filter_by_date(txn: Transaction) -> bool:
-        """Фильтрует транзакции по дате"""
-        try:
-            txn_date = datetime.strptime(txn["date"], "%Y-%m-%d")
-            return txn_date.year == year and txn_date.month == month
-        except ValueError:
-            return False
+        """Фильтрует транзакции по дате (YYYY-MM-DD или ISO с временем)"""
+        return txn["date"].startswith(month_prefix)
 
     def calculate_category_cashback(acc: Dict[str, float], txn: Transaction) -> Dict[str, float]:
         """Аккумулирует кешбэк по категориям"""
@@ -42,7 +42,22 @@ def analyze_cashback_categories(transactions: List[Transaction], year: int, mont
     logger.debug(f"Результат анализа кешбэка: {result}")
     return dict(sorted(result.items(), key=lambda x: x[1], reverse=True))
 
-def investment_bank(month: str, transactions: List[Dict[str, Any]], limit: int) -> float:
+
+def cashback_categories_from_cube(cube: AggregateCube, year: int, month: int) -> Dict[str, float]:
+    """
+    Анализирует выгодность категорий для повышенного кешбэка по готовым агрегатам месяца.
+    """
+    logger.info(f"Анализ кешбэка за {month}/{year} по агрегатам")
+
+    result: Dict[str, float] = {}
+    for (category, _, _), cell in cube.month(f"{year:04d}-{month:02d}").items():
+        if cell.cashback_earned > 0:
+            result[category] = result.get(category, 0.0) + float(cell.cashback_earned)
+
+    return dict(sorted(result.items(), key=lambda x: x[1], reverse=True))
+
+
+def investment_bank(month: str, transactions: Iterable[Dict[str, Any]], limit: int) -> float:
     """
     Рассчитывает сумму для инвесткопилки через округление трат.
     """
@@ -58,18 +73,17 @@ def investment_bank(month: str, transactions: List[Dict[str, Any]], limit: int)
         except (KeyError, AttributeError):
             return False
 
-    def calculate_rounding(txn: Dict[str, Any]) -> float:
-        """Рассчитывает округление для одной транзакции"""
+    def calculate_rounding(txn: Dict[str, Any]) -> int:
+        """Рассчитывает округление для одной транзакции в копейках"""
         try:
-            amount = abs(float(txn.get("amount", 0)))
-            rounded = ((amount + limit - 1) // limit) * limit
-            return float(rounded - amount)
+            amount = round(abs(float(txn.get("amount", 0))) * 100)
+            return (-amount) % (limit * 100)
         except (KeyError, TypeError, ValueError):
-            return 0.0
+            return 0
 
     monthly_transactions = filter(filter_by_month, transactions)
     roundings = map(calculate_rounding, monthly_transactions)
-    total_savings = sum(roundings)
+    total_savings = sum(roundings) / 100
 
     logger.debug(f"Сумма инвесткопилки: {total_savings:.2f}")
     return round(total_savings, 2)
@@ -100,14 +114,11 @@ def find_phone_transactions(transactions: List[Transaction]) -> List[Dict[str, A
     """
     logger.info("Поиск транзакций с телефонными номерами")
 
-    phone_pattern = re.compile(r"(\+7|7|8)?[\s\-]?\(?[489][0-9]{2}\)?[\s\-]?[0-9]{3}[\s\-]?[0-9]{2}[\s\-]?[0-9]{2}")
-
-    def has_phone_number(txn: Transaction) -> bool:
+    def has_phone(txn: Transaction) -> bool:
         """Проверяет наличие телефонного номера"""
-        description = txn.get("description", "")
-        return bool(phone_pattern.search(description))
+        return has_phone_number(txn.get("description", ""))
 
-    result = list(filter(has_phone_number, transactions))
+    result = list(filter(has_phone, transactions))
     logger.debug(f"Найдено транзакций с телефонами: {len(result)}")
     return [dict(txn) for txn in result]
 
@@ -118,21 +129,17 @@ def find_person_transfers(transactions: List[Transaction]) -> List[Dict[str, Any
     """
     logger.info("Поиск переводов физическим лицам")
 
-    name_pattern = re.compile(r"[А-Я][а-я]+\s[А-Я]\.")
-
-    def is_person_transfer(txn: Transaction) -> bool:
+    def is_transfer(txn: Transaction) -> bool:
         """Проверяет, является ли транзакция переводом физлицу"""
-        category = txn.get("category", "")
-        description = txn.get("description", "")
-
-        return category == "Переводы" and bool(name_pattern.search(description))
+        return is_person_transfer(txn.get("description", ""), txn.get("category", ""))
 
-    result = list(filter(is_person_transfer, transactions))
+    result = list(filter(is_transfer, transactions))
     logger.debug(f"Найдено переводов физлицам: {len(result)}")
     return [dict(txn) for txn in result]
 
 
-def convert_operations_to_transactions(operations: List[Any]) -> List[Transaction]:
+@metrics.timed("transaction_conversion")
+def convert_operations_to_transactions(operations: Iterable[Any]) -> List[Transaction]:
     """Конвертирует операции в транзакции для сервисов"""
     transactions_list: List[Transaction] = []
 
@@ -0,0 +1,300 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.config import settings
+from src.models.operation import Operation
+from src.services.excel_processor import load_operations_with_report, operations_from_frame, operations_to_frame
+from src.services.operations_cache import file_digest, read_columns, schema_fingerprint, write_columns
+from src.services.store import OperationSnapshot, OperationStore, operation_store
+
+logger = logging.getLogger(__name__)
+
+# Меняется при изменении формата состояния
+STATE_FORMAT_VERSION = 1
+STATE_DIR_NAME = ".ingest"
+STATEMENT_SUFFIXES = (".xlsx", ".xls")
+
+
+def row_fingerprint(op: Operation) -> str:
+    """Отпечаток операции для поиска повторов в пересекающихся выгрузках: дата, карта, сумма, описание"""
+    key = f"{op.date.isoformat()}|{op.card_number}|{op.amount:.2f}|{op.description}"
+    return hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+
+
+@dataclass
+class IngestResult:
+    """Итоги прохода по каталогу выписок"""
+
+    files_seen: int = 0
+    files_parsed: int = 0
+    rows_read: int = 0
+    rows_added: int = 0
+    duplicates: int = 0
+    seconds: float = 0.0
+    version: int = 0
+
+
+class StatementIngestor:
+    """
+    Инкрементальная загрузка каталога выписок.
+
+    Файлы, чьи размер и mtime (или содержимое) не изменились, повторно не
+    читаются. Из нового или измененного файла добавляются только строки,
+    которых еще не было: для каждого отпечатка (дата, карта, сумма, описание)
+    хранится число уже принятых строк, и файл добавляет лишь превышение.
+    Так пересекающиеся выгрузки не дублируют операции, а одинаковые покупки
+    внутри одного файла сохраняются. Строки основного файла хранилища тоже
+    считаются принятыми: строки нового файла сверяются со строками среза
+    с теми же датами (по индексу дат), срез целиком не перебирается.
+    Файл, который не удалось разобрать, пропускается, пока не изменятся
+    его размер или mtime.
+
+    Принятые строки дописываются сегментами в колоночном формате кэша выписок
+    в {directory}/.ingest, там же state.json с файлами и отпечатками. После
+    перезапуска операции восстанавливаются из сегментов без разбора Excel,
+    так что стоимость загрузки зависит от объема новых данных.
+    """
+
+    def __init__(self, directory: str, store: OperationStore, state_dir: Optional[str] = None) -> None:
+        self.directory = Path(directory)
+        self.store = store
+        self.state_dir = Path(state_dir) if state_dir else self.directory / STATE_DIR_NAME
+        self._lock = threading.Lock()
+        self._files: Dict[str, Dict[str, Any]] = {}
+        self._segments: List[str] = []
+        self._counts: Counter = Counter()
+        # Отпечатки принятых строк, которые еще не дописаны в хранилище (текущий проход)
+        self._pending: Counter = Counter()
+        # Файлы, которые не удалось разобрать: имя -> (размер, mtime)
+        self._failed: Dict[str, Tuple[int, int]] = {}
+        self._operations: List[Operation] = []
+        self._restored = False
+        self._dirty = False
+        self.last_result: Optional[IngestResult] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(str(self.directory)) and str(self.directory) != "."
+
+    @property
+    def operations(self) -> List[Operation]:
+        """Все операции, принятые из каталога"""
+        with self._lock:
+            return list(self._operations)
+
+    def ingest(self) -> IngestResult:
+        """Читает новые и измененные файлы и добавляет новые строки в хранилище одним срезом"""
+        with self._lock:
+            started = time.perf_counter()
+            result = IngestResult()
+            pending: List[Operation] = [] if self._restored else self._restore()
+            self._restored = True
+            # Восстановленные строки — все строки каталога, в хранилище их еще нет
+            self._pending = Counter(self._counts) if pending else Counter()
+
+            for path in self._statement_files():
+                result.files_seen += 1
+                pending.extend(self._ingest_file(path, result))
+
+            if pending:
+                self.store.append(pending)
+            self._pending.clear()
+            if self._dirty:
+                self._save_state()
+                self._dirty = False
+
+            result.seconds = time.perf_counter() - started
+            result.version = self.store.snapshot.version
+            self.last_result = result
+
+        if result.files_parsed:
+            logger.info(
+                f"Каталог {self.directory}: разобрано файлов {result.files_parsed}, "
+                f"добавлено строк {result.rows_added}, повторов {result.duplicates} за {result.seconds:.3f} с"
+            )
+        return result
+
+    def reload_store(self, source: Optional[str] = None) -> OperationSnapshot:
+        """
+        Перечитывает основной файл хранилища вместе с операциями каталога.
+
+        Выполняется под блокировкой загрузки каталога, поэтому в новый срез
+        не попадает недописанный список операций параллельного ingest().
+        """
+        with self._lock:
+            if not self._restored:
+                self._restore()
+                self._restored = True
+            return self.store.reload(source, self._operations)
+
+    def _statement_files(self) -> List[Path]:
+        if not self.directory.is_dir():
+            return []
+        return sorted(
+            path
+            for path in self.directory.iterdir()
+            if path.is_file() and path.suffix.lower() in STATEMENT_SUFFIXES and not path.name.startswith(("~$", "."))
+        )
+
+    def _ingest_file(self, path: Path, result: IngestResult) -> List[Operation]:
+        """Новые строки файла; неизмененный файл не читается"""
+        stat = path.stat()
+        known = self._files.get(path.name)
+        if known and (known["size"], known["mtime_ns"]) == (stat.st_size, stat.st_mtime_ns):
+            return []
+        if self._failed.get(path.name) == (stat.st_size, stat.st_mtime_ns):
+            return []
+
+        digest = file_digest(str(path))
+        self._dirty = True
+        if known and known["sha256"] == digest:
+            known.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+            return []
+
+        try:
+            operations, _ = load_operations_with_report(str(path), digest=digest)
+        except Exception as e:
+            logger.error(f"Ошибка загрузки выписки {path}, файл пропускается до изменения: {e}")
+            self._failed[path.name] = (stat.st_size, stat.st_mtime_ns)
+            return []
+        self._failed.pop(path.name, None)
+
+        accepted = self._accept(operations)
+        result.files_parsed += 1
+        result.rows_read += len(operations)
+        result.rows_added += len(accepted)
+        result.duplicates += len(operations) - len(accepted)
+        self._files[path.name] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": digest,
+            "rows": len(operations),
+            "added": (known or {}).get("added", 0) + len(accepted),
+        }
+        if accepted:
+            self._write_segment(accepted)
+        self._operations.extend(accepted)
+        return accepted
+
+    def _accept(self, operations: List[Operation]) -> List[Operation]:
+        """Строки файла сверх уже принятых (из каталога и основного файла) с тем же отпечатком"""
+        fingerprints = [row_fingerprint(op) for op in operations]
+        in_file = Counter(fingerprints)
+        base = self._main_file_counts(operations, in_file)
+        taken: Counter = Counter()
+        accepted = []
+        for op, fingerprint in zip(operations, fingerprints):
+            if base[fingerprint] + self._counts[fingerprint] + taken[fingerprint] < in_file[fingerprint]:
+                taken[fingerprint] += 1
+                accepted.append(op)
+        self._counts.update(taken)
+        self._pending.update(taken)
+        return accepted
+
+    def _main_file_counts(self, operations: List[Operation], in_file: Counter) -> Counter:
+        """
+        Число строк основного файла с отпечатками из in_file.
+
+        Отпечатки снимаются только со строк среза с теми же датами, что у
+        operations; из них вычитаются строки каталога, уже дописанные в срез.
+        """
+        snapshot = self.store.snapshot
+        in_store: Counter = Counter()
+        for moment in {op.date for op in operations}:
+            for op in snapshot.operations_between(moment, moment):
+                fingerprint = row_fingerprint(op)
+                if fingerprint in in_file:
+                    in_store[fingerprint] += 1
+        base: Counter = Counter()
+        for fingerprint, count in in_store.items():
+            base[fingerprint] = max(count - (self._counts[fingerprint] - self._pending[fingerprint]), 0)
+        return base
+
+    def _restore(self) -> List[Operation]:
+        """Состояние и принятые операции прошлых запусков"""
+        state_path = self.state_dir / "state.json"
+        if not state_path.exists():
+            return []
+        try:
+            state = json.loads(state_path.read_text(encoding="utf-8"))
+            if state.get("format") != STATE_FORMAT_VERSION or state.get("schema") != schema_fingerprint():
+                logger.warning(f"Состояние {state_path} устарело, каталог будет загружен заново")
+                return []
+            restored: List[Operation] = []
+            for name in state["segments"]:
+                segment = self.state_dir / name
+                meta = json.loads((segment / "meta.json").read_text(encoding="utf-8"))
+                restored.extend(operations_from_frame(read_columns(segment, meta["columns"])))
+        except Exception as e:
+            logger.warning(f"Состояние {state_path} повреждено, каталог будет загружен заново: {e}")
+            return []
+
+        self._files = state["files"]
+        self._segments = list(state["segments"])
+        self._counts = Counter(state["fingerprints"])
+        self._operations = list(restored)
+        logger.info(f"Восстановлено {len(restored)} операций из {self.state_dir}")
+        return restored
+
+    def _write_segment(self, operations: List[Operation]) -> None:
+        """Новый сегмент принятых строк: запись во временный каталог и переименование"""
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        name = f"segment-{len(self._segments) + 1:06d}"
+        frame = operations_to_frame(operations)
+        tmp_dir = Path(tempfile.mkdtemp(prefix=".tmp-", dir=self.state_dir))
+        try:
+            write_columns(tmp_dir, frame)
+            (tmp_dir / "meta.json").write_text(
+                json.dumps({"rows": len(frame), "columns": list(frame.columns)}), encoding="utf-8"
+            )
+            target = self.state_dir / name
+            if target.exists():
+                shutil.rmtree(target)
+            os.rename(tmp_dir, target)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        self._segments.append(name)
+
+    def _save_state(self) -> None:
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        state = {
+            "format": STATE_FORMAT_VERSION,
+            "schema": schema_fingerprint(),
+            "files": self._files,
+            "segments": self._segments,
+            "fingerprints": dict(self._counts),
+        }
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=self.state_dir)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(state, f, ensure_ascii=False)
+            os.replace(tmp_path, self.state_dir / "state.json")
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        result = self.last_result
+        return {
+            "directory": str(self.directory),
+            "files": len(self._files),
+            "failed_files": len(self._failed),
+            "segments": len(self._segments),
+            "operations": len(self._operations),
+            "last_rows_added": result.rows_added if result else 0,
+            "last_seconds": round(result.seconds, 4) if result else 0.0,
+        }
+
+
+statement_ingestor = StatementIngestor(settings.statements_dir, operation_store)
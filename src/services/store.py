@@ -0,0 +1,345 @@
+import heapq
+import logging
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from functools import cached_property
+from operator import attrgetter
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.config import settings
+from src.models.operation import Operation
+from src.services.aggregates import AggregateCube, CubeCell, SliceKey, summarize_range
+from src.services.date_index import DateIndex, SequenceSlice
+from src.services.detectors import DetectionFlags, detectors
+from src.services.excel_processor import load_operations_with_report
+from src.services.investment import InvestmentEngine
+from src.services.pagination import Cursor
+from src.services.reports import build_report_frame, extend_report_frame
+from src.services.search_index import SearchIndex
+from src.services.serialization import encode_rows
+from src.services.services import Transaction, convert_operations_to_transactions
+
+logger = logging.getLogger(__name__)
+
+# Производные структуры среза (cached_property), которые строит warm()
+DERIVED = ("flags", "report_frame", "search_index", "investment", "encoded_rows")
+
+
+@dataclass(frozen=True)
+class OperationSnapshot:
+    """Неизменяемый срез загруженных операций, упорядоченных по дате"""
+
+    source: str
+    operations: List[Operation]
+    transactions: List[Transaction]
+    version: int = 0
+    loaded_at: Optional[datetime] = None
+    load_seconds: float = 0.0
+    rejected_rows: int = 0
+    index: DateIndex = field(default_factory=lambda: DateIndex([]))
+    cube: AggregateCube = field(default_factory=AggregateCube)
+
+    @cached_property
+    def report_frame(self) -> pd.DataFrame:
+        """Таблица для pandas-отчетов: строится при первом обращении, одна на версию данных"""
+        return build_report_frame(self.operations, self.version)
+
+    @cached_property
+    def search_index(self) -> SearchIndex:
+        """Текстовый индекс по описанию и категории: строится при первом поиске, один на версию данных"""
+        return SearchIndex(self.operations)
+
+    def search(
+        self,
+        query: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> List[Transaction]:
+        """Транзакции, где описание или категория содержит запрос, от новых к старым; границы периода включаются"""
+        return [self.transactions[position] for position in self.search_positions(query, start, end, limit, offset)]
+
+    def search_positions(
+        self,
+        query: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        after: Optional[Cursor] = None,
+    ) -> Sequence[int]:
+        """Позиции строк поиска search() в срезе; after — продолжить после курсора"""
+        lower = self.index.lower_bound(start) if start is not None else 0
+        upper = self.index.upper_bound(end) if end is not None else len(self.operations)
+        if after is not None:
+            upper = min(upper, self.resume_position(after))
+        return self.search_index.search(query, lower, max(lower, upper), limit, offset, descending=True)
+
+    @cached_property
+    def flags(self) -> DetectionFlags:
+        """Признаки операций (has_phone, is_person_transfer, ...): один проход на версию данных"""
+        return detectors.classify(self.operations)
+
+    @cached_property
+    def investment(self) -> InvestmentEngine:
+        """Инвесткопилка по суммам в копейках: строится при первом расчете, одна на версию данных"""
+        return InvestmentEngine(self.operations, self.index)
+
+    @cached_property
+    def encoded_rows(self) -> List[bytes]:
+        """JSON каждой транзакции: ответы со списками транзакций склеиваются из готовых байтов"""
+        return encode_rows(self.transactions)
+
+    def encoded(self, positions: Iterable[int]) -> List[bytes]:
+        """Готовый JSON транзакций на позициях positions"""
+        rows = self.encoded_rows
+        return [rows[position] for position in positions]
+
+    def flagged(self, name: str, limit: Optional[int] = None, offset: int = 0) -> List[Transaction]:
+        """Транзакции с признаком name от новых к старым, страница offset/limit"""
+        return [self.transactions[position] for position in self.flagged_positions(name, limit, offset)]
+
+    def flagged_positions(
+        self, name: str, limit: Optional[int] = None, offset: int = 0, after: Optional[Cursor] = None
+    ) -> Sequence[int]:
+        """Позиции строк flagged() в срезе; after — продолжить после курсора"""
+        positions = self.flags.positions(name)
+        # Позиции хранятся по возрастанию: страница берется с конца и разворачивается
+        end = len(positions) if after is None else int(np.searchsorted(positions, self.resume_position(after)))
+        end = max(end - offset, 0)
+        begin = 0 if limit is None else max(end - limit, 0)
+        return positions[begin:end][::-1]  # type: ignore[return-value]
+
+    def resume_position(self, after: Cursor) -> int:
+        """
+        Граница продолжения после курсора: списки идут по (дата, номер строки)
+        по убыванию, следующие строки — на позициях меньше нее.
+
+        Номер строки точен в пределах версии среза; если срез с тех пор
+        перезагружен и строка курсора вне его даты, продолжение начинается
+        с конца этой даты (строки даты курсора отдаются снова, но не пропускаются).
+        """
+        lower, upper = self.index.lower_bound(after.date), self.index.upper_bound(after.date)
+        return after.row if lower <= after.row < upper else upper
+
+    def page(self, positions: Sequence[int]) -> Tuple[List[bytes], Optional[Cursor]]:
+        """JSON строк страницы и курсор ее последней строки"""
+        if not len(positions):
+            return [], None
+        last = int(positions[-1])
+        return self.encoded(positions), Cursor(self.operations[last].date, last)
+
+    def warm(self, names: Sequence[str] = DERIVED) -> "OperationSnapshot":
+        """Строит производные структуры заранее, чтобы первый запрос к срезу их не ждал"""
+        for name in names:
+            getattr(self, name)
+        return self
+
+    def built(self) -> List[str]:
+        """Производные структуры, которые уже построены"""
+        return [name for name in DERIVED if name in self.__dict__]
+
+    def extend_from(self, previous: "OperationSnapshot", added: Sequence[Operation]) -> "OperationSnapshot":
+        """
+        Переносит производные структуры previous, дополняя их строками added.
+
+        Срез — это previous с added в конце (даты added не раньше последней даты
+        previous): позиции старых строк не меняются, поэтому признаки, текстовый
+        индекс, таблица отчетов, копилка и JSON строк считаются только для новых
+        строк. Структуры, не построенные в previous, остаются ленивыми.
+        """
+        built = previous.__dict__
+        cached = self.__dict__  # так же значения кэширует cached_property
+        start = len(previous.operations)
+        if "flags" in built:
+            flags = detectors.classify(added)
+            if flags.names == built["flags"].names:
+                cached["flags"] = built["flags"].extended(flags)
+        if "report_frame" in built:
+            cached["report_frame"] = extend_report_frame(built["report_frame"], added, self.version)
+        if "search_index" in built:
+            cached["search_index"] = built["search_index"].extended(added)
+        if "investment" in built:
+            cached["investment"] = built["investment"].extended(added, self.index)
+        if "encoded_rows" in built:
+            cached["encoded_rows"] = built["encoded_rows"] + encode_rows(self.transactions[start:])
+        return self
+
+    def summarize(self, start: datetime, end: datetime) -> Dict[SliceKey, CubeCell]:
+        """Агрегаты по (категория, знак, валюта) за период"""
+        return summarize_range(self.cube, self.operations, self.index, start, end)
+
+    def operations_between(self, start: datetime, end: datetime) -> Sequence[Operation]:
+        """Операции с датой в [start, end] без копирования"""
+        return SequenceSlice(self.operations, *self.index.span(start, end))
+
+    def transactions_between(self, start: datetime, end: datetime) -> Sequence[Transaction]:
+        """Транзакции с датой в [start, end] без копирования"""
+        return SequenceSlice(self.transactions, *self.index.span(start, end))
+
+    def operations_for_month(self, year: int, month: int) -> Sequence[Operation]:
+        """Операции за календарный месяц без копирования"""
+        return SequenceSlice(self.operations, *self.index.month(year, month))
+
+    def transactions_for_month(self, year: int, month: int) -> Sequence[Transaction]:
+        """Транзакции за календарный месяц без копирования"""
+        return SequenceSlice(self.transactions, *self.index.month(year, month))
+
+
+def build_snapshot(source: str, operations: Iterable[Operation], version: int = 1) -> OperationSnapshot:
+    """Строит срез: сортирует операции по дате и готовит производные структуры"""
+    ordered = sorted(operations, key=attrgetter("date"))
+    return OperationSnapshot(
+        source=source,
+        operations=ordered,
+        transactions=convert_operations_to_transactions(ordered),
+        version=version,
+        loaded_at=datetime.now(),
+        index=DateIndex([op.date for op in ordered]),
+        cube=AggregateCube(ordered, version=version),
+    )
+
+
+class OperationStore:
+    """
+    Единое хранилище операций на процесс.
+
+    Файл читается один раз при load(), все представления и сервисы берут данные
+    из текущего среза, reload() перечитывает источник явно.
+    """
+
+    def __init__(self, source: str) -> None:
+        self.source = source
+        self.last_error: Optional[str] = None
+        self._lock = threading.Lock()
+        self._snapshot = OperationSnapshot(source=source, operations=[], transactions=[])
+
+    @property
+    def snapshot(self) -> OperationSnapshot:
+        return self._snapshot
+
+    @property
+    def operations(self) -> List[Operation]:
+        return self._snapshot.operations
+
+    @property
+    def transactions(self) -> List[Transaction]:
+        return self._snapshot.transactions
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._snapshot.loaded_at is not None
+
+    def load(self) -> OperationSnapshot:
+        """Загружает операции, если они еще не загружены"""
+        if self.is_loaded:
+            return self._snapshot
+        return self.reload()
+
+    def reload(self, source: Optional[str] = None, extra: Iterable[Operation] = ()) -> OperationSnapshot:
+        """
+        Перечитывает источник и заменяет текущий срез.
+
+        extra — операции из других источников (каталога выписок), которые
+        входят в новый срез вместе с файлом.
+        """
+        with self._lock:
+            path = source or self.source
+            started = time.perf_counter()
+            try:
+                operations, report = load_operations_with_report(path)
+            except Exception as e:
+                self.last_error = str(e)
+                raise
+            snapshot = build_snapshot(path, [*operations, *extra], version=self._snapshot.version + 1)
+            snapshot = replace(
+                snapshot, load_seconds=time.perf_counter() - started, rejected_rows=len(report.errors)
+            )
+            snapshot.warm()  # до подмены: запросы видят только полностью построенный срез
+            self.source = path
+            self.last_error = None
+            self._snapshot = snapshot
+
+        logger.info(f"Загружено {len(operations)} операций из {path} за {snapshot.load_seconds:.3f} с")
+        return snapshot
+
+    def append(self, operations: Iterable[Operation]) -> OperationSnapshot:
+        """
+        Добавляет операции к текущему срезу.
+
+        Обычно новые операции не раньше последней загруженной (свежие выписки):
+        тогда они дописываются в конец, и индекс дат, куб агрегатов и уже
+        построенные производные структуры дополняются только новыми строками.
+        Операции из прошлого сливаются со срезом по дате, куб дополняется
+        инкрементально, а построенные в текущем срезе структуры строятся заново.
+        """
+        added = sorted(operations, key=attrgetter("date"))
+        if not added:
+            return self._snapshot
+
+        with self._lock:
+            current = self._snapshot
+            started = time.perf_counter()
+            version = current.version + 1
+            transactions = convert_operations_to_transactions(added)
+            cube = current.cube.copy(version)
+            cube.add_all(added)
+
+            appended = not current.operations or added[0].date >= current.operations[-1].date
+            if appended:
+                merged_operations = current.operations + added
+                merged_transactions = current.transactions + transactions
+                index = current.index.extended([op.date for op in added])
+            else:
+                pairs = heapq.merge(
+                    zip(current.operations, current.transactions),
+                    zip(added, transactions),
+                    key=lambda pair: pair[0].date,
+                )
+                merged_operations, merged_transactions = [], []
+                for op, txn in pairs:
+                    merged_operations.append(op)
+                    merged_transactions.append(txn)
+                index = DateIndex([op.date for op in merged_operations])
+
+            snapshot = replace(
+                current,
+                operations=merged_operations,
+                transactions=merged_transactions,
+                version=version,
+                loaded_at=datetime.now(),
+                load_seconds=time.perf_counter() - started,
+                index=index,
+                cube=cube,
+            )
+            if appended:
+                snapshot.extend_from(current, added)
+            else:
+                snapshot.warm(current.built())
+            self._snapshot = snapshot
+            elapsed = time.perf_counter() - started
+
+        logger.info(f"Добавлено {len(added)} операций за {elapsed:.3f} с")
+        return snapshot
+
+    def stats(self) -> Dict[str, Any]:
+        """Состояние хранилища для /health"""
+        snapshot = self._snapshot
+        return {
+            "source": snapshot.source,
+            "version": snapshot.version,
+            "rows": len(snapshot.operations),
+            "loaded_at": snapshot.loaded_at.isoformat() if snapshot.loaded_at else None,
+            "load_seconds": round(snapshot.load_seconds, 4),
+            "rejected_rows": snapshot.rejected_rows,
+            "last_error": self.last_error,
+        }
+
+
+operation_store = OperationStore(settings.excel_file_path)
@@ -1,63 +1,71 @@
+import asyncio
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Literal
+from decimal import Decimal
+from typing import Any, Dict, Literal, Optional
 
-import pandas as pd
 from fastapi import APIRouter
 
-from src.services.excel_processor import load_operations_from_excel  # Добавляем импорт
-from src.services.finance_api import get_currency_rates, get_stock_prices
+from src.services.aggregates import totals_by_category
+from src.services.database import operation_database
+from src.services.executors import cpu_pool
+from src.services.finance_api import get_quotes_async
+from src.services.store import operation_store
 
 router = APIRouter()
 
 
 def get_date_range(date: datetime, period: str) -> tuple[datetime, datetime]:
+    day_start = date.replace(hour=0, minute=0, second=0, microsecond=0)
     if period == "W":
-        start = date - timedelta(days=date.weekday())
+        start = day_start - timedelta(days=date.weekday())
     elif period == "M":
-        start = date.replace(day=1)
+        start = day_start.replace(day=1)
     elif period == "Y":
-        start = date.replace(month=1, day=1)
+        start = day_start.replace(month=1, day=1)
     else:  # ALL
         start = datetime(1970, 1, 1)
     return start, date
 
 
-def get_transactions(start_date: datetime, end_date: datetime) -> List[Dict[str, Any]]:
-    """Получает транзакции для указанного периода"""
-    operations = load_operations_from_excel("data/operations.xlsx")
+def get_events_summary(start_date: datetime, end_date: datetime) -> Dict[str, Any]:
+    """Расходы и доходы за период по категориям"""
+    if operation_database.serves_queries:
+        summary = operation_database.summarize(start_date, end_date)
+    else:
+        summary = operation_store.snapshot.summarize(start_date, end_date)
 
-    filtered_ops = [op for op in operations if start_date <= op.date <= end_date]
-
-    return [op.to_dict() for op in filtered_ops]
-
-
-@router.get("/events/{date_str}")
-async def events_page(date_str: str, period: Literal["W", "M", "Y", "ALL"] = "M") -> Dict[str, Any]:
-    date = datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S")
-    start_date, end_date = get_date_range(date, period)
-
-    transactions_data = get_transactions(start_date, end_date)
-    df = pd.DataFrame(transactions_data)
-
-    expenses = df[df["amount"] < 0]
-    expenses_by_category = expenses.groupby("category")["amount"].sum().abs()
-    top_expenses = expenses_by_category.nlargest(7)
-    other_expenses = expenses_by_category.sum() - top_expenses.sum()
+    expenses_by_category = {
+        category: abs(cell.total) for category, cell in sorted(totals_by_category(summary, -1).items())
+    }
+    top_expenses = sorted(expenses_by_category.items(), key=lambda x: x[1], reverse=True)[:7]
+    total_expenses = sum(expenses_by_category.values(), Decimal("0"))
+    other_expenses = total_expenses - sum((amount for _, amount in top_expenses), Decimal("0"))
 
-    income = df[df["amount"] > 0]
+    income_by_category = {category: cell.total for category, cell in sorted(totals_by_category(summary, 1).items())}
 
     return {
         "expenses": {
-            "total": round(expenses["amount"].abs().sum()),
-            "main_categories": [{"category": k, "amount": round(v)} for k, v in top_expenses.items()],
+            "total": round(total_expenses),
+            "main_categories": [{"category": k, "amount": round(v)} for k, v in top_expenses],
             "other": round(other_expenses),
         },
         "income": {
-            "total": round(income["amount"].sum()),
-            "categories": [
-                {"category": k, "amount": round(v)} for k, v in income.groupby("category")["amount"].sum().items()
-            ],
+            "total": round(sum(income_by_category.values(), Decimal("0"))),
+            "categories": [{"category": k, "amount": round(v)} for k, v in income_by_category.items()],
         },
-        "currencies": get_currency_rates(),
-        "stocks": get_stock_prices(),
     }
+
+
+@router.get("/events/{date_str}")
+async def events_page(
+    date_str: str, period: Literal["W", "M", "Y", "ALL"] = "M", user: Optional[str] = None
+) -> Dict[str, Any]:
+    date = datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S")
+    start_date, end_date = get_date_range(date, period)
+
+    # Расчет по срезу и котировки выполняются в пулах параллельно, цикл событий свободен
+    summary, quotes = await asyncio.gather(
+        cpu_pool.run(get_events_summary, start_date, end_date), get_quotes_async(user)
+    )
+
+    return {**summary, "currencies": quotes["currencies"], "stocks": quotes["stocks"]}
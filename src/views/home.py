@@ -1,29 +1,59 @@
 from datetime import datetime
+from typing import Dict, List, Optional, Sequence
 
-from src.services.analyzer import analyze_spending, calculate_cashback, get_top_transactions
-from src.services.excel_processor import load_operations_from_excel
-from src.services.finance_api import get_currency_rates, get_stock_prices
+from src.models.operation import Operation
+from src.services.analyzer import (
+    analyze_spending,
+    calculate_cashback,
+    cashback_from_summary,
+    get_top_transactions,
+    spending_from_summary,
+)
+from src.services.finance_api import get_quotes
+from src.services.store import operation_store
 
+Quotes = Dict[str, Dict[str, float]]
 
-def get_home_data(excel_path: str, target_date: datetime) -> dict:
-    """Генерирует данные для главной страницы"""
-    operations = load_operations_from_excel(excel_path)
 
-    start_date = target_date.replace(day=1)
-    monthly_ops = [op for op in operations if start_date <= op.date <= target_date]
+def get_home_data(
+    target_date: datetime,
+    operations: Optional[List[Operation]] = None,
+    user: Optional[str] = None,
+    quotes: Optional[Quotes] = None,
+) -> dict:
+    """Генерирует данные для главной страницы; без quotes котировки запрашиваются здесь"""
+    return with_quotes(get_home_summary(target_date, operations), quotes if quotes is not None else get_quotes(user))
 
-    analysis = analyze_spending(monthly_ops)
+
+def get_home_summary(target_date: datetime, operations: Optional[List[Operation]] = None) -> dict:
+    """Расчетная часть главной страницы (без котировок): выполняется в cpu_pool"""
+    start_date = target_date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    monthly_ops: Sequence[Operation]
+    if operations is None:
+        # Суммы берутся из куба агрегатов, строки нужны только для топа операций
+        snapshot = operation_store.snapshot
+        monthly_ops = snapshot.operations_between(start_date, target_date)
+        summary = snapshot.summarize(start_date, target_date)
+        analysis = spending_from_summary(summary)
+        cashback = cashback_from_summary(summary)
+    else:
+        monthly_ops = [op for op in operations if start_date <= op.date <= target_date]
+        analysis = analyze_spending(monthly_ops)
+        cashback = calculate_cashback(monthly_ops)
 
     return {
         "greeting": get_greeting(target_date),
         "total_spent": analysis["total_spent"],
-        "cashback": calculate_cashback(monthly_ops),
+        "cashback": cashback,
         "top_transactions": get_top_transactions(monthly_ops, 5),
-        "currencies": get_currency_rates(),
-        "stocks": get_stock_prices(),
     }
 
 
+def with_quotes(summary: dict, quotes: Quotes) -> dict:
+    """Данные главной страницы: расчет и котировки"""
+    return {**summary, "currencies": quotes["currencies"], "stocks": quotes["stocks"]}
+
+
 def get_greeting(date: datetime) -> str:
     hour = date.hour
     if 5 <= hour < 12:
@@ -85,3 +85,19 @@ def test_operation_missing_data() -> None:
     assert op.currency == "RUB"
     assert op.cashback == Decimal("0")
     assert op.category == ""
+
+
+def test_operation_is_compact() -> None:
+    """Операция хранится в __slots__, повторяющиеся строки разделяются"""
+    data = {
+        "Дата операции": "01.01.2023 12:00:00",
+        "Дата платежа": "02.01.2023",
+        "Сумма операции": "-100,50",
+        "Категория": "".join(["Fo", "od"]),
+    }
+
+    first = Operation.from_dict(data)
+    second = Operation.from_dict({**data, "Категория": "".join(["F", "ood"])})
+
+    assert not hasattr(first, "__dict__")
+    assert first.category is second.category
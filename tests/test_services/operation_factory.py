@@ -0,0 +1,37 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Union
+
+from src.models.operation import Operation
+
+_MONEY_FIELDS = ("amount", "cashback", "bonuses", "rounding")
+
+
+def make_operation(
+    date: Union[datetime, str], amount: str = "100", category: str = "", description: str = "", **fields: Any
+) -> Operation:
+    """
+    Операция для тестов.
+
+    date — datetime или строка ISO, дата платежа совпадает с датой операции.
+    fields переопределяют остальные поля; денежные можно передавать строками.
+    """
+    moment = datetime.fromisoformat(date) if isinstance(date, str) else date
+    values: dict = {
+        "date": moment,
+        "payment_date": moment,
+        "card_number": "*1234",
+        "status": "OK",
+        "amount": amount,
+        "currency": "RUB",
+        "cashback": "0",
+        "category": category,
+        "mcc": None,
+        "description": description,
+        "bonuses": "0",
+        "rounding": "0",
+        **fields,
+    }
+    for name in _MONEY_FIELDS:
+        values[name] = Decimal(values[name])
+    return Operation(**values)
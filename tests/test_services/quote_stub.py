@@ -0,0 +1,57 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from typing import Dict, Set, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+
+class QuoteStub:
+    """Локальный сервер котировок: цены, задержки и ошибки задаются в тесте"""
+
+    def __init__(self) -> None:
+        self.prices: Dict[str, float] = {"AAPL": 150.0, "GOOGL": 2800.0, "MSFT": 300.0, "TSLA": 700.0, "AMZN": 3300.0}
+        self.rates: Dict[str, float] = {"USD": 1.0, "EUR": 0.9, "GBP": 0.8, "CNY": 7.1}
+        self.delays: Dict[str, float] = {}
+        self.currency_status = 200
+        self.batch_supported = True
+        self.batch_requests = 0
+        self.requests = 0
+        self.connections: Set[Tuple[str, int]] = set()
+        self.url = ""
+        self._lock = threading.Lock()
+
+    @property
+    def stock_api_base(self) -> str:
+        return f"{self.url}/stock"
+
+    @property
+    def currency_api_url(self) -> str:
+        return f"{self.url}/latest/USD"
+
+    def handle(self, handler: BaseHTTPRequestHandler) -> Tuple[int, str]:
+        with self._lock:
+            self.requests += 1
+            self.connections.add(handler.client_address)
+
+        url = urlsplit(handler.path)
+        parts = url.path.strip("/").split("/")
+        if parts == ["stock", "market", "batch"]:
+            if not self.batch_supported:
+                return 404, "Not found"
+            with self._lock:
+                self.batch_requests += 1
+            symbols = parse_qs(url.query)["symbols"][0].split(",")
+            time.sleep(max((self.delays.get(symbol, 0.0) for symbol in symbols), default=0.0))
+            return 200, json.dumps(
+                {symbol: {"price": self.prices[symbol]} for symbol in symbols if symbol in self.prices}
+            )
+        if parts[:2] == ["latest", "USD"]:
+            time.sleep(self.delays.get("currencies", 0.0))
+            return self.currency_status, json.dumps({"base": "USD", "rates": self.rates})
+        if len(parts) == 3 and parts[0] == "stock" and parts[2] == "price":
+            symbol = parts[1]
+            time.sleep(self.delays.get(symbol, 0.0))
+            if symbol in self.prices:
+                return 200, str(self.prices[symbol])
+        return 404, "Unknown symbol"
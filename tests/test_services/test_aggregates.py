@@ -0,0 +1,57 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import List
+
+import pytest
+
+from src.models.operation import Operation
+from src.services.aggregates import AggregateCube, summarize_range, totals_by_category
+from src.services.date_index import DateIndex
+from tests.test_services.operation_factory import make_operation
+
+
+@pytest.fixture
+def operations() -> List[Operation]:
+    return [
+        make_operation(datetime(2024, 1, 5), "100", "Food", cashback="5", bonuses="1"),
+        make_operation(datetime(2024, 1, 20), "40", "Food", cashback="-1", bonuses="1"),
+        make_operation(datetime(2024, 2, 3), "-300", "Salary", bonuses="1"),
+        make_operation(datetime(2024, 2, 10), "60", "Taxi", cashback="2", bonuses="1"),
+    ]
+
+
+def test_cube_cells(operations: List[Operation]) -> None:
+    """Тест агрегатов по месяцу и категории"""
+    cube = AggregateCube(operations)
+
+    cell = cube.month("2024-01")[("Food", 1, "RUB")]
+    assert cell.total == Decimal("140")
+    assert cell.count == 2
+    assert cell.cashback == Decimal("4")
+    assert cell.cashback_earned == Decimal("5")
+    assert cube.month("2024-02")[("Salary", -1, "RUB")].total == Decimal("-300")
+    assert cube.months() == ["2024-01", "2024-02"]
+
+
+def test_cube_incremental_copy(operations: List[Operation]) -> None:
+    """Копия куба дополняется независимо от исходного"""
+    cube = AggregateCube(operations, version=1)
+    extended = cube.copy(2)
+    extended.add(make_operation(datetime(2024, 1, 25), "10", "Food", bonuses="1"))
+
+    assert (cube.version, extended.version) == (1, 2)
+    assert extended.month("2024-01")[("Food", 1, "RUB")].total == Decimal("150")
+    assert cube.month("2024-01")[("Food", 1, "RUB")].total == Decimal("140")
+
+
+def test_summarize_range_matches_rows(operations: List[Operation]) -> None:
+    """Полные месяцы берутся из куба, неполные досчитываются по строкам"""
+    cube = AggregateCube(operations)
+    index = DateIndex([op.date for op in operations])
+
+    summary = summarize_range(cube, operations, index, datetime(2024, 1, 10), datetime(2024, 2, 28))
+    expenses = totals_by_category(summary, 1)
+
+    assert expenses["Food"].total == Decimal("40")
+    assert expenses["Taxi"].total == Decimal("60")
+    assert totals_by_category(summary, -1)["Salary"].total == Decimal("-300")
@@ -0,0 +1,236 @@
+from datetime import datetime
+from pathlib import Path
+from typing import Any, List, Set
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, inspect, text
+
+from src.main import app
+from src.models.operation import Operation
+from src.services.database import OperationDatabase
+from src.services.excel_processor import load_operations_with_report
+from src.services.reports import category_spending_from_cube, category_spending_from_database
+from src.services.serialization import dumps
+from src.services.services import simple_search
+from src.services.store import build_snapshot
+from tests.test_services.operation_factory import make_operation
+
+
+OPERATIONS = [
+    make_operation("2024-01-05 10:00:00", "100.10", "Супермаркеты", "Магнит", cashback="1.00", mcc=5411),
+    make_operation("2024-01-06 11:00:00", "250.55", "Супермаркеты", "ПЯТЁРОЧКА", cashback="2.50", mcc=5411),
+    make_operation("2024-01-20 12:00:00", "1000.00", "Переводы", "Иван П.", mcc=5411),
+    make_operation("2024-02-03 09:00:00", "75.00", "Кафе", "Кофе магнитный", mcc=5411),
+]
+
+
+@pytest.fixture
+def database(tmp_path: Path) -> OperationDatabase:
+    database = OperationDatabase(f"sqlite:///{tmp_path / 'ops.db'}")
+    yield database
+    database.close()
+
+
+def import_all(database: OperationDatabase, operations: List[Operation], digest: str = "v1") -> int:
+    return database.import_operations("statement.xlsx", operations, digest=digest)
+
+
+def index_names(database: OperationDatabase) -> Set[str]:
+    return {index["name"] for index in inspect(database.engine).get_indexes("operations")}
+
+
+def test_import_once_per_content(database: OperationDatabase) -> None:
+    """Тот же файл не записывается повторно, измененный заменяет свои строки"""
+    assert import_all(database, OPERATIONS) == 4
+    assert import_all(database, OPERATIONS) == 0
+    assert import_all(database, OPERATIONS[:2], digest="v2") == 2
+    assert database.count() == 2
+    assert database.stats()["sources"] == 1
+
+
+def test_round_trip_keeps_kopecks(database: OperationDatabase) -> None:
+    import_all(database, OPERATIONS)
+    restored = database.operations_between(datetime(2024, 1, 1), datetime(2024, 1, 31, 23, 59, 59))
+    assert restored == OPERATIONS[:3]
+    whole_year = (datetime(2024, 1, 1), datetime(2024, 12, 31))
+    assert database.operations_between(*whole_year, limit=1, offset=3) == OPERATIONS[3:]
+
+
+def test_load_operations_by_content(database: OperationDatabase) -> None:
+    """Записанный файл загружается из базы, пока содержимое не изменилось"""
+    summary = {"total_rows": 6, "loaded": 4, "skipped": 2, "errors": []}
+    database.import_operations("statement.xlsx", OPERATIONS, digest="v1", report=summary)
+    assert database.load_operations("statement.xlsx", "v1") == (OPERATIONS, summary)
+    assert database.load_operations("statement.xlsx", "v2") is None
+    assert database.load_operations("other.xlsx", "v1") is None
+
+
+def test_excel_loaded_from_database(database: OperationDatabase, tmp_path: Path) -> None:
+    """При промахе кэша выписка с тем же содержимым берется из базы, Excel не разбирается"""
+    path = tmp_path / "statement.xlsx"
+    pd.DataFrame(
+        {
+            "Дата операции": ["05.01.2024 10:00:00", "bad"],
+            "Дата платежа": ["05.01.2024", "05.01.2024"],
+            "Сумма операции": ["-100,10", "-1,00"],
+            "Категория": ["Супермаркеты", "Супермаркеты"],
+            "MCC": [5411, 5411],
+            "Описание": ["Магнит", "Магнит"],
+        }
+    ).to_excel(path, index=False)
+
+    with patch("src.services.excel_processor.operation_database", database):
+        parsed, _ = load_operations_with_report(str(path), use_cache=False)
+        with patch("src.services.excel_processor.process_pool.call", side_effect=AssertionError("Excel разобран")):
+            stored, report = load_operations_with_report(str(path), use_cache=False)
+
+    assert stored == parsed
+    assert (report.total_rows, report.loaded, len(report.errors)) == (2, 1, 1)
+    assert report.errors[0].column == "Дата операции"
+
+
+def test_database_operations_identical_to_excel(database: OperationDatabase, tmp_path: Path) -> None:
+    """Операции из базы совпадают с разобранными из Excel вплоть до знаков Decimal: ответ не зависит от источника"""
+    path = tmp_path / "statement.xlsx"
+    pd.DataFrame(
+        {
+            "Дата операции": ["05.01.2024 10:00:00", "06.01.2024 11:00:00", "20.01.2024 12:00:00"],
+            "Дата платежа": ["05.01.2024", "06.01.2024", "20.01.2024"],
+            "Сумма операции": ["-150,00", "-100,10", "1000,00"],
+            "Кэшбэк": ["1,50", "0,00", "10,00"],
+            "Категория": ["Супермаркеты", "Кафе", "Пополнения"],
+            "MCC": [5411, 5814, None],
+            "Описание": ["Магнит", "Кофе", "Зарплата"],
+            "Бонусы (включая кэшбэк)": ["3,00", "1,00", "0,00"],
+            "Округление на инвесткопилку": ["0,00", "9,90", "0,00"],
+        }
+    ).to_excel(path, index=False)
+
+    with patch("src.services.excel_processor.operation_database", database):
+        parsed, _ = load_operations_with_report(str(path), use_cache=False)
+        stored, _ = load_operations_with_report(str(path), use_cache=False)
+    whole_month = database.operations_between(datetime(2024, 1, 1), datetime(2024, 1, 31))
+
+    assert stored == parsed == whole_month
+    assert [str(op.amount) for op in stored] == ["150.00", "100.10", "1000.00"]
+    assert dumps(stored) == dumps(parsed) == dumps(whole_month)
+
+
+def test_outdated_schema_recreated(tmp_path: Path) -> None:
+    """Таблицы без новых столбцов создаются заново"""
+    url = f"sqlite:///{tmp_path / 'old.db'}"
+    engine = create_engine(url)
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE operations (id INTEGER PRIMARY KEY, description VARCHAR)"))
+    engine.dispose()
+
+    database = OperationDatabase(url)
+    import_all(database, OPERATIONS)
+    assert database.count() == 4
+    database.close()
+
+
+def test_summarize_matches_snapshot(database: OperationDatabase) -> None:
+    import_all(database, OPERATIONS)
+    snapshot = build_snapshot("statement.xlsx", OPERATIONS)
+    for start, end in [(datetime(2024, 1, 1), datetime(2024, 1, 31)), (datetime(2023, 1, 1), datetime(2025, 1, 1))]:
+        assert database.summarize(start, end) == snapshot.summarize(start, end)
+
+
+def test_category_report_matches_cube(database: OperationDatabase) -> None:
+    """Отчет по категории из базы совпадает с отчетом по кубу агрегатов"""
+    operations = OPERATIONS + [
+        make_operation("2023-12-15 10:00:00", "-300.00", "Супермаркеты", "Ашан"),
+        make_operation("2024-01-10 10:00:00", "-120.45", "Супермаркеты", "Магнит"),
+        make_operation("2024-01-31 23:00:00", "-9.55", "Супермаркеты", "Магнит"),
+        make_operation("2024-02-01 00:00:00", "-50.00", "Супермаркеты", "Магнит"),
+        make_operation("2024-01-12 10:00:00", "-70.00", "Кафе", "Кофе"),
+    ]
+    import_all(database, operations)
+    cube = build_snapshot("statement.xlsx", operations).cube
+
+    for category in ["Супермаркеты", "Кафе", "Нет такой"]:
+        expected = category_spending_from_cube(cube, category, "2024-02-10")
+        assert category_spending_from_database(database, category, "2024-02-10") == expected
+    assert category_spending_from_database(database, "Супермаркеты", "2024-02-10") == {
+        "2024-02": 50.0,
+        "2024-01": 130.0,
+        "2023-12": 300.0,
+    }
+
+
+def test_category_query_uses_index(database: OperationDatabase) -> None:
+    """Траты категории считаются поиском по индексу (категория, дата), без просмотра таблицы"""
+    import_all(database, OPERATIONS)
+    assert "ix_operations_category_date" in index_names(database)
+
+    statements = []
+
+    def capture(connection: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        if "sum(" in statement:
+            statements.append((statement, parameters))
+
+    event.listen(database.engine, "before_cursor_execute", capture)
+    database.category_spending("Супермаркеты", ["2024-01"])
+    event.remove(database.engine, "before_cursor_execute", capture)
+
+    statement, parameters = statements[0]
+    with database.engine.connect() as connection:
+        plan = " ".join(row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters))
+    assert "USING INDEX ix_operations_category_date (category=? AND date>? AND date<?)" in plan
+
+
+def test_category_route_served_by_database(tmp_path: Path) -> None:
+    """С pushdown маршрут отчета по категории считает траты в базе, а не по срезу в памяти"""
+    database = OperationDatabase(f"sqlite:///{tmp_path / 'ops.db'}", pushdown=True)
+    import_all(database, [make_operation("2024-01-10 10:00:00", "-120.45", "Кафе", "Кофе")])
+
+    with patch("src.main.operation_database", database):
+        response = TestClient(app).get("/api/reports/category/Кафе", params={"date": "2024-01-15"})
+    database.close()
+
+    assert response.json() == {"2024-01": 120.45, "2023-12": 0.0, "2023-11": 0.0}
+
+
+def test_outdated_indexes_recreated(tmp_path: Path) -> None:
+    """Таблица без нового индекса создается заново вместе с ним"""
+    url = f"sqlite:///{tmp_path / 'old.db'}"
+    database = OperationDatabase(url)
+    import_all(database, OPERATIONS)
+    with database.engine.begin() as connection:
+        connection.execute(text("DROP INDEX ix_operations_category_date"))
+    database.close()
+
+    database = OperationDatabase(url)
+    assert "ix_operations_category_date" in index_names(database)
+    database.close()
+
+
+def test_search_matches_simple_search(database: OperationDatabase) -> None:
+    """Регистр кириллицы не учитывается, как в simple_search"""
+    import_all(database, OPERATIONS)
+    newest_first = build_snapshot("statement.xlsx", OPERATIONS).transactions[::-1]
+    for query in ["магнит", "пятёрочка", "ПЕРЕВОДЫ", "нет такого"]:
+        assert database.search(query) == simple_search(newest_first, query)
+    assert [t["description"] for t in database.search("магнит", limit=1, offset=1)] == ["Магнит"]
+    assert database.search("магнит", end=datetime(2024, 1, 31)) == simple_search(newest_first[-1:], "магнит")
+
+
+def test_search_pages_newest_first(database: OperationDatabase) -> None:
+    """Поиск в базе идет от новых к старым, курсор продолжает выдачу без пропусков и повторов"""
+    import_all(database, OPERATIONS)
+    expected = database.search("а")
+
+    first, after = database.search_page("а", limit=2)
+    rest, _ = database.search_page("а", after=after)
+
+    assert [t["date"] for t in expected] == sorted((t["date"] for t in expected), reverse=True)
+    assert first + rest == expected
+
+
+def test_sqlite_uses_wal(database: OperationDatabase) -> None:
+    with database.engine.connect() as connection:
+        assert connection.execute(text("PRAGMA journal_mode")).scalar_one() == "wal"
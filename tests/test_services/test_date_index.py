@@ -0,0 +1,53 @@
+from datetime import date, datetime
+
+import pytest
+
+from src.services.date_index import DateIndex, SequenceSlice
+
+
+@pytest.fixture
+def index() -> DateIndex:
+    return DateIndex(
+        [
+            datetime(2023, 12, 31, 23, 0),
+            datetime(2024, 1, 1, 9, 0),
+            datetime(2024, 1, 15, 12, 0),
+            datetime(2024, 1, 15, 18, 0),
+            datetime(2024, 2, 1, 10, 0),
+        ]
+    )
+
+
+def test_span(index: DateIndex) -> None:
+    """Тест поиска диапазона дат"""
+    assert index.span(datetime(2024, 1, 1), datetime(2024, 1, 15, 12, 0)) == (1, 3)
+    assert index.span(datetime(2024, 1, 2), datetime(2024, 1, 14)) == (2, 2)
+    assert index.span(datetime(2025, 1, 1), datetime(2024, 1, 1)) == (5, 5)
+
+
+def test_buckets(index: DateIndex) -> None:
+    """Тест границ дня, месяца и года"""
+    assert index.day(date(2024, 1, 15)) == (2, 4)
+    assert index.month(2024, 1) == (1, 4)
+    assert index.month(2024, 3) == (5, 5)
+    assert index.year(2023) == (0, 1)
+    assert index.months() == [(2023, 12), (2024, 1), (2024, 2)]
+
+
+def test_unsorted_dates_rejected() -> None:
+    """Индекс требует отсортированных дат"""
+    with pytest.raises(ValueError):
+        DateIndex([datetime(2024, 1, 2), datetime(2024, 1, 1)])
+
+
+def test_sequence_slice() -> None:
+    """Срез не копирует данные и ведет себя как последовательность"""
+    items = list(range(10))
+    view = SequenceSlice(items, 2, 6)
+
+    assert len(view) == 4
+    assert list(view) == [2, 3, 4, 5]
+    assert view[-1] == 5
+    assert view[1:3] == [3, 4]
+    with pytest.raises(IndexError):
+        view[4]
@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+from typing import List
+from unittest.mock import Mock
+
+import pytest
+
+from src.models.operation import Operation
+from src.services.detectors import DetectorRegistry, has_phone_number, is_person_transfer
+from src.services.services import find_person_transfers, find_phone_transactions
+from src.services.store import build_snapshot
+from tests.test_services.operation_factory import make_operation
+
+ROWS = [
+    ("Пополнение +7 921 123-45-67", "Мобильная связь"),
+    ("Перевод Иван И.", "Переводы"),
+    ("Яндекс Такси", "Такси"),
+    ("Перевод Иван И.", "Другое"),
+    ("МТС 8(912)3456789", "Мобильная связь"),
+]
+
+
+@pytest.fixture
+def operations() -> List[Operation]:
+    start = datetime(2024, 1, 1)
+    return [
+        make_operation(start + timedelta(days=i), "100", category, description)
+        for i, (description, category) in enumerate(ROWS * 10)
+    ]
+
+
+def test_flags_match_scans(operations: List[Operation]) -> None:
+    """Выборка по флагам совпадает с поиском полным просмотром, от новых к старым"""
+    snapshot = build_snapshot("test", operations)
+
+    assert snapshot.flagged("has_phone") == find_phone_transactions(snapshot.transactions[::-1])
+    assert snapshot.flagged("is_person_transfer") == find_person_transfers(snapshot.transactions[::-1])
+    assert snapshot.flags.count("has_phone") == 20
+    assert snapshot.flagged("is_person_transfer", limit=3, offset=2) == snapshot.flagged("is_person_transfer")[2:5]
+
+
+def test_detectors_run_once_per_text(operations: List[Operation]) -> None:
+    """Все признаки считаются за один проход, по разу на уникальный текст"""
+    registry = DetectorRegistry()
+    phone = Mock(side_effect=has_phone_number)
+    registry.register("has_phone", phone)
+
+    @registry.register("is_taxi")
+    def is_taxi(description: str, category: str) -> bool:
+        return category == "Такси"
+
+    flags = registry.classify(operations)
+    registry.classify(operations[:10])
+
+    assert phone.call_count == len(ROWS)
+    assert flags.names == ("has_phone", "is_taxi")
+    assert flags.column("is_taxi").sum() == 10
+    assert list(flags.positions("is_taxi")[:2]) == [2, 7]
+
+
+def test_unknown_flag(operations: List[Operation]) -> None:
+    registry = DetectorRegistry()
+    registry.register("is_person_transfer", is_person_transfer)
+
+    with pytest.raises(KeyError):
+        registry.classify(operations).positions("has_phone")
@@ -5,7 +5,17 @@ from typing import Any
 import pandas as pd
 import pytest
 
-from src.services.excel_processor import filter_operations_by_date, load_operations_from_excel
+from src.models.operation import Operation
+from src.services.excel_processor import (
+    IngestionReport,
+    filter_operations_by_date,
+    iter_operation_batches,
+    iter_operations_from_excel,
+    load_operations_from_excel,
+    load_operations_with_report,
+    operations_from_frame,
+    parse_operations_frame,
+)
 
 
 @pytest.fixture
@@ -58,3 +68,53 @@ def test_filter_operations_by_date(sample_excel: Path) -> None:
 
     assert len(filtered) == 1
     assert filtered[0].amount == 100.50
+
+
+def test_load_operations_with_report(tmp_path: Path) -> None:
+    """Тест отчета об ошибках строк"""
+    file_path = tmp_path / "broken.xlsx"
+    data = {
+        "Дата операции": ["01.01.2023 12:00:00", "bad date", None, "03.01.2023 10:00:00"],
+        "Сумма операции": ["-100,50", "-1,00", "-2,00", "abc"],
+        "MCC": ["5411", None, None, "x"],
+    }
+    pd.DataFrame(data).to_excel(file_path, index=False)
+
+    operations, report = load_operations_with_report(str(file_path))
+
+    assert len(operations) == 1
+    assert operations[0].mcc == 5411
+    assert operations[0].payment_date == operations[0].date
+    assert report.total_rows == 4
+    assert report.skipped == 1
+    assert [(error.row, error.column) for error in report.errors] == [(3, "Дата операции"), (5, "Сумма операции")]
+
+
+def test_vectorized_parse_matches_from_dict(sample_excel: Path) -> None:
+    """Колоночный разбор дает те же операции, что и Operation.from_dict"""
+    df = pd.read_excel(sample_excel)
+    frame, _ = parse_operations_frame(df)
+
+    expected = [Operation.from_dict({key: str(value) for key, value in row.items()}) for row in df.to_dict("records")]
+
+    assert operations_from_frame(frame) == expected
+
+
+def test_iter_operation_batches(sample_excel: Path) -> None:
+    """Тест потокового чтения пачками"""
+    report = IngestionReport(source=str(sample_excel))
+    batches = list(iter_operation_batches(str(sample_excel), batch_size=1, report=report))
+
+    assert [len(batch) for batch in batches] == [1, 1]
+    assert [op for batch in batches for op in batch] == load_operations_from_excel(str(sample_excel))
+    assert report.loaded == 2
+
+
+def test_filter_operations_by_date_lazy(sample_excel: Path) -> None:
+    """Фильтрация принимает потоковый итератор операций"""
+    filtered = filter_operations_by_date(
+        iter_operations_from_excel(str(sample_excel)), datetime(2023, 1, 2), datetime(2023, 1, 2, 23, 59)
+    )
+
+    assert len(filtered) == 1
+    assert filtered[0].category == "Transport"
@@ -0,0 +1,83 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Iterator
+
+import pytest
+
+from src.services.executors import WorkerPool
+
+
+@pytest.fixture
+def pool() -> Iterator[WorkerPool]:
+    pool = WorkerPool("test", 2)
+    yield pool
+    pool.shutdown()
+
+
+def test_run_does_not_block_event_loop(pool: WorkerPool) -> None:
+    """Пока пул выполняет блокирующий вызов, цикл событий обслуживает другие задачи"""
+
+    async def scenario() -> float:
+        ticks = 0
+
+        async def ticker() -> None:
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        task = asyncio.create_task(ticker())
+        await pool.run(time.sleep, 0.2)
+        task.cancel()
+        return ticks
+
+    assert asyncio.run(scenario()) >= 10
+
+
+def test_pool_size_bounded(pool: WorkerPool) -> None:
+    """Одновременно выполняется не больше workers вызовов"""
+
+    async def scenario() -> float:
+        started = time.perf_counter()
+        await asyncio.gather(*(pool.run(time.sleep, 0.1) for _ in range(4)))
+        return time.perf_counter() - started
+
+    assert asyncio.run(scenario()) >= 0.2
+    assert pool.stats()["completed"] == 4
+    assert pool.stats()["in_flight"] == 0
+
+
+def test_stats_count_failures(pool: WorkerPool) -> None:
+    """Ошибка вызова пробрасывается вызывающему и учитывается в статистике"""
+
+    def fail() -> None:
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        pool.call(fail)
+
+    assert pool.stats()["failed"] == 1
+
+
+def test_disabled_pool_uses_fallback(pool: WorkerPool) -> None:
+    """Выключенный пул передает run в запасной пул, а call выполняет на месте"""
+    disabled = WorkerPool("disabled", 0, processes=True, fallback=pool)
+
+    worker = asyncio.run(disabled.run(threading.current_thread))
+    caller = disabled.call(threading.current_thread)
+
+    assert worker.name.startswith("test")
+    assert caller is threading.current_thread()
+    assert pool.stats()["completed"] == 1
+
+
+def test_process_pool_runs_in_child_process() -> None:
+    """Процессный пул выполняет вызовы в дочернем процессе"""
+    processes = WorkerPool("process", 1, processes=True)
+    try:
+        assert processes.call(os.getpid) != os.getpid()
+        assert asyncio.run(processes.run(os.getpid)) != os.getpid()
+    finally:
+        processes.shutdown()
@@ -1,16 +1,38 @@
-from typing import Any, Dict  # Добавляем импорты для типов
-from unittest.mock import Mock, patch
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterator  # Добавляем импорты для типов
+from unittest.mock import patch
 
-from src.services.finance_api import get_currency_rates, get_stock_prices
+import pytest
 
+from src.config import settings
+from src.services.finance_api import get_currency_rates, get_quotes, get_stock_prices, quote_cache
+from src.services.market_data import MarketDataClient
+from tests.test_services.quote_stub import QuoteStub
 
-@patch("requests.get")
-def test_get_currency_rates_success(mock_get: Mock) -> None:
+
+@pytest.fixture(autouse=True)
+def clear_quote_cache() -> Iterator[None]:
+    """Каждый тест начинает с пустого кэша котировок"""
+    quote_cache.clear()
+    yield
+    quote_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def stub_market_data(quote_stub: QuoteStub) -> Iterator[MarketDataClient]:
+    """Котировки запрашиваются у локального сервера, а не в сети"""
+    client = MarketDataClient(
+        stock_api_base=quote_stub.stock_api_base, currency_api_url=quote_stub.currency_api_url, deadline=2.0
+    )
+    with patch("src.services.finance_api.market_data", client):
+        yield client
+    client.close()
+
+
+def test_get_currency_rates_success(quote_stub: QuoteStub) -> None:
     """Тест успешного получения курсов валют"""
-    mock_response = Mock()
-    mock_response.json.return_value = {"rates": {"USD": 1.0, "EUR": 0.85, "GBP": 0.75, "CNY": 7.0}}
-    mock_response.raise_for_status.return_value = None
-    mock_get.return_value = mock_response
+    quote_stub.rates = {"USD": 1.0, "EUR": 0.85, "GBP": 0.75, "CNY": 7.0}
 
     result = get_currency_rates()
 
@@ -20,10 +42,10 @@ def test_get_currency_rates_success(mock_get: Mock) -> None:
     assert result["CNY"] == 7.0
 
 
-@patch("requests.get")
-def test_get_currency_rates_failure(mock_get: Mock) -> None:
+def test_get_currency_rates_failure(quote_stub: QuoteStub) -> None:
     """Тест обработки ошибки при получении курсов"""
-    mock_get.side_effect = Exception("API error")
+    quote_stub.currency_status = 500
+    quote_stub.prices = {}
 
     result = get_currency_rates()
 
@@ -31,11 +53,58 @@ def test_get_currency_rates_failure(mock_get: Mock) -> None:
     assert result["EUR"] == 0.85
 
 
-@patch("requests.get")
-def test_get_stock_prices_success(mock_get: Mock) -> None:
+def test_get_stock_prices_success(quote_stub: QuoteStub) -> None:
     """Тест успешного получения цен акций"""
-    mock_get.return_value.text = "150.0"
-
     result = get_stock_prices()
 
     assert len(result) > 0
+    assert result["AAPL"] == 150.0
+
+
+def test_currency_rates_cached(quote_stub: QuoteStub) -> None:
+    """Повторный запрос котировок берется из кэша без обращения к сети"""
+    get_currency_rates()
+    requests_made = quote_stub.requests
+    result: Dict[str, Any] = get_currency_rates()
+    get_stock_prices()
+
+    assert result["EUR"] == 0.9
+    assert quote_stub.requests == requests_made
+    assert quote_cache.stats()["hits"] == 2
+
+
+def test_quotes_fanned_out_per_user(quote_stub: QuoteStub, tmp_path: Path) -> None:
+    """Котировки запрашиваются один раз для всех пользователей и раздаются по их спискам"""
+    path = tmp_path / "user_settings.json"
+    path.write_text(
+        json.dumps(
+            {
+                "users": {
+                    "anna": {"user_currencies": ["USD"], "user_stocks": ["AAPL", "NVDA"]},
+                    "boris": {"user_currencies": ["EUR"], "user_stocks": ["TSLA"]},
+                }
+            }
+        )
+    )
+    quote_stub.prices["NVDA"] = 120.0
+
+    with patch.object(settings, "user_settings_path", str(path)):
+        anna = get_quotes("anna")
+        boris = get_quotes("boris")
+        everyone = get_quotes()
+
+    assert anna == {"currencies": {"USD": 1.0}, "stocks": {"AAPL": 150.0, "NVDA": 120.0}}
+    assert boris == {"currencies": {"EUR": 0.9}, "stocks": {"TSLA": 700.0}}
+    assert list(everyone["stocks"]) == settings.supported_stocks
+    assert quote_stub.batch_requests == 1
+
+
+def test_unknown_user_gets_default_lists(tmp_path: Path) -> None:
+    """Пользователь без настроек получает списки по умолчанию"""
+    path = tmp_path / "user_settings.json"
+    path.write_text(json.dumps({"user_currencies": ["GBP"], "user_stocks": ["MSFT"]}))
+
+    with patch.object(settings, "user_settings_path", str(path)):
+        quotes = get_quotes("nobody")
+
+    assert quotes == {"currencies": {"GBP": 0.8}, "stocks": {"MSFT": 300.0}}
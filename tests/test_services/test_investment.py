@@ -0,0 +1,52 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import List
+
+import pytest
+
+from src.models.operation import Operation
+from src.services.investment import last_months, parse_month, round_up_minor, to_minor_units
+from src.services.services import investment_bank
+from src.services.store import build_snapshot
+from tests.test_services.operation_factory import make_operation
+
+
+@pytest.fixture
+def operations() -> List[Operation]:
+    return [
+        make_operation(datetime(2024, 1, 15), "123", "Супермаркеты", rounding="7"),
+        make_operation(datetime(2024, 1, 20), "477.10", "Супермаркеты", rounding="2.90"),
+        make_operation(datetime(2024, 1, 31, 23, 59), "100", "Супермаркеты"),
+        make_operation(datetime(2024, 3, 2), "0.30", "Супермаркеты", rounding="9.70"),
+    ]
+
+
+def test_round_up_in_minor_units() -> None:
+    """Округление вверх до кратного лимита в копейках; кратная сумма дает 0"""
+    amounts = to_minor_units([Decimal("123"), Decimal("-100.50"), Decimal("100"), Decimal("0.1")])
+
+    assert amounts.tolist() == [12300, 10050, 10000, 10]
+    assert round_up_minor(amounts, 100).tolist() == [7700, 9950, 0, 9990]
+    assert round_up_minor(amounts, 10).tolist() == [700, 950, 0, 990]
+
+
+def test_savings_for_many_months_and_limits(operations: List[Operation]) -> None:
+    """Все лимиты и месяцы за один вызов, пустой месяц дает нули"""
+    snapshot = build_snapshot("test", operations)
+
+    result = snapshot.investment.savings(last_months((2024, 3), 3), [10, 50, 100, 7])
+
+    assert list(result) == ["2024-01", "2024-02", "2024-03"]
+    assert result["2024-01"] == {"10": 9.9, "50": 49.9, "100": 99.9, "7": 13.9, "bank": 9.9}
+    assert result["2024-02"] == {"10": 0.0, "50": 0.0, "100": 0.0, "7": 0.0, "bank": 0.0}
+    assert result["2024-03"]["100"] == 99.7
+    assert snapshot.investment.month_savings(2024, 1, 100) == investment_bank(
+        "2024-01", snapshot.transactions, 100  # type: ignore[arg-type]
+    )
+
+
+def test_month_helpers() -> None:
+    assert parse_month("2024-02") == (2024, 2)
+    assert last_months((2024, 2), 3) == [(2023, 12), (2024, 1), (2024, 2)]
+    with pytest.raises(ValueError):
+        parse_month("2024-13")
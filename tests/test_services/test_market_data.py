@@ -0,0 +1,137 @@
+import time
+from typing import Callable, Iterator, List
+
+import pytest
+
+from src.services.market_data import MarketDataClient
+from tests.test_services.quote_stub import QuoteStub
+
+SYMBOLS = ["AAPL", "GOOGL", "MSFT", "TSLA", "AMZN"]
+
+ClientFactory = Callable[..., MarketDataClient]
+
+
+@pytest.fixture
+def make_client(quote_stub: QuoteStub) -> Iterator[ClientFactory]:
+    clients: List[MarketDataClient] = []
+
+    def make(**options: object) -> MarketDataClient:
+        params = {"symbol_timeout": 1.0, "deadline": 1.5, **options}
+        client = MarketDataClient(quote_stub.stock_api_base, quote_stub.currency_api_url, **params)  # type: ignore
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        client.close()
+
+
+@pytest.fixture
+def client(make_client: ClientFactory) -> MarketDataClient:
+    """Клиент без пакетных запросов: каждый тикер отдельным запросом"""
+    return make_client(batch_enabled=False)
+
+
+def test_symbols_fetched_concurrently(client: MarketDataClient, quote_stub: QuoteStub) -> None:
+    """Задержка пачки равна задержке самого медленного тикера, а не сумме"""
+    quote_stub.delays = dict.fromkeys(SYMBOLS, 0.3)
+
+    started = time.perf_counter()
+    prices = client.run_sync(client.fetch_stock_prices(SYMBOLS))
+    elapsed = time.perf_counter() - started
+
+    assert prices == quote_stub.prices
+    assert elapsed < 0.3 * len(SYMBOLS) / 2
+
+
+def test_parallel_requests_bounded(make_client: ClientFactory, quote_stub: QuoteStub) -> None:
+    """Одиночных запросов одновременно не больше max_parallel"""
+    client = make_client(batch_enabled=False, max_parallel=2, deadline=3.0)
+    quote_stub.delays = dict.fromkeys(SYMBOLS[:4], 0.2)
+
+    started = time.perf_counter()
+    client.run_sync(client.fetch_stock_prices(SYMBOLS[:4]))
+
+    assert time.perf_counter() - started >= 0.4
+
+
+def test_slow_symbol_cut_by_timeout(client: MarketDataClient, quote_stub: QuoteStub) -> None:
+    """Тикер, не уложившийся в таймаут, получает 0.0, остальные не ждут его"""
+    quote_stub.delays = {"TSLA": 3.0}
+
+    started = time.perf_counter()
+    prices = client.run_sync(client.fetch_stock_prices(SYMBOLS))
+
+    assert prices["TSLA"] == 0.0
+    assert prices["AAPL"] == 150.0
+    assert time.perf_counter() - started < 2.0
+
+
+def test_all_symbols_failed(client: MarketDataClient) -> None:
+    """Если не ответил ни один тикер — ошибка"""
+    with pytest.raises(ConnectionError):
+        client.run_sync(client.fetch_stock_prices(["NOPE", "NADA"]))
+
+
+def test_batch_single_request(make_client: ClientFactory, quote_stub: QuoteStub) -> None:
+    """Все тикеры запрашиваются одним пакетным запросом"""
+    client = make_client()
+
+    prices = client.run_sync(client.fetch_stock_prices(SYMBOLS + ["AAPL"]))
+
+    assert prices == quote_stub.prices
+    assert quote_stub.batch_requests == 1
+    assert quote_stub.requests == 1
+
+
+def test_batch_split_by_size(make_client: ClientFactory, quote_stub: QuoteStub) -> None:
+    """Длинный список делится на пакеты по batch_size"""
+    client = make_client(batch_size=2)
+
+    client.run_sync(client.fetch_stock_prices(SYMBOLS))
+
+    assert quote_stub.batch_requests == 3
+
+
+def test_batch_unsupported_falls_back(make_client: ClientFactory, quote_stub: QuoteStub) -> None:
+    """Без поддержки market/batch клиент переходит на одиночные запросы и запоминает это"""
+    client = make_client()
+    quote_stub.batch_supported = False
+
+    prices = client.run_sync(client.fetch_stock_prices(SYMBOLS))
+    requests_made = quote_stub.requests
+    client.run_sync(client.fetch_stock_prices(SYMBOLS))
+
+    assert prices == quote_stub.prices
+    assert client.batch_enabled is False
+    assert quote_stub.requests - requests_made == len(SYMBOLS)
+
+
+def test_batch_missing_symbols_fetched_singly(make_client: ClientFactory, quote_stub: QuoteStub) -> None:
+    """Тикеры, которых нет в ответе пакета, дозапрашиваются по одному"""
+    client = make_client()
+
+    prices = client.run_sync(client.fetch_stock_prices(["AAPL", "NOPE"]))
+
+    assert prices == {"AAPL": 150.0, "NOPE": 0.0}
+    assert quote_stub.requests == 2
+
+
+def test_quotes_with_partial_failure(client: MarketDataClient, quote_stub: QuoteStub) -> None:
+    """Ошибка API курсов не мешает получить цены акций"""
+    quote_stub.currency_status = 500
+
+    quotes = client.run_sync(client.fetch_quotes(SYMBOLS, ["USD", "EUR"]))
+
+    assert quotes["currencies"] is None
+    assert quotes["stocks"]["MSFT"] == 300.0
+
+
+def test_connections_reused(client: MarketDataClient, quote_stub: QuoteStub) -> None:
+    """Повторные запросы идут по уже открытым соединениям"""
+    for _ in range(3):
+        quotes = client.run_sync(client.fetch_quotes(SYMBOLS, ["USD", "EUR"]))
+
+    assert quotes["currencies"] == {"USD": 1.0, "EUR": 0.9}
+    assert quote_stub.requests == 3 * (len(SYMBOLS) + 1)
+    assert len(quote_stub.connections) <= len(SYMBOLS) + 1
@@ -0,0 +1,94 @@
+import re
+from typing import Dict
+
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from src.services.metrics import Histogram, Metrics, MetricsMiddleware
+
+
+def sample(text: str, series: str) -> float:
+    """Значение ряда из текста метрик"""
+    match = re.search(rf"^{re.escape(series)} (\S+)$", text, re.MULTILINE)
+    assert match, f"нет ряда {series}"
+    return float(match.group(1))
+
+
+def test_histogram_buckets_are_cumulative() -> None:
+    histogram = Histogram((0.01, 0.1))
+    for value in (0.005, 0.01, 0.05, 3.0):
+        histogram.observe(value)
+
+    lines = list(histogram.lines("latency", (("route", "/"),)))
+    assert lines == [
+        'latency_bucket{route="/",le="0.01"} 2',
+        'latency_bucket{route="/",le="0.1"} 3',
+        'latency_bucket{route="/",le="+Inf"} 4',
+        'latency_sum{route="/"} 3.065',
+        'latency_count{route="/"} 4',
+    ]
+
+
+def test_middleware_records_routes_errors_and_in_flight() -> None:
+    registry = Metrics()
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware, registry=registry)
+
+    @app.get("/items/{item_id}")
+    def item(item_id: int) -> Dict[str, int]:
+        with registry.stage("lookup"):
+            if item_id == 0:
+                raise HTTPException(status_code=503, detail="нет")
+        return {"id": item_id}
+
+    @app.get("/boom")
+    def boom() -> None:
+        raise RuntimeError("сбой")
+
+    client = TestClient(app, raise_server_exceptions=False)
+    for item_id in (1, 2, 0):
+        client.get(f"/items/{item_id}")
+    assert client.get("/boom").status_code == 500
+    client.get("/missing")
+
+    text = registry.render()
+    route = 'method="GET",route="/items/{item_id}"'
+    assert sample(text, f"finance_http_request_duration_seconds_count{{{route}}}") == 3
+    assert sample(text, f'finance_http_requests_total{{{route},status="200"}}') == 2
+    assert sample(text, f"finance_http_request_errors_total{{{route}}}") == 1
+    assert sample(text, 'finance_http_request_errors_total{method="GET",route="/boom"}') == 1
+    assert sample(text, 'finance_http_requests_total{method="GET",route="<unmatched>",status="404"}') == 1
+    assert sample(text, 'finance_stage_duration_seconds_count{stage="lookup"}') == 3
+    assert sample(text, "finance_http_requests_in_flight") == 0
+
+
+def test_stats_exported_as_gauges() -> None:
+    registry = Metrics()
+    registry.register_stats("cache", lambda: {"hits": 3, "hit_ratio": 0.75, "format": "json", "watching": True})
+    registry.register_stats("pool", lambda: {"io": {"in_flight": 2}, "cpu": {"in_flight": 0}}, label="pool")
+
+    text = registry.render()
+    assert sample(text, "finance_cache_hits") == 3
+    assert sample(text, "finance_cache_hit_ratio") == 0.75
+    assert sample(text, "finance_cache_watching") == 1
+    assert "finance_cache_format" not in text
+    assert sample(text, 'finance_pool_in_flight{pool="io"}') == 2
+    assert text.count("# TYPE finance_pool_in_flight gauge") == 1
+
+
+def test_disabled_registry_records_nothing() -> None:
+    registry = Metrics(enabled=False)
+
+    @registry.timed("work")
+    def work() -> int:
+        return 1
+
+    with registry.stage("other"):
+        assert work() == 1
+    assert "stage=" not in registry.render()
+
+
+def test_label_values_escaped() -> None:
+    registry = Metrics()
+    registry.observe_stage('a"b\\c\nd', 0.1)
+    assert 'finance_stage_duration_seconds_count{stage="a\\"b\\\\c\\nd"} 1' in registry.render()
@@ -0,0 +1,81 @@
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from src.services.excel_processor import load_operations_from_excel
+from src.services.operations_cache import cache_dir_for, file_digest
+
+
+def _write_statement(file_path: Path, amounts: list) -> None:
+    data = {
+        "Дата операции": [f"0{i + 1}.01.2023 12:00:00" for i in range(len(amounts))],
+        "Дата платежа": [None] * len(amounts),
+        "Сумма операции": amounts,
+        "Категория": ["Food"] * len(amounts),
+        "MCC": [5411.0] + [None] * (len(amounts) - 1),
+    }
+    pd.DataFrame(data).to_excel(file_path, index=False)
+
+
+@pytest.fixture
+def statement(tmp_path: Path) -> Path:
+    file_path = tmp_path / "operations.xlsx"
+    _write_statement(file_path, ["-100,50", "-200,75"])
+    return file_path
+
+
+def test_second_load_reads_cache(statement: Path) -> None:
+    """Повторная загрузка не разбирает Excel и дает те же операции"""
+    first = load_operations_from_excel(str(statement))
+    assert cache_dir_for(str(statement)).exists()
+
+    with patch("src.services.excel_processor.pd.read_excel") as mock_read:
+        second = load_operations_from_excel(str(statement))
+
+    mock_read.assert_not_called()
+    assert second == first
+    assert second[1].mcc is None
+
+
+def test_unchanged_workbook_not_hashed(statement: Path) -> None:
+    """Файл хешируется при первой загрузке и после изменения mtime, а не при каждой загрузке"""
+    with patch("src.services.operations_cache.file_digest", wraps=file_digest) as cache_digest, \
+            patch("src.services.excel_processor.file_digest", wraps=file_digest) as load_digest:
+        load_operations_from_excel(str(statement))
+        assert cache_digest.call_count + load_digest.call_count == 1
+
+        load_operations_from_excel(str(statement))
+        assert cache_digest.call_count + load_digest.call_count == 1
+
+        os.utime(statement, ns=(0, 1))
+        with patch("src.services.excel_processor.pd.read_excel") as mock_read:
+            load_operations_from_excel(str(statement))
+            load_operations_from_excel(str(statement))
+
+    mock_read.assert_not_called()
+    assert cache_digest.call_count + load_digest.call_count == 2
+
+
+def test_changed_workbook_invalidates_cache(statement: Path) -> None:
+    """Изменение файла выписки приводит к повторному разбору"""
+    load_operations_from_excel(str(statement))
+    _write_statement(statement, ["-1,00", "-2,00", "-3,00"])
+
+    operations = load_operations_from_excel(str(statement))
+
+    assert [float(op.amount) for op in operations] == [1.0, 2.0, 3.0]
+    assert len(list(cache_dir_for(str(statement)).iterdir())) == 1
+
+
+def test_schema_change_invalidates_cache(statement: Path) -> None:
+    """Смена схемы Operation делает кэш недействительным"""
+    load_operations_from_excel(str(statement))
+
+    with patch("src.services.operations_cache.schema_fingerprint", return_value="changed"):
+        with patch("src.services.excel_processor.pd.read_excel", wraps=pd.read_excel) as mock_read:
+            load_operations_from_excel(str(statement))
+
+    mock_read.assert_called_once()
@@ -0,0 +1,130 @@
+import json
+from datetime import datetime, timedelta
+from typing import List, Optional
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.main import app
+from src.models.operation import Operation
+from src.services import pagination
+from src.services.pagination import Cursor, decode_cursor, encode_cursor, iter_ndjson
+from src.services.store import OperationStore, build_snapshot
+from tests.test_services.operation_factory import make_operation
+
+
+def make_operations(count: int) -> List[Operation]:
+    """Операции по три на дату: курсор должен различать строки с одинаковой датой"""
+    start = datetime(2024, 1, 1, 12, 0)
+    return [
+        make_operation(
+            start + timedelta(days=i // 3),
+            str(i),
+            "Переводы" if i % 2 else "Супермаркеты",
+            f"Перевод +7 999 123-45-{i % 100:02d}" if i % 2 else f"Магнит {i}",
+            payment_date=start,
+        )
+        for i in range(count)
+    ]
+
+
+def test_cursor_round_trip() -> None:
+    cursor = Cursor(datetime(2024, 3, 1, 10, 30, 15, 500), 12345)
+    assert decode_cursor(encode_cursor(cursor)) == cursor
+    with pytest.raises(ValueError):
+        decode_cursor("не курсор")
+
+
+def test_cursor_pages_cover_results() -> None:
+    """Страницы по курсору без пропусков и повторов, в том числе внутри одной даты"""
+    snapshot = build_snapshot("test.xlsx", make_operations(50))
+    expected = list(snapshot.search_positions("магнит"))
+
+    pages: List[int] = []
+    after: Optional[Cursor] = None
+    while True:
+        page = list(snapshot.search_positions("магнит", limit=4, after=after))
+        pages.extend(page)
+        if len(page) < 4:
+            break
+        after = snapshot.page(page)[1]
+    assert pages == expected
+
+    flagged = list(snapshot.flagged_positions("has_phone"))
+    after = snapshot.page(flagged[:7])[1]
+    assert list(snapshot.flagged_positions("has_phone", limit=5, after=after)) == flagged[7:12]
+
+
+def test_cursor_survives_reload() -> None:
+    """После перезагрузки продолжение идет с той же даты, не с начала выдачи"""
+    operations = make_operations(30)
+    old = build_snapshot("test.xlsx", operations)
+    after = old.page(old.search_positions("магнит", limit=5))[1]
+
+    new = build_snapshot("test.xlsx", make_operations(3) + operations, version=2)
+    rest = new.search_positions("магнит", after=after)
+    assert all(new.operations[p].date <= after.date for p in rest)
+    assert new.operations[rest[0]].date == after.date
+    assert len(rest) == len(new.search_positions("магнит", end=after.date))
+
+
+def test_ndjson_fetches_by_pages() -> None:
+    snapshot = build_snapshot("test.xlsx", make_operations(50))
+    calls = []
+
+    def fetch(after: Optional[Cursor], offset: int, limit: Optional[int]):  # type: ignore[no-untyped-def]
+        calls.append(limit)
+        return snapshot.page(snapshot.search_positions("магнит", limit=limit, offset=offset, after=after))
+
+    with patch.object(pagination, "STREAM_PAGE_SIZE", 10):
+        chunks = list(iter_ndjson(fetch, offset=1, limit=22))
+
+    rows = [json.loads(line) for line in b"".join(chunks).splitlines()]
+    assert rows == [snapshot.transactions[p] for p in snapshot.search_positions("магнит", limit=22, offset=1)]
+    assert calls == [10, 10, 2]
+
+
+def test_endpoints_paginate_and_stream() -> None:
+    store = OperationStore("test.xlsx")
+    store._snapshot = build_snapshot("test.xlsx", make_operations(40))
+    client = TestClient(app)
+
+    with patch("src.main.operation_store", store):
+        first = client.get("/api/search", params={"query": "магнит", "limit": 15})
+        second = client.get("/api/search", params={"query": "магнит", "cursor": first.headers["X-Next-Cursor"]})
+        stream = client.get("/api/phone-transactions", params={"format": "ndjson"})
+        invalid = client.get("/api/person-transfers", params={"cursor": "!!!"})
+
+    assert len(first.json()) == 15 and len(second.json()) == 5
+    assert "X-Next-Cursor" not in second.headers
+    assert stream.headers["content-type"] == "application/x-ndjson"
+    assert len(stream.text.splitlines()) == 20
+    assert invalid.status_code == 400
+
+
+@pytest.mark.parametrize(
+    "path, params",
+    [("/api/search", {"query": "магнит"}), ("/api/phone-transactions", {}), ("/api/person-transfers", {})],
+)
+def test_lists_newest_first(path: str, params: dict) -> None:
+    """Списки отдаются от новых операций к старым, страницы по курсору продолжают этот порядок"""
+    start = datetime(2024, 1, 1, 12, 0)
+    operations = [
+        make_operation(start + timedelta(days=i // 2), str(i), "Переводы", f"Иван П. магнит +7 999 123-45-{i:02d}")
+        for i in range(30)
+    ]
+    store = OperationStore("test.xlsx")
+    store._snapshot = build_snapshot("test.xlsx", operations[::-1])
+    client = TestClient(app)
+
+    with patch("src.main.operation_store", store):
+        full = client.get(path, params=params).json()
+        first = client.get(path, params={**params, "limit": 7})
+        second = client.get(path, params={**params, "limit": 7, "cursor": first.headers["X-Next-Cursor"]})
+
+    dates = [row["date"] for row in full]
+    assert len(full) == 30
+    assert dates[0] == "2024-01-15T12:00:00"
+    assert dates == sorted(dates, reverse=True)
+    assert first.json() + second.json() == full[:14]
@@ -0,0 +1,67 @@
+from typing import List
+from unittest.mock import Mock
+
+import pytest
+
+from src.services.quote_cache import QuoteCache
+
+
+class FakeClock:
+    """Управляемые часы для тестов"""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+def cache(clock: FakeClock) -> QuoteCache:
+    return QuoteCache(ttl=10, stale_ttl=100, error_ttl=5, clock=clock)
+
+
+def test_fresh_value_served_from_cache(cache: QuoteCache) -> None:
+    """Свежее значение не запрашивается повторно"""
+    loader = Mock(return_value={"USD": 1.0})
+
+    assert cache.get("rates", loader, {}) == {"USD": 1.0}
+    assert cache.get("rates", loader, {}) == {"USD": 1.0}
+
+    assert loader.call_count == 1
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_stale_value_refreshed_in_background(cache: QuoteCache, clock: FakeClock) -> None:
+    """Устаревшее значение отдается сразу, обновление идет в фоне"""
+    values: List[dict] = [{"USD": 1.0}, {"USD": 2.0}]
+    loader = Mock(side_effect=values)
+    cache.get("rates", loader, {})
+
+    clock.now = 50
+    assert cache.get("rates", loader, {}) == {"USD": 1.0}
+    cache.wait_refreshes()
+
+    assert cache.get("rates", loader, {}) == {"USD": 2.0}
+    assert cache.stats()["stale_hits"] == 1
+    assert cache.stats()["refreshes"] == 2
+
+
+def test_failure_cached_with_fallback(cache: QuoteCache, clock: FakeClock) -> None:
+    """Ошибка загрузки кэшируется на error_ttl вместе с запасным значением"""
+    loader = Mock(side_effect=[ConnectionError("down"), {"USD": 3.0}])
+
+    assert cache.get("rates", loader, {"USD": 0.0}) == {"USD": 0.0}
+    assert cache.get("rates", loader, {"USD": 0.0}) == {"USD": 0.0}
+    assert loader.call_count == 1
+
+    clock.now = 6
+    assert cache.get("rates", loader, {"USD": 0.0}) == {"USD": 3.0}
+    assert cache.stats()["negative_hits"] == 1
+    assert cache.stats()["errors"] == 1
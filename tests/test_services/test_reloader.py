@@ -0,0 +1,98 @@
+import os
+import threading
+from pathlib import Path
+from typing import List
+
+import pandas as pd
+import pytest
+
+from src.services.reloader import SnapshotReloader
+from src.services.store import OperationStore
+
+
+def write_statement(path: Path, descriptions: List[str]) -> None:
+    """Выписка с операцией на каждое описание"""
+    rows = len(descriptions)
+    pd.DataFrame(
+        {
+            "Дата операции": [f"{day + 1:02d}.01.2024 12:00:00" for day in range(rows)],
+            "Дата платежа": [f"{day + 1:02d}.01.2024" for day in range(rows)],
+            "Сумма операции": ["-100,00"] * rows,
+            "Категория": ["Такси"] * rows,
+            "Описание": descriptions,
+        }
+    ).to_excel(path, index=False)
+
+
+@pytest.fixture
+def statement(tmp_path: Path) -> Path:
+    path = tmp_path / "operations.xlsx"
+    write_statement(path, ["Яндекс Такси"])
+    return path
+
+
+def touch_later(path: Path) -> None:
+    """Гарантирует новую подпись файла даже на ФС с грубым mtime"""
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_poll_reloads_after_file_settles(statement: Path) -> None:
+    """Измененный файл перечитывается, когда его подпись не меняется два опроса подряд"""
+    store = OperationStore(str(statement))
+    store.load()
+    reloader = SnapshotReloader(store, interval=0)
+    reloader.reload()
+
+    write_statement(statement, ["Яндекс Такси", "Ситимобил"])
+    touch_later(statement)
+
+    assert reloader.poll() is None
+    snapshot = reloader.poll()
+
+    assert snapshot is store.snapshot
+    assert len(snapshot.operations) == 2
+    assert reloader.poll() is None
+    stats = reloader.stats()
+    assert stats["reloads"] == 2
+    assert stats["version"] == snapshot.version == 3
+
+
+def test_readers_see_complete_snapshots(statement: Path) -> None:
+    """Во время перезагрузок срез всегда согласован и уже с производными структурами"""
+    store = OperationStore(str(statement))
+    store.load()
+    reloader = SnapshotReloader(store, interval=0)
+    write_statement(statement, ["Яндекс Такси", "Ситимобил", "Везёт"])
+    errors: List[str] = []
+    done = threading.Event()
+
+    def read() -> None:
+        while not done.is_set():
+            snapshot = store.snapshot
+            if len(snapshot.transactions) != len(snapshot.operations) or "search_index" not in vars(snapshot):
+                errors.append(f"version {snapshot.version}")
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    for _ in range(3):
+        reloader.reload()
+    done.set()
+    reader.join()
+
+    assert not errors
+    assert store.snapshot.search("такси")
+
+
+def test_failed_reload_keeps_snapshot(statement: Path) -> None:
+    store = OperationStore(str(statement))
+    previous = store.load()
+    reloader = SnapshotReloader(store, interval=0)
+
+    statement.write_bytes(b"not a workbook")
+    touch_later(statement)
+    reloader.poll()
+
+    assert reloader.poll() is None
+    assert store.snapshot is previous
+    assert reloader.stats()["failures"] == 1
@@ -0,0 +1,112 @@
+from datetime import date
+from typing import Any, Dict, Optional
+from unittest.mock import Mock
+
+import pandas as pd
+import pytest
+
+from src.services.aggregates import AggregateCube
+from src.services.report_cache import ReportCache, cached_report, data_version, estimate_size
+
+
+@pytest.fixture
+def cache() -> ReportCache:
+    return ReportCache(max_bytes=10_000, max_entries=100)
+
+
+def versioned(version: int) -> pd.DataFrame:
+    frame = pd.DataFrame({"amount": [1.0]})
+    frame.attrs["data_version"] = version
+    return frame
+
+
+def make_report(cache: ReportCache, body: Mock) -> Any:
+    @cached_report(cache)
+    def report(df: Any, category: str, target_date: Optional[str] = None) -> Dict[str, Any]:
+        return body(category, target_date)  # type: ignore[no-any-return]
+
+    return report
+
+
+def test_hit_skips_computation(cache: ReportCache) -> None:
+    """Повторный отчет с теми же параметрами и версией берется из кэша"""
+    body = Mock(return_value={"2024-01": 10.0})
+    report = make_report(cache, body)
+
+    first = report(versioned(1), "Такси", "2024-01-31")
+    second = report(versioned(1), "Такси", target_date="2024-01-31")
+
+    assert first == second == {"2024-01": 10.0}
+    assert body.call_count == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["hit_ratio"] == 0.5
+
+
+def test_cached_result_not_shared(cache: ReportCache) -> None:
+    """Изменение возвращенного результата не портит кэш"""
+    report = make_report(cache, Mock(return_value={"total": 1.0}))
+
+    report(versioned(1), "Такси", "2024-01-31")["total"] = 99.0
+
+    assert report(versioned(1), "Такси", "2024-01-31") == {"total": 1.0}
+
+
+def test_new_version_recomputes_and_drops_old(cache: ReportCache) -> None:
+    """После перезагрузки данных отчет пересчитывается, старые записи удаляются"""
+    body = Mock(side_effect=[{"v": 1}, {"v": 2}, {"v": 3}])
+    report = make_report(cache, body)
+
+    report(versioned(1), "Такси", "2024-01-31")
+    report(versioned(1), "Еда", "2024-01-31")
+    assert report(versioned(2), "Такси", "2024-01-31") == {"v": 3}
+
+    assert body.call_count == 3
+    assert cache.stats()["entries"] == 1
+
+
+def test_none_date_resolves_to_today(cache: ReportCache) -> None:
+    """target_date=None и сегодняшняя дата — один и тот же отчет"""
+    body = Mock(return_value={})
+    report = make_report(cache, body)
+
+    report(versioned(1), "Такси")
+    report(versioned(1), "Такси", date.today().strftime("%Y-%m-%d"))
+
+    assert body.call_count == 1
+    assert body.call_args_list[0].args == ("Такси", date.today().strftime("%Y-%m-%d"))
+
+
+def test_unversioned_data_bypasses_cache(cache: ReportCache) -> None:
+    """Таблица без версии данных не кэшируется"""
+    body = Mock(return_value={})
+    report = make_report(cache, body)
+
+    report(pd.DataFrame({"amount": [1.0]}), "Такси", "2024-01-31")
+    report(pd.DataFrame({"amount": [1.0]}), "Такси", "2024-01-31")
+
+    assert body.call_count == 2
+    assert cache.stats()["bypassed"] == 2
+
+
+def test_memory_budget_evicts_lru() -> None:
+    """При превышении бюджета вытесняются давно не использованные результаты"""
+    value = {f"2024-{month:02d}": float(month) for month in range(1, 13)}
+    cache = ReportCache(max_bytes=estimate_size(value) * 2 + 1)
+    report = make_report(cache, Mock(return_value=value))
+
+    report(versioned(1), "a", "2024-01-31")
+    report(versioned(1), "b", "2024-01-31")
+    report(versioned(1), "a", "2024-01-31")
+    report(versioned(1), "c", "2024-01-31")
+
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["entries"] == 2
+    assert stats["bytes"] <= cache.max_bytes
+    report(versioned(1), "a", "2024-01-31")
+    assert cache.stats()["hits"] == 2
+
+
+def test_data_version_of_cube() -> None:
+    assert data_version(AggregateCube(version=5)) == 5
+    assert data_version(pd.DataFrame()) is None
@@ -0,0 +1,102 @@
+import json
+import threading
+from pathlib import Path
+from typing import Iterator, List
+
+import pytest
+
+from src.services.report_sink import ReportSink
+
+
+@pytest.fixture
+def sinks() -> Iterator[List[ReportSink]]:
+    created: List[ReportSink] = []
+    yield created
+    for sink in created:
+        sink.close()
+
+
+def make_sink(sinks: List[ReportSink], directory: Path, **options: object) -> ReportSink:
+    sink = ReportSink(str(directory), **options)  # type: ignore[arg-type]
+    sinks.append(sink)
+    return sink
+
+
+def test_reports_written_in_background(tmp_path: Path, sinks: List[ReportSink]) -> None:
+    """Отчет сохраняется фоновым потоком, временных файлов не остается"""
+    sink = make_sink(sinks, tmp_path / "reports")
+
+    assert sink.submit("weekday", {"Monday": 10.5})
+    assert sink.flush(timeout=5)
+
+    files = list((tmp_path / "reports").iterdir())
+    assert len(files) == 1
+    assert files[0].name.startswith("report_weekday_")
+    assert json.loads(files[0].read_text(encoding="utf-8")) == {"Monday": 10.5}
+    assert sink.stats()["written"] == 1
+
+
+def test_concurrent_reports_do_not_collide(tmp_path: Path, sinks: List[ReportSink]) -> None:
+    """Одновременные отчеты в одну секунду получают разные файлы"""
+    sink = make_sink(sinks, tmp_path, fsync=False)
+
+    def submit_many() -> None:
+        for i in range(25):
+            sink.submit("category", {"i": i})
+
+    threads = [threading.Thread(target=submit_many) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    sink.flush(timeout=5)
+
+    assert len(list(tmp_path.glob("report_category_*.json"))) == 200
+    assert not list(tmp_path.glob(".tmp-*"))
+
+
+def test_fixed_filename_replaced_atomically(tmp_path: Path, sinks: List[ReportSink]) -> None:
+    """Отчет с заданным именем перезаписывает файл целиком"""
+    sink = make_sink(sinks, tmp_path, fmt="compact")
+
+    sink.submit("daily", {"total": 1}, filename="daily.json")
+    sink.submit("daily", {"total": 2}, filename="daily.json")
+    sink.flush(timeout=5)
+
+    assert (tmp_path / "daily.json").read_text(encoding="utf-8") == '{"total":2}'
+
+
+def test_ndjson_batches(tmp_path: Path, sinks: List[ReportSink]) -> None:
+    """В режиме ndjson пачка отчетов пишется одним файлом, по строке на отчет"""
+    sink = make_sink(sinks, tmp_path, fmt="ndjson", fsync=False)
+
+    for i in range(30):
+        sink.submit("weekday", {"i": i})
+    sink.flush(timeout=5)
+
+    lines = [json.loads(line) for path in tmp_path.glob("*.ndjson") for line in path.read_text().splitlines()]
+    assert sorted(line["result"]["i"] for line in lines) == list(range(30))
+    assert lines[0]["report"] == "weekday"
+    assert sink.stats()["batches"] == len(list(tmp_path.glob("*.ndjson")))
+
+
+def test_full_queue_drops_with_metrics(tmp_path: Path, sinks: List[ReportSink]) -> None:
+    """Переполненная очередь не блокирует вызывающего дольше put_timeout"""
+    sink = make_sink(sinks, tmp_path, max_queue=1, put_timeout=0.01)
+    release = threading.Event()
+    original = sink._write_batch
+    sink._write_batch = lambda records: (release.wait(5), original(records))  # type: ignore[method-assign]
+
+    results = [sink.submit("slow", {"i": i}) for i in range(5)]
+    release.set()
+    sink.flush(timeout=5)
+
+    stats = sink.stats()
+    assert results.count(False) == stats["dropped"] > 0
+    assert stats["blocked"] >= stats["dropped"]
+    assert stats["written"] == results.count(True)
+
+
+def test_unknown_format_rejected(tmp_path: Path) -> None:
+    with pytest.raises(ValueError):
+        ReportSink(str(tmp_path), fmt="xml")
@@ -1,7 +1,27 @@
+from dataclasses import replace
+from datetime import datetime
+from decimal import Decimal
+from typing import List
+from unittest.mock import Mock, patch
+
+import numpy as np
 import pandas as pd
 import pytest
 
-from src.services.reports import category_spending_report, weekday_spending_report, workday_weekend_spending_report
+from src.models.operation import Operation
+from src.services.aggregates import AggregateCube
+from src.services.report_cache import report_cache
+from src.services.reports import (
+    build_report_frame,
+    cashback_matrix_report,
+    category_spending_from_cube,
+    category_spending_report,
+    transactions_to_dataframe,
+    weekday_spending_report,
+    workday_weekend_spending_report,
+)
+from src.services.services import analyze_cashback_categories, convert_operations_to_transactions
+from src.services.store import OperationStore
 
 
 @pytest.fixture
@@ -35,3 +55,113 @@ def test_workday_weekend_spending_report(sample_dataframe: pd.DataFrame) -> None
     result = workday_weekend_spending_report(sample_dataframe, "2024-03-01")
     assert "workday" in result
     assert "weekend" in result
+
+
+@pytest.fixture
+def operations() -> List[Operation]:
+    """Операции с расходами (отрицательные суммы) в разные дни недели"""
+    base = Operation(
+        date=datetime(2024, 1, 15, 10, 0),
+        payment_date=datetime(2024, 1, 15),
+        card_number="*1234",
+        status="OK",
+        amount=Decimal("-1000.00"),
+        currency="RUB",
+        cashback=Decimal("10.00"),
+        category="Супермаркеты",
+        mcc=5411,
+        description="Пятерочка",
+        bonuses=Decimal("0.00"),
+        rounding=Decimal("0.00"),
+    )
+    return [
+        base,
+        replace(base, date=datetime(2024, 1, 20, 18, 0), amount=Decimal("-500.00"), category="Такси"),
+        replace(base, date=datetime(2024, 2, 1, 9, 0), amount=Decimal("-200.00")),
+        replace(base, date=datetime(2024, 2, 17, 12, 0), amount=Decimal("-300.00"), category="Такси"),
+        replace(base, date=datetime(2024, 3, 1, 8, 0), amount=Decimal("-150.00")),
+        replace(base, date=datetime(2024, 3, 2, 8, 0), amount=Decimal("2000.00"), category="Пополнения"),
+    ]
+
+
+def test_report_frame_types(operations: List[Operation]) -> None:
+    """Таблица отчетов типизирована и помечена версией данных"""
+    frame = build_report_frame(operations, version=7)
+
+    assert isinstance(frame.index, pd.DatetimeIndex)
+    assert isinstance(frame["category"].dtype, pd.CategoricalDtype)
+    assert frame["amount"].dtype == np.float64
+    assert list(frame["weekday"][:2]) == ["Monday", "Saturday"]
+    assert list(frame["is_weekend"][:2]) == [False, True]
+    assert frame.attrs["data_version"] == 7
+
+
+def test_reports_same_for_frame_and_transactions(operations: List[Operation]) -> None:
+    """Отчеты по готовой таблице совпадают с отчетами по таблице транзакций"""
+    frame = build_report_frame(operations)
+    transactions = transactions_to_dataframe([dict(txn) for txn in convert_operations_to_transactions(operations)])
+
+    for report in (weekday_spending_report, workday_weekend_spending_report):
+        assert report(frame, "2024-03-05") == report(transactions, "2024-03-05")
+    assert category_spending_report(frame, "Такси", "2024-03-05") == category_spending_report(
+        transactions, "Такси", "2024-03-05"
+    )
+    for category in ("Такси", "Супермаркеты", "Пополнения"):
+        assert category_spending_from_cube(AggregateCube(operations), category, "2024-03-05") == (
+            category_spending_report(frame, category, "2024-03-05")
+        )
+    assert weekday_spending_report(frame, "2024-03-05") == {
+        "Monday": 1000.0,
+        "Thursday": 200.0,
+        "Friday": 150.0,
+        "Saturday": 400.0,
+    }
+
+
+def test_snapshot_report_frame_cached(operations: List[Operation]) -> None:
+    """Срез строит таблицу один раз, новая версия получает новую таблицу"""
+    store = OperationStore("test")
+    with patch("src.services.store.load_operations_with_report", return_value=(operations, Mock(errors=[]))):
+        first = store.load()
+
+    assert first.report_frame is first.report_frame
+    assert first.report_frame.attrs["data_version"] == first.version
+
+    second = store.append([replace(operations[0], date=datetime(2024, 3, 3))])
+    assert second.report_frame is not first.report_frame
+    assert len(second.report_frame) == len(first.report_frame) + 1
+
+
+def test_cached_report_skips_file_write(operations: List[Operation]) -> None:
+    """Повторный отчет по той же версии данных не пересчитывается и не пишет файл"""
+    frame = build_report_frame(operations, version=1)
+    report_cache.clear()
+
+    with patch("src.services.reports.report_sink") as sink:
+        first = weekday_spending_report(frame, "2024-03-05")
+        second = weekday_spending_report(frame, "2024-03-05")
+
+    assert first == second
+    assert sink.submit.call_count == 1
+    assert report_cache.stats()["hits"] == 1
+
+
+def test_cashback_matrix(operations: List[Operation]) -> None:
+    """Матрица месяц × категория совпадает с помесячным анализом кешбэка"""
+    operations = operations + [
+        replace(operations[1], date=datetime(2024, 1, 25), cashback=Decimal("-3.00"), bonuses=Decimal("7.00")),
+        replace(operations[0], date=datetime(2024, 2, 5), rounding=Decimal("4.50")),
+    ]
+    frame = build_report_frame(sorted(operations, key=lambda op: op.date))
+    transactions = convert_operations_to_transactions(operations)
+
+    result = cashback_matrix_report(frame, "2023-12", "2024-03")
+
+    assert result["months"] == ["2023-12", "2024-01", "2024-02", "2024-03"]
+    assert result["categories"] == ["Супермаркеты", "Такси", "Пополнения"]
+    for row, month in zip(result["cashback"], result["months"]):
+        year, number = map(int, month.split("-"))
+        expected = analyze_cashback_categories(transactions, year, number)
+        assert {c: v for c, v in zip(result["categories"], row) if v} == expected
+    assert result["bonuses"][1] == [0.0, 7.0, 0.0]
+    assert result["rounding"][2] == [4.5, 0.0, 0.0]
@@ -0,0 +1,78 @@
+import random
+from datetime import datetime, timedelta
+from typing import List
+
+import pytest
+
+from src.models.operation import Operation
+from src.services.search_index import SearchIndex
+from src.services.services import simple_search
+from src.services.store import build_snapshot
+from tests.test_services.operation_factory import make_operation
+
+DESCRIPTIONS = ["Яндекс Такси", "Магнит", "Перевод Иван И.", "ТАКСИ Ситимобил", "Spotify", "кафе «Ёлка»", ""]
+CATEGORIES = ["Такси", "Супермаркеты", "Переводы", "Развлечения", "Кафе"]
+
+
+@pytest.fixture
+def operations() -> List[Operation]:
+    rng = random.Random(7)
+    start = datetime(2024, 1, 1)
+    return [
+        make_operation(
+            start + timedelta(hours=5 * i), description=rng.choice(DESCRIPTIONS), category=rng.choice(CATEGORIES)
+        )
+        for i in range(300)
+    ]
+
+
+@pytest.mark.parametrize(
+    "query", ["", "т", "ТА", "акс", "такси", "Яндекс Т", "ёлк", "Ё", "перевод", "i", "spot", "нет такого", "маркеты"]
+)
+def test_matches_substring_search(operations: List[Operation], query: str) -> None:
+    """Выдача индекса совпадает с подстрочным поиском simple_search, порядок — от новых к старым"""
+    snapshot = build_snapshot("test", operations)
+
+    assert snapshot.search(query) == simple_search(snapshot.transactions[::-1], query)
+    assert snapshot.search_index.search(query) == snapshot.search_index.search(query, descending=True)[::-1]
+
+
+def test_pagination_and_period(operations: List[Operation]) -> None:
+    """Страница и период применяются к выдаче, упорядоченной от новых к старым"""
+    snapshot = build_snapshot("test", operations)
+    start, end = datetime(2024, 1, 10), datetime(2024, 1, 20, 23, 59, 59)
+    expected = [
+        txn
+        for txn in simple_search(snapshot.transactions[::-1], "такси")
+        if start <= datetime.fromisoformat(txn["date"]) <= end
+    ]
+
+    assert expected
+    assert snapshot.search("такси", start, end) == expected
+    assert snapshot.search("такси", start, end, limit=5, offset=3) == expected[3:8]
+    assert snapshot.search("такси", end, start) == []
+
+
+def test_scan_matches_merge(operations: List[Operation], monkeypatch: pytest.MonkeyPatch) -> None:
+    """Отбор маской блоками дает ту же выдачу и страницы, что слияние списков строк"""
+    snapshot = build_snapshot("test", operations)
+    expected = {query: snapshot.search(query) for query in ("", "а", "такси", "zzz")}
+
+    monkeypatch.setattr("src.services.search_index.MERGE_MAX_TEXTS", 0)
+    monkeypatch.setattr("src.services.search_index.SCAN_CHUNK", 7)
+
+    for query, result in expected.items():
+        assert snapshot.search(query) == result
+        assert snapshot.search(query, limit=4, offset=10) == result[10:14]
+        assert snapshot.search_index.search(query, limit=4, offset=10) == [
+            snapshot.transactions.index(txn) for txn in result[::-1][10:14]
+        ]
+
+
+def test_index_over_distinct_texts(operations: List[Operation]) -> None:
+    """Индекс хранит каждый текст один раз и строится один раз на срез"""
+    snapshot = build_snapshot("test", operations)
+
+    assert snapshot.search_index is snapshot.search_index
+    assert snapshot.search_index.distinct_texts == len(set(DESCRIPTIONS) | set(CATEGORIES))
+    assert SearchIndex([]).search("такси") == []
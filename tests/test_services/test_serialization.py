@@ -0,0 +1,82 @@
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict
+from unittest.mock import Mock, patch
+
+from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from src.main import app
+from src.services.serialization import FastJSONResponse, RowsJSONResponse, dumps, encode_rows
+from src.services.store import build_snapshot
+from src.views.home import get_home_data
+from tests.test_services.operation_factory import make_operation
+
+
+OPERATIONS = [
+    make_operation(datetime(2024, 1, day, 12, 30), amount, "Супермаркеты", description, cashback="1.5", rounding="0.10")
+    for day, amount, description in [
+        (3, "100", 'Магнит "У дома"'),
+        (1, "0.1", "Перевод\tИван\\П."),
+        (2, "1234567.89", "🍕 Пицца"),
+    ]
+]
+
+
+def test_rows_match_standard_encoder() -> None:
+    """Склеенные строки побайтно совпадают с ответом FastAPI для тех же словарей"""
+    snapshot = build_snapshot("test.xlsx", OPERATIONS)
+    expected = JSONResponse(jsonable_encoder(snapshot.transactions)).body
+
+    assert RowsJSONResponse(snapshot.encoded(range(3))).body == expected
+    assert RowsJSONResponse(encode_rows(snapshot.transactions)).body == expected
+    assert RowsJSONResponse([]).body == b"[]"
+    reordered = json.loads(RowsJSONResponse(snapshot.encoded([2, 0])).body)
+    assert reordered == [snapshot.transactions[2], snapshot.transactions[0]]
+
+
+QUOTES = {"currencies": {"USD": 90.5}, "stocks": {"AAPL": 150.25}}
+
+
+def legacy_app() -> FastAPI:
+    """Прежний путь ответа: маршрут с аннотацией Dict[str, Any], сериализация моделью ответа FastAPI"""
+    legacy = FastAPI()
+
+    @legacy.get("/")
+    def home(date: str) -> Dict[str, Any]:
+        return get_home_data(datetime.strptime(date, "%Y-%m-%d %H:%M:%S"), quotes=QUOTES)
+
+    @legacy.get("/content")
+    def content() -> Dict[str, Any]:
+        return CONTENT
+
+    return legacy
+
+
+CONTENT = {"total": Decimal("10"), "cashback": Decimal("2.50"), "top": OPERATIONS[:2], "at": datetime(2024, 1, 1)}
+
+
+def test_dumps_decimal_datetime_dataclass() -> None:
+    """Decimal (строкой), даты и dataclass кодируются так же, как моделью ответа FastAPI"""
+    expected = TestClient(legacy_app()).get("/content").content
+
+    assert dumps(CONTENT) == expected
+    assert FastJSONResponse(CONTENT).body == expected
+    assert json.loads(expected)["cashback"] == "2.50"
+
+
+def test_home_matches_previous_response() -> None:
+    """Главная страница побайтно совпадает с ответом прежнего маршрута на том же срезе"""
+    params = {"date": "2024-01-31 12:00:00"}
+    store = Mock(snapshot=build_snapshot("test.xlsx", OPERATIONS))
+    quotes = Mock(return_value=QUOTES)
+    with patch("src.views.home.operation_store", store), patch("src.services.finance_api.get_quotes", quotes):
+        expected = TestClient(legacy_app()).get("/", params=params).content
+        response = TestClient(app).get("/", params=params)
+
+    assert response.status_code == 200
+    assert response.content == expected
+    assert json.loads(expected)["top_transactions"][0]["amount"] == "1234567.89"
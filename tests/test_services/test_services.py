@@ -39,6 +39,16 @@ def test_analyze_cashback_categories(sample_transactions: List[Transaction]) ->
     assert result["Такси"] == 25.0
 
 
+def test_analyze_cashback_categories_iso_dates() -> None:
+    """Даты транзакций в формате ISO с временем тоже учитываются"""
+    transactions = [
+        Transaction(date="2024-01-15T12:30:00", amount=100.0, category="Такси", description="", cashback=5.0),
+        Transaction(date="2024-02-01T09:00:00", amount=100.0, category="Такси", description="", cashback=7.0),
+    ]
+
+    assert analyze_cashback_categories(transactions, 2024, 1) == {"Такси": 5.0}
+
+
 def test_investment_bank() -> None:
     """Тест расчета инвесткопилки"""
     transactions = [
@@ -0,0 +1,179 @@
+import os
+from pathlib import Path
+from typing import List, Tuple
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from src.services.excel_processor import load_operations_with_report
+from src.services.reloader import SnapshotReloader
+from src.services.operations_cache import file_digest
+from src.services.statements import StatementIngestor, row_fingerprint
+from src.services.store import OperationStore
+
+Row = Tuple[str, str, str]
+
+
+def write_statement(path: Path, rows: List[Row]) -> None:
+    """Выписка из строк (дата операции, сумма, описание)"""
+    pd.DataFrame(
+        {
+            "Дата операции": [row[0] for row in rows],
+            "Дата платежа": [row[0][:10] for row in rows],
+            "Номер карты": ["*1234"] * len(rows),
+            "Сумма операции": [row[1] for row in rows],
+            "Категория": ["Супермаркеты"] * len(rows),
+            "Описание": [row[2] for row in rows],
+        }
+    ).to_excel(path, index=False)
+
+
+JANUARY = [
+    ("05.01.2024 10:00:00", "-100,00", "Магнит"),
+    ("05.01.2024 10:00:00", "-100,00", "Магнит"),
+    ("20.01.2024 12:00:00", "-250,50", "Пятёрочка"),
+]
+FEBRUARY = [
+    ("20.01.2024 12:00:00", "-250,50", "Пятёрочка"),
+    ("03.02.2024 09:00:00", "-75,00", "Ашан"),
+]
+
+
+@pytest.fixture
+def statements(tmp_path: Path) -> Path:
+    directory = tmp_path / "statements"
+    directory.mkdir()
+    write_statement(directory / "2024-01.xlsx", JANUARY)
+    write_statement(directory / "2024-02.xlsx", FEBRUARY)
+    return directory
+
+
+def test_overlapping_exports_deduplicated(statements: Path) -> None:
+    """Пересечение выгрузок не дублируется, одинаковые покупки внутри файла сохраняются"""
+    store = OperationStore("unused.xlsx")
+    result = StatementIngestor(str(statements), store).ingest()
+
+    assert (result.files_parsed, result.rows_read, result.rows_added, result.duplicates) == (2, 5, 4, 1)
+    assert [op.description for op in store.operations] == ["Магнит", "Магнит", "Пятёрочка", "Ашан"]
+    assert result.version == store.snapshot.version
+
+
+def test_only_new_files_parsed(statements: Path) -> None:
+    """Повторный проход читает только новый файл и добавляет только новые строки"""
+    store = OperationStore("unused.xlsx")
+    ingestor = StatementIngestor(str(statements), store)
+    ingestor.ingest()
+    write_statement(statements / "2024-03.xlsx", FEBRUARY + [("01.03.2024 08:00:00", "-10,00", "Кофе")])
+
+    with patch("src.services.statements.load_operations_with_report", wraps=load_operations_with_report) as load:
+        result = ingestor.ingest()
+        assert ingestor.ingest().files_parsed == 0
+
+    assert load.call_count == 1
+    assert (result.rows_added, result.duplicates) == (1, 2)
+    assert len(store.operations) == 5
+
+
+def test_state_restored_after_restart(statements: Path) -> None:
+    """После перезапуска операции берутся из сегментов, Excel не разбирается"""
+    StatementIngestor(str(statements), OperationStore("unused.xlsx")).ingest()
+    write_statement(statements / "2024-02.xlsx", FEBRUARY + [("10.02.2024 18:00:00", "-30,00", "Такси")])
+    os.utime(statements / "2024-02.xlsx", ns=(0, 1))
+
+    store = OperationStore("unused.xlsx")
+    with patch("src.services.statements.load_operations_with_report", wraps=load_operations_with_report) as load:
+        result = StatementIngestor(str(statements), store).ingest()
+
+    assert load.call_count == 1
+    assert (result.rows_added, result.duplicates) == (1, 2)
+    assert [op.description for op in store.operations][-2:] == ["Ашан", "Такси"]
+    assert len(store.operations) == 5
+
+
+def test_main_reload_keeps_ingested_rows(statements: Path, tmp_path: Path) -> None:
+    """Перезагрузка основного файла не теряет операции из каталога выписок"""
+    main_file = tmp_path / "operations.xlsx"
+    write_statement(main_file, [("01.12.2023 10:00:00", "-500,00", "Ozon")])
+    store = OperationStore(str(main_file))
+    store.load()
+    ingestor = StatementIngestor(str(statements), store)
+    reloader = SnapshotReloader(store, interval=0, ingestor=ingestor)
+
+    assert reloader.poll() is store.snapshot
+    snapshot = reloader.reload()
+
+    assert [op.description for op in snapshot.operations] == ["Ozon", "Магнит", "Магнит", "Пятёрочка", "Ашан"]
+
+
+def test_rows_of_main_file_not_duplicated(statements: Path, tmp_path: Path) -> None:
+    """Строки каталога, которые уже есть в основном файле, не добавляются ни до, ни после его перезагрузки"""
+    main_file = tmp_path / "operations.xlsx"
+    write_statement(main_file, JANUARY[:1])
+    store = OperationStore(str(main_file))
+    store.load()
+    ingestor = StatementIngestor(str(statements), store)
+
+    result = ingestor.ingest()
+    assert (result.rows_added, result.duplicates) == (3, 2)
+
+    write_statement(main_file, JANUARY[:1] + [("01.03.2024 08:00:00", "-10,00", "Кофе")])
+    SnapshotReloader(store, interval=0, ingestor=ingestor).reload()
+    write_statement(statements / "2024-03.xlsx", [("01.03.2024 08:00:00", "-10,00", "Кофе")])
+    assert ingestor.ingest().duplicates == 1
+
+    descriptions = [op.description for op in store.operations]
+    assert descriptions == ["Магнит", "Магнит", "Пятёрочка", "Ашан", "Кофе"]
+
+
+def test_reload_does_not_fingerprint_history(statements: Path, tmp_path: Path) -> None:
+    """После перезагрузки отпечатки снимаются только со строк нового файла и среза с теми же датами"""
+    main_file = tmp_path / "operations.xlsx"
+    history = [(f"{day:02d}.11.2023 10:00:00", "-1,00", f"Покупка {day}") for day in range(1, 29)]
+    write_statement(main_file, history)
+    store = OperationStore(str(main_file))
+    store.load()
+    ingestor = StatementIngestor(str(statements), store)
+    ingestor.ingest()
+    SnapshotReloader(store, interval=0, ingestor=ingestor).reload()
+
+    write_statement(statements / "2024-03.xlsx", [("01.03.2024 08:00:00", "-10,00", "Кофе"), history[0]])
+    with patch("src.services.statements.row_fingerprint", wraps=row_fingerprint) as fingerprint:
+        result = ingestor.ingest()
+
+    assert (result.rows_added, result.duplicates) == (1, 1)
+    assert fingerprint.call_count == 3
+    assert len(store.operations) == len(history) + 5
+
+
+def test_broken_file_skipped_until_changed(statements: Path) -> None:
+    """Нечитаемый файл не читается и не хешируется повторно, пока не изменится"""
+    broken = statements / "2024-03.xlsx"
+    broken.write_bytes(b"not a workbook")
+    ingestor = StatementIngestor(str(statements), OperationStore("unused.xlsx"))
+    ingestor.ingest()
+
+    with patch("src.services.statements.file_digest", wraps=file_digest) as digest:
+        ingestor.ingest()
+        assert digest.call_count == 0
+        write_statement(broken, [("01.03.2024 08:00:00", "-10,00", "Кофе")])
+        result = ingestor.ingest()
+
+    assert digest.call_count == 1
+    assert (result.files_parsed, result.rows_added) == (1, 1)
+    assert ingestor.stats()["failed_files"] == 0
+
+
+def test_files_without_new_rows_do_not_break_ingest(tmp_path: Path) -> None:
+    """Пустая или нечитаемая выписка первой в каталоге: состояние сохраняется, проход не падает"""
+    directory = tmp_path / "statements"
+    directory.mkdir()
+    write_statement(directory / "2024-01.xlsx", [])
+    (directory / "2024-02.xlsx").write_bytes(b"not a workbook")
+
+    ingestor = StatementIngestor(str(directory), OperationStore("unused.xlsx"))
+    result = ingestor.ingest()
+
+    assert result.rows_added == 0
+    assert (directory / ".ingest" / "state.json").exists()
+    assert ingestor.ingest().files_parsed == 0
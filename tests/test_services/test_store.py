@@ -0,0 +1,105 @@
+from dataclasses import replace
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from src.services.excel_processor import load_operations_with_report
+from src.services.store import OperationStore, build_snapshot
+
+
+@pytest.fixture
+def sample_excel(tmp_path: Path) -> Path:
+    """Создает тестовый Excel файл"""
+    file_path = tmp_path / "test_operations.xlsx"
+    data = {
+        "Дата операции": ["01.01.2023 12:00:00", "02.01.2023 13:00:00"],
+        "Дата платежа": ["02.01.2023", "03.01.2023"],
+        "Сумма операции": ["-100,50", "-200,75"],
+        "Категория": ["Food", "Transport"],
+        "Описание": ["Lunch", "Taxi"],
+    }
+    pd.DataFrame(data).to_excel(file_path, index=False)
+    return file_path
+
+
+def test_store_loads_once(sample_excel: Path) -> None:
+    """Повторный load() не перечитывает файл"""
+    store = OperationStore(str(sample_excel))
+
+    with patch("src.services.store.load_operations_with_report", wraps=load_operations_with_report) as mock_load:
+        store.load()
+        store.load()
+
+    assert mock_load.call_count == 1
+    assert len(store.operations) == 2
+    assert store.transactions[0]["category"] == "Food"
+    assert store.stats()["rows"] == 2
+
+
+def test_store_reload_bumps_version(sample_excel: Path) -> None:
+    """reload() перечитывает источник и увеличивает версию"""
+    store = OperationStore(str(sample_excel))
+    first = store.load()
+    second = store.reload()
+
+    assert second.version == first.version + 1
+    assert store.snapshot is second
+
+
+def test_store_keeps_previous_snapshot_on_error(sample_excel: Path) -> None:
+    """При ошибке загрузки остается предыдущий срез"""
+    store = OperationStore(str(sample_excel))
+    store.load()
+
+    with pytest.raises(FileNotFoundError):
+        store.reload("nonexistent.xlsx")
+
+    assert len(store.operations) == 2
+    assert store.last_error is not None
+
+
+def test_store_append_updates_aggregates(sample_excel: Path) -> None:
+    """append() вливает операции в порядке дат и дополняет куб агрегатов"""
+    store = OperationStore(str(sample_excel))
+    store.load()
+    extra = replace(store.operations[0], date=datetime(2023, 1, 1, 18, 0), amount=Decimal("10"))
+
+    snapshot = store.append([extra])
+
+    assert [op.date for op in snapshot.operations] == sorted(op.date for op in snapshot.operations)
+    assert snapshot.operations[1] is extra
+    assert snapshot.transactions[1]["amount"] == 10.0
+    assert snapshot.cube.month("2023-01")[("Food", 1, "RUB")].total == Decimal("110.50")
+
+
+def test_store_append_extends_built_structures(sample_excel: Path) -> None:
+    """Операции в конце среза дописываются в построенные структуры, результат как у полной сборки"""
+    store = OperationStore(str(sample_excel))
+    previous = store.load()
+    extra = [
+        replace(store.operations[0], date=datetime(2023, 2, 1, 9, 0), description="Перевод Иван П.",
+                category="Переводы", amount=Decimal("37.40")),
+        replace(store.operations[1], date=datetime(2023, 2, 5, 10, 0), description="Taxi +7 999 123-45-67"),
+    ]
+
+    snapshot = store.append(extra)
+    rebuilt = build_snapshot(str(sample_excel), snapshot.operations, snapshot.version)
+
+    assert snapshot.built() == previous.built()
+    assert snapshot.flags.bits.tolist() == rebuilt.flags.bits.tolist()
+    assert snapshot.flags.count("is_person_transfer") == 1
+    pd.testing.assert_frame_equal(snapshot.report_frame, rebuilt.report_frame)
+    assert snapshot.report_frame.attrs["data_version"] == snapshot.version
+    for query in ("taxi", "пер", "+7 999", ""):
+        assert snapshot.search_index.search(query) == rebuilt.search_index.search(query)
+    assert snapshot.investment.savings([(2023, 2)], [50]) == rebuilt.investment.savings([(2023, 2)], [50])
+    assert snapshot.encoded_rows == rebuilt.encoded_rows
+    assert snapshot.index.month(2023, 2) == (2, 4)
+    # Предыдущий срез не изменился: по нему могут идти запросы
+    assert len(previous.search_index) == 2
+    assert previous.search_index.search("taxi") == [1]
+    assert len(previous.report_frame) == 2
@@ -0,0 +1,27 @@
+from pathlib import Path
+
+from benchmarks.synthetic import generate_rows, parse_size, write_statement
+from src.services.excel_processor import load_operations_with_report
+from src.services.services import convert_operations_to_transactions, find_person_transfers, find_phone_transactions
+
+
+def test_generator_is_deterministic(tmp_path: Path) -> None:
+    first = write_statement(str(tmp_path / "first.xlsx"), 200, seed=7)
+    second = write_statement(str(tmp_path / "second.xlsx"), 200, seed=7)
+
+    assert Path(first).read_bytes() == Path(second).read_bytes()
+    assert list(generate_rows(50, seed=7)) != list(generate_rows(50, seed=8))
+    assert [parse_size(size) for size in ("10k", "100K", "1m", "2500")] == [10_000, 100_000, 1_000_000, 2500]
+
+
+def test_generated_statement_loads_without_errors(tmp_path: Path) -> None:
+    """Выписка в формате выгрузки: разбирается целиком, пропуски не считаются ошибками"""
+    path = write_statement(str(tmp_path / "statement.xlsx"), 1000)
+
+    operations, report = load_operations_with_report(path, use_cache=False)
+    transactions = convert_operations_to_transactions(operations)
+
+    assert (report.loaded, report.skipped, report.errors) == (1000, 0, [])
+    assert operations[0].date >= operations[-1].date
+    assert find_phone_transactions(transactions) and find_person_transfers(transactions)
+    assert any(op.card_number == "" for op in operations) and any(op.mcc is None for op in operations)
@@ -1,10 +1,16 @@
+import threading
+from dataclasses import replace
 from datetime import datetime
 from decimal import Decimal
+from typing import Optional
 from unittest.mock import Mock, patch
 
 import pytest
+from fastapi.testclient import TestClient
 
+from src.main import app
 from src.models.operation import Operation
+from src.services.store import build_snapshot
 from src.views.home import get_greeting, get_home_data
 
 
@@ -27,30 +33,27 @@ def mock_operation() -> Operation:
     )
 
 
-@patch("src.views.home.load_operations_from_excel")
 @patch("src.views.home.analyze_spending")
 @patch("src.views.home.calculate_cashback")
 @patch("src.views.home.get_top_transactions")
-@patch("src.views.home.get_currency_rates")
-@patch("src.views.home.get_stock_prices")
+@patch("src.views.home.get_quotes")
 def test_get_home_data(
-    mock_stocks: Mock,
-    mock_currency: Mock,
+    mock_quotes: Mock,
     mock_top: Mock,
     mock_cashback: Mock,
     mock_analyze: Mock,
-    mock_load: Mock,
     mock_operation: Operation,
 ) -> None:
     """Тест получения данных для главной страницы"""
-    mock_load.return_value = [mock_operation]
     mock_analyze.return_value = {"total_spent": Decimal("100.00"), "by_category": {"Food": Decimal("100.00")}}
     mock_cashback.return_value = Decimal("1.00")
     mock_top.return_value = [mock_operation]
-    mock_currency.return_value = {"USD": 75.0, "EUR": 85.0}
-    mock_stocks.return_value = {"AAPL": 150.0, "GOOGL": 2800.0}
+    mock_quotes.return_value = {
+        "currencies": {"USD": 75.0, "EUR": 85.0},
+        "stocks": {"AAPL": 150.0, "GOOGL": 2800.0},
+    }
 
-    result = get_home_data("dummy_path.xlsx", datetime(2023, 1, 15, 12, 0))
+    result = get_home_data(datetime(2023, 1, 15, 12, 0), [mock_operation])
 
     assert result["greeting"] == "Добрый день"
     assert result["total_spent"] == Decimal("100.00")
@@ -60,8 +63,47 @@ def test_get_home_data(
     assert "USD" in result["currencies"]
     assert "AAPL" in result["stocks"]
 
-    mock_load.assert_called_once_with("dummy_path.xlsx")
     mock_analyze.assert_called_once()
+    assert mock_analyze.call_args[0][0] == [mock_operation]
+
+
+@patch("src.views.home.get_quotes", Mock(return_value={"currencies": {}, "stocks": {}}))
+def test_get_home_data_from_store(mock_operation: Operation) -> None:
+    """Главная страница по срезу хранилища совпадает с расчетом по списку операций"""
+    operations = [
+        mock_operation,
+        replace(mock_operation, date=datetime(2023, 1, 20, 9, 0), amount=Decimal("50.00"), category="Taxi"),
+        replace(mock_operation, date=datetime(2023, 2, 1, 9, 0), amount=Decimal("70.00")),
+    ]
+    store = Mock(snapshot=build_snapshot("test", operations))
+
+    with patch("src.views.home.operation_store", store):
+        full_month = get_home_data(datetime(2023, 1, 31, 23, 0))
+        partial_month = get_home_data(datetime(2023, 1, 15, 12, 0))
+
+    assert full_month["total_spent"] == Decimal("150.00")
+    assert full_month["cashback"] == Decimal("2.00")
+    assert full_month == get_home_data(datetime(2023, 1, 31, 23, 0), operations)
+    assert partial_month["total_spent"] == Decimal("100.00")
+    assert [op.amount for op in full_month["top_transactions"]] == [Decimal("100.00"), Decimal("50.00")]
+
+
+def test_home_route_fetches_quotes_on_io_pool(mock_operation: Operation) -> None:
+    """Котировки главной страницы запрашиваются в io_pool, а не в потоке расчетов"""
+    threads = []
+
+    def fake_quotes(user: Optional[str] = None) -> dict:
+        threads.append(threading.current_thread().name)
+        return {"currencies": {"USD": 90.0}, "stocks": {}}
+
+    store = Mock(snapshot=build_snapshot("test", [mock_operation]))
+    with patch("src.views.home.operation_store", store), patch("src.services.finance_api.get_quotes", fake_quotes):
+        response = TestClient(app).get("/", params={"date": "2023-01-15 12:00:00"})
+
+    assert response.status_code == 200
+    assert response.json()["currencies"] == {"USD": 90.0}
+    assert response.json()["total_spent"] == "100.00"
+    assert threads and threads[0].startswith("io")
 
 
 def test_get_greeting() -> None: